@@ -0,0 +1,132 @@
+"""
+Times the stages of the evaluator on synthetic treebanks.
+
+Usage:
+    run.py [--scales=<scales>] [--repeat=<repeat>] [--output=<output>] [--baseline=<baseline>]
+    run.py (-h | --help)
+
+Options:
+    --scales=<scales>
+        Comma-separated scales to run: small, medium, large [default: small,medium]
+    --repeat=<repeat>
+        Number of timed runs of every benchmark, the best and mean times are reported [default: 3]
+    --output=<output>
+        JSON file the results are written to [default: bench_results.json]
+    --baseline=<baseline>
+        JSON results of an earlier run (e.g. another commit) to compare with
+    -h --help
+        Show this screen.
+
+"""
+
+import json
+import platform
+import subprocess
+import sys
+import tempfile
+import time
+from pathlib import Path
+from typing import Callable, Dict, List
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1] / 'src'))
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+
+from docopt import docopt
+
+from align_trees import align_trees
+from benchmarks.synthetic import TreebankConfig, write_treebank
+from conllx_df import ConllxDf
+from tree_evaluation import compare_conll_trees, count_conllx_files
+from utils.tokens_to_words import get_unsegmented_words
+
+SCALES: Dict[str, TreebankConfig] = {
+    'small': TreebankConfig(sentence_count=200, sentence_length=15),
+    'medium': TreebankConfig(sentence_count=1000, sentence_length=25),
+    'large': TreebankConfig(sentence_count=2000, sentence_length=80),
+}
+
+
+def time_function(function: Callable[[], object], repeat: int) -> List[float]:
+    times = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        function()
+        times.append(time.perf_counter() - start)
+    return times
+
+def get_benchmarks(gold_path: Path, parsed_path: Path) -> Dict[str, Callable[[], object]]:
+    """Returns the benchmarks of every stage on a gold and parsed file.
+    The stages after reading start from files that are already read.
+    """
+    gold_conll, parsed_conll = ConllxDf(gold_path), ConllxDf(parsed_path)
+    gold_trees, parsed_trees = list(gold_conll.iter_sentences()), list(parsed_conll.iter_sentences())
+    gold_forms = [tree['FORM'].tolist() for tree in gold_trees]
+    return {
+        'read_conllx': lambda: ConllxDf(gold_path),
+        'align_trees': lambda: [align_trees(gold_tree, parsed_tree) for gold_tree, parsed_tree in zip(gold_trees, parsed_trees)],
+        'unsegmented_words': lambda: [get_unsegmented_words(forms) for forms in gold_forms],
+        'compare_conll_trees': lambda: compare_conll_trees(gold_conll, parsed_conll),
+        'stream_conllx_files': lambda: count_conllx_files(gold_path, parsed_path),
+    }
+
+def run_scale(scale: str, repeat: int) -> List[dict]:
+    config = SCALES[scale]
+    results = []
+    with tempfile.TemporaryDirectory() as temp_dir:
+        path_pairs = write_treebank(config, Path(temp_dir) / 'gold', Path(temp_dir) / 'parsed')
+        gold_token_count = sum(ConllxDf(gold_path).df.shape[0] for gold_path, _ in path_pairs)
+        file_benchmarks = [get_benchmarks(gold_path, parsed_path) for gold_path, parsed_path in path_pairs]
+        for stage in file_benchmarks[0]:
+            # the time of a run is the time of the stage on every file of the treebank
+            file_times = [time_function(benchmarks[stage], repeat) for benchmarks in file_benchmarks]
+            times = [sum(run_times) for run_times in zip(*file_times)]
+            results.append({
+                'stage': stage,
+                'scale': scale,
+                'files': config.file_count,
+                'sentences': config.sentence_count * config.file_count,
+                'tokens': gold_token_count,
+                'repeat': repeat,
+                'best_s': min(times),
+                'mean_s': sum(times) / len(times),
+                'tokens_per_s': gold_token_count / min(times),
+            })
+            print(f"{scale:<8}{stage:<22}{min(times):10.4f} s")
+    return results
+
+def get_commit() -> str:
+    try:
+        return subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], capture_output=True, text=True,
+                              cwd=Path(__file__).resolve().parent).stdout.strip()
+    except OSError:
+        return ''
+
+def print_comparison(results: List[dict], baseline: dict):
+    baseline_times = {(result['stage'], result['scale']): result['best_s'] for result in baseline['results']}
+    print(f"compared with {baseline.get('commit') or 'baseline'} (best time, < 1 is faster)")
+    for result in results:
+        baseline_time = baseline_times.get((result['stage'], result['scale']))
+        if baseline_time:
+            print(f"{result['scale']:<8}{result['stage']:<22}{result['best_s'] / baseline_time:10.2f}x")
+
+if __name__ == '__main__':
+    arguments = docopt(__doc__)
+    scales = arguments['--scales'].split(',')
+    unknown_scales = [scale for scale in scales if scale not in SCALES]
+    if unknown_scales:
+        raise ValueError(f'Unknown scales: {unknown_scales}, expected {list(SCALES)}')
+
+    results = [result for scale in scales for result in run_scale(scale, int(arguments['--repeat']))]
+    output = {
+        'commit': get_commit(),
+        'python': platform.python_version(),
+        'machine': platform.machine(),
+        'results': results,
+    }
+    with open(arguments['--output'], 'w') as f:
+        json.dump(output, f, indent=2)
+    print(f"results saved in {arguments['--output']}")
+
+    if arguments['--baseline']:
+        with open(arguments['--baseline']) as f:
+            print_comparison(results, json.load(f))
@@ -0,0 +1,137 @@
+"""
+Deterministic synthetic CoNLL-X treebanks for the benchmarks.
+
+The gold trees are random Arabic-like sentences whose words are split into
+clitics (و+ stem, stem +ه) at the clitic rate. The parsed trees are the gold
+trees with tokenization errors (clitics merged into their word, or a word
+split in two) and head and label errors, so that the evaluator has to align
+the trees like it does for real parser output.
+"""
+
+from dataclasses import dataclass
+from pathlib import Path
+import random
+from typing import List, Tuple
+
+LETTERS = 'ابتثجحخدذرزسشصضطظعغفقكلمنهوي'
+PROCLITICS = ['و+', 'ف+', 'ب+', 'ل+']
+ENCLITICS = ['+ه', '+ها', '+هم', '+ي']
+UPOS_TAGS = ['NOM', 'VRB', 'PRT', 'PNX', 'PROP']
+DEPRELS = ['SBJ', 'OBJ', 'MOD', 'IDF', 'TMZ', '---']
+
+
+@dataclass
+class TreebankConfig:
+    """Shape of a synthetic treebank. The same config always gives the same files."""
+    file_count: int = 1
+    sentence_count: int = 100
+    # mean number of words of a sentence, lengths vary by +-50%
+    sentence_length: int = 20
+    # probability that a word is split into clitics in the gold trees
+    clitic_rate: float = 0.3
+    # probability that the tokenization of a word differs in the parsed trees
+    tokenization_error_rate: float = 0.05
+    # probability that the head (and, separately, the label) of a parsed token is wrong
+    parse_error_rate: float = 0.15
+    seed: int = 0
+
+def get_stem(rng: random.Random) -> str:
+    return ''.join(rng.choice(LETTERS) for _ in range(rng.randint(2, 6)))
+
+def get_gold_words(config: TreebankConfig, rng: random.Random) -> List[List[str]]:
+    """Returns the tokens of every word of a sentence."""
+    length = max(1, round(config.sentence_length * rng.uniform(0.5, 1.5)))
+    words = []
+    for _ in range(length):
+        stem = get_stem(rng)
+        if rng.random() < config.clitic_rate:
+            words.append([rng.choice(PROCLITICS), stem] if rng.random() < 0.5 else [stem, rng.choice(ENCLITICS)])
+        else:
+            words.append([stem])
+    return words
+
+def get_parsed_words(config: TreebankConfig, gold_words: List[List[str]], rng: random.Random) -> List[List[str]]:
+    """Changes the tokenization of some words, the words themselves stay the same."""
+    parsed_words = []
+    for tokens in gold_words:
+        if rng.random() >= config.tokenization_error_rate:
+            parsed_words.append(tokens)
+        elif len(tokens) > 1:
+            parsed_words.append([''.join(tokens).replace('+', '')])
+        else:
+            parsed_words.append([f'{tokens[0][0]}+', tokens[0][1:]])
+    return parsed_words
+
+def get_rows(tokens: List[str], heads: List[int], rng: random.Random) -> List[str]:
+    return [f'{i}\t{form}\t_\t{rng.choice(UPOS_TAGS)}\t_\t_\t{head}\t{rng.choice(DEPRELS)}\t_\t_'
+            for i, (form, head) in enumerate(zip(tokens, heads), start=1)]
+
+def get_sentence_pair(config: TreebankConfig, rng: random.Random) -> Tuple[str, str]:
+    """Returns the gold and the parsed tree of a sentence in CoNLL-X format."""
+    gold_words = get_gold_words(config, rng)
+    parsed_words = get_parsed_words(config, gold_words, rng)
+    gold_tokens = [tok for tokens in gold_words for tok in tokens]
+    parsed_tokens = [tok for tokens in parsed_words for tok in tokens]
+
+    # the first token is the root, every other token attaches to an earlier one
+    gold_heads = [0] + [rng.randrange(1, i + 1) for i in range(1, len(gold_tokens))]
+    gold_rows = get_rows(gold_tokens, gold_heads, rng)
+
+    # parsed tokens of unchanged words keep the gold head (renumbered) and label
+    gold_to_parsed = []
+    parsed_index = 0
+    for gold_tokens_of_word, parsed_tokens_of_word in zip(gold_words, parsed_words):
+        for k in range(len(gold_tokens_of_word)):
+            gold_to_parsed.append(parsed_index + min(k, len(parsed_tokens_of_word) - 1) + 1)
+        parsed_index += len(parsed_tokens_of_word)
+    parsed_rows = []
+    gold_row_of_parsed = {parsed: gold for gold, parsed in enumerate(gold_to_parsed)}
+    for i in range(1, len(parsed_tokens) + 1):
+        gold_row = gold_row_of_parsed.get(i)
+        if gold_row is None or rng.random() < config.parse_error_rate:
+            head = rng.randrange(0, len(parsed_tokens) + 1)
+        else:
+            head = gold_heads[gold_row] and gold_to_parsed[gold_heads[gold_row] - 1]
+        columns = gold_rows[gold_row].split('\t') if gold_row is not None else [str(i), '', '_', 'NOM', '_', '_', '', 'MOD', '_', '_']
+        columns[0], columns[1], columns[6] = str(i), parsed_tokens[i - 1], str(head)
+        if rng.random() < config.parse_error_rate:
+            columns[7] = rng.choice(DEPRELS)
+        parsed_rows.append('\t'.join(columns))
+
+    comment = f"# text = {' '.join(''.join(tokens).replace('+', '') for tokens in gold_words)}"
+    return '\n'.join([comment] + gold_rows), '\n'.join([comment] + parsed_rows)
+
+def generate_treebank(config: TreebankConfig) -> List[Tuple[str, str]]:
+    """Generates the gold and parsed files of a synthetic treebank.
+
+    Args:
+        config (TreebankConfig): shape of the treebank
+
+    Returns:
+        List[Tuple[str, str]]: the contents of the gold and the parsed file of every file pair
+    """
+    rng = random.Random(config.seed)
+    files = []
+    for _ in range(config.file_count):
+        pairs = [get_sentence_pair(config, rng) for _ in range(config.sentence_count)]
+        files.append(('\n\n'.join(gold for gold, _ in pairs) + '\n\n',
+                      '\n\n'.join(parsed for _, parsed in pairs) + '\n\n'))
+    return files
+
+def write_treebank(config: TreebankConfig, gold_dir, parsed_dir) -> List[Tuple[Path, Path]]:
+    """Writes the file pairs of generate_treebank as synthetic_<k>.conllx
+    into gold_dir and parsed_dir.
+
+    Returns:
+        List[Tuple[Path, Path]]: the gold and parsed path of every file pair
+    """
+    gold_dir, parsed_dir = Path(gold_dir), Path(parsed_dir)
+    gold_dir.mkdir(parents=True, exist_ok=True)
+    parsed_dir.mkdir(parents=True, exist_ok=True)
+    paths = []
+    for k, (gold, parsed) in enumerate(generate_treebank(config)):
+        gold_path, parsed_path = gold_dir / f'synthetic_{k}.conllx', parsed_dir / f'synthetic_{k}.conllx'
+        gold_path.write_text(gold, encoding='utf-8')
+        parsed_path.write_text(parsed, encoding='utf-8')
+        paths.append((gold_path, parsed_path))
+    return paths
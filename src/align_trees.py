@@ -1,8 +1,13 @@
 
-from typing import Tuple
-from pandas import DataFrame, concat
+from typing import List, Tuple
+
+import numpy as np
+from pandas import CategoricalDtype, DataFrame, concat
+from alignment_cache import get_alignment_cache
 from external_libraries.ced_word_alignment.alignment import align_words
 
+# FORM of the rows inserted for null alignment tokens
+NULL_FORM = 'tok'
 
 def get_new_row() -> DataFrame:
     """Row to be inserted into the DataFrame for alignment.
@@ -11,11 +16,58 @@ def get_new_row() -> DataFrame:
         DataFrame: the row
     """
     return DataFrame({
-        'ID': -1, 'FORM': 'tok', 'LEMMA': '_', 
+        'ID': -1, 'FORM': NULL_FORM, 'LEMMA': '_', 
         'UPOS': '_', 'XPOS': '_', 'FEATS': '_',
         'HEAD': -1, 'DEPREL': '_', 'DEPS': '_', 'MISC': '_'
     }, index=[0])
 
+def insert_empty_rows(positions: List[int], df: DataFrame) -> DataFrame:
+    """Inserts empty rows into the DataFrame so that they end up at the given
+    row indices, then renumbers ID and remaps HEAD to the new IDs.
+    The result is the same as calling insert_empty_row once per position
+    in increasing order, but the DataFrame is only rebuilt once.
+
+    Args:
+        positions (List[int]): sorted row indices of the inserted rows in the
+            resulting DataFrame, NOT IDs
+        df (DataFrame): the DataFrame accepting the rows
+
+    Returns:
+        DataFrame: the DataFrame with inserted rows and updated IDs and HEADs
+    """
+    if not positions:
+        return df.reset_index(drop=True)
+    
+    row_count = df.shape[0]
+    insert_count = len(positions)
+    is_new_row = np.zeros(row_count + insert_count, dtype=bool)
+    is_new_row[positions] = True
+    # final row index of each original row
+    kept_rows = np.flatnonzero(~is_new_row)
+    
+    # original rows are followed by the new rows, then placed in their final order
+    take = np.empty(row_count + insert_count, dtype=np.int64)
+    take[kept_rows] = np.arange(row_count)
+    take[is_new_row] = np.arange(row_count, row_count + insert_count)
+    new_rows = get_new_row().loc[[0] * insert_count]
+    # keep categorical (compact) columns categorical, their categories include the new row values
+    new_rows = new_rows.astype({column: df[column].dtype for column in new_rows.columns
+                                if column in df.columns and isinstance(df[column].dtype, CategoricalDtype)})
+    df = concat([df, new_rows]).iloc[take]
+    df.reset_index(inplace=True, drop=True)
+    df['ID'] = range(1, df.shape[0]+1)
+    
+    # HEADs pointing to an original row follow that row, HEADs past the last
+    # row are shifted by all insertions, 0 (root) and -1 (inserted) are kept
+    heads = df['HEAD'].to_numpy().copy()
+    in_tree = (heads >= 1) & (heads <= row_count)
+    past_tree = heads > row_count
+    heads[in_tree] = kept_rows[(heads[in_tree] - 1).astype(np.int64)] + 1
+    heads[past_tree] += insert_count
+    df['HEAD'] = heads
+    
+    return df
+
 def insert_empty_row(i: int, df: DataFrame) -> DataFrame:
     """Inserts an empty row into the DataFrame, and adjust the ID and HEAD
     numbering for numbers greater than i+1 (the ID of the inserted row).
@@ -27,18 +79,201 @@ def insert_empty_row(i: int, df: DataFrame) -> DataFrame:
     Returns:
         DataFrame: the DataFrame with an inserted row and updated IDs and HEADs
     """
-    df = concat([df.iloc[:i], get_new_row(), df.iloc[i:]])
+    return insert_empty_rows([i], df)
+
+def get_alignment_tokens(forms) -> List[str]:
+    """Returns the tokens used for alignment, i.e. the forms without +.
+
+    Args:
+        forms (Iterable[str]): the FORM column of a tree
+
+    Returns:
+        List[str]: the tokens as align_words splits them
+    """
+    return (' '.join(forms)).replace('+', '').split()
+
+def get_common_prefix_length(tokens_1: List[str], tokens_2: List[str]) -> int:
+    prefix = 0
+    for tok_1, tok_2 in zip(tokens_1, tokens_2):
+        if tok_1 != tok_2:
+            break
+        prefix += 1
+    return prefix
+
+def get_common_suffix_length(tokens_1: List[str], tokens_2: List[str], max_length: int) -> int:
+    """Returns the length of the common suffix that align_words is guaranteed
+    to align one to one. A suffix token that also occurs earlier in either
+    sentence can tie with an insertion or a deletion, in which case
+    align_words may not pair it with its counterpart, so the suffix stops there.
+
+    Args:
+        tokens_1 (List[str]): first sentence tokens
+        tokens_2 (List[str]): second sentence tokens
+        max_length (int): upper bound for the suffix (excludes the common prefix)
+
+    Returns:
+        int: the suffix length
+    """
+    first_index_1 = {tok: i for i, tok in reversed(list(enumerate(tokens_1)))}
+    first_index_2 = {tok: j for j, tok in reversed(list(enumerate(tokens_2)))}
     
-    # reset index and ID after inserting new row
-    df.reset_index(inplace=True, drop=True)
-    new_id_column = range(1, df.shape[0]+1)
-    df['ID'] = new_id_column
+    suffix = 0
+    i, j = len(tokens_1) - 1, len(tokens_2) - 1
+    while suffix < max_length and tokens_1[i] == tokens_2[j]:
+        if first_index_1[tokens_1[i]] != i or first_index_2[tokens_2[j]] != j:
+            break
+        suffix += 1
+        i -= 1
+        j -= 1
+    return suffix
+
+def align_tokens(tokens_1: List[str], tokens_2: List[str]) -> List[tuple]:
+    """Returns the same alignment as align_words on the joined tokens, but
+    only runs align_words on the window between the common prefix and suffix.
+    Identical sentences are not aligned at all, other sentence pairs are
+    looked up in the alignment cache first if it is enabled.
+
+    Args:
+        tokens_1 (List[str]): first sentence tokens
+        tokens_2 (List[str]): second sentence tokens
+
+    Returns:
+        List[tuple]: alignment ops (index_1, index_2, op, cost), 1-based indices
+    """
+    if tokens_1 == tokens_2:
+        return [(k, k, 'n', 0) for k in range(1, len(tokens_1) + 1)]
     
-    # increment HEADs > inserted row (i+1 because i is the row index and not ID)
-    tok_ids = df[df['HEAD'] >= i+1].index
-    df.loc[tok_ids, 'HEAD'] += 1
+    cache = get_alignment_cache()
+    if cache:
+        result = cache.get(tokens_1, tokens_2)
+        if result is None:
+            result = align_token_window(tokens_1, tokens_2)
+            cache.put(tokens_1, tokens_2, result)
+        return result
+    return align_token_window(tokens_1, tokens_2)
 
-    return df
+def align_token_window(tokens_1: List[str], tokens_2: List[str]) -> List[tuple]:
+    m, n = len(tokens_1), len(tokens_2)
+    prefix = get_common_prefix_length(tokens_1, tokens_2)
+    suffix = get_common_suffix_length(tokens_1, tokens_2, min(m, n) - prefix)
+    
+    window = align_words(' '.join(tokens_1[prefix:m-suffix]), ' '.join(tokens_2[prefix:n-suffix]))
+    
+    result = [(k, k, 'n', 0) for k in range(1, prefix + 1)]
+    for i, j, op, cost in window:
+        result.append((None if i is None else i + prefix, None if j is None else j + prefix, op, cost))
+    cost = result[-1][3] if result else 0
+    result += [(m - k, n - k, 'n', cost) for k in range(suffix - 1, -1, -1)]
+    return result
+
+def align_forms(forms_1, forms_2) -> List[tuple]:
+    """Aligns the forms of two trees (or the words of two sentences).
+
+    Args:
+        forms_1 (Iterable[str]): first tree forms
+        forms_2 (Iterable[str]): second tree forms
+
+    Returns:
+        List[tuple]: alignment ops (index_1, index_2, op, cost), 1-based indices
+    """
+    return align_tokens(get_alignment_tokens(forms_1), get_alignment_tokens(forms_2))
+
+def get_null_rows(alignment: List[tuple]) -> Tuple[List[int], List[int]]:
+    """Returns the row indices of the null alignment tokens in the first and the second aligned tree."""
+    null_rows_1 = [i for i, word_comp in enumerate(alignment) if word_comp[0] is None]
+    null_rows_2 = [i for i, word_comp in enumerate(alignment) if word_comp[1] is None]
+    return null_rows_1, null_rows_2
+
+def insert_null_forms(positions: List[int], forms: List[str]) -> List[str]:
+    """Same as insert_empty_rows for a list of forms: inserts NULL_FORM so that
+    they end up at the given (sorted) indices.
+    """
+    aligned_forms = list(forms)
+    for i in positions:
+        aligned_forms.insert(i, NULL_FORM)
+    return aligned_forms
+
+def get_aligned_rows(positions: List[int], row_count: int) -> np.ndarray:
+    """Returns the row of the tree at every row of the aligned tree,
+    -1 at the null alignment tokens inserted at positions (see insert_empty_rows).
+    """
+    aligned_rows = np.full(row_count + len(positions), -1, dtype=np.int64)
+    is_tree_row = np.ones(aligned_rows.shape[0], dtype=bool)
+    is_tree_row[positions] = False
+    aligned_rows[is_tree_row] = np.arange(row_count)
+    return aligned_rows
+
+def align_rows(forms_1: List[str], forms_2: List[str]) -> Tuple[np.ndarray, np.ndarray]:
+    """Aligns the forms of two trees without building DataFrames.
+    Row k of the aligned trees (as returned by align_trees) is row
+    aligned_rows_1[k] of the first tree and aligned_rows_2[k] of the second,
+    -1 for a null alignment token.
+
+    Args:
+        forms_1 (List[str]): first tree forms
+        forms_2 (List[str]): second tree forms
+
+    Returns:
+        Tuple[np.ndarray, np.ndarray]: aligned_rows_1 and aligned_rows_2
+    """
+    null_rows_1, null_rows_2 = get_null_rows(align_forms(forms_1, forms_2))
+    return get_aligned_rows(null_rows_1, len(forms_1)), get_aligned_rows(null_rows_2, len(forms_2))
+
+def get_row_mapping(aligned_rows_1: np.ndarray, aligned_rows_2: np.ndarray, row_count_1: int) -> np.ndarray:
+    """Returns the row of the second tree aligned to every row of the first tree, or -1.
+
+    Args:
+        aligned_rows_1 (np.ndarray): aligned rows of the first tree (see align_rows)
+        aligned_rows_2 (np.ndarray): aligned rows of the second tree
+        row_count_1 (int): number of rows of the first tree
+
+    Returns:
+        np.ndarray: the second tree row of every first tree row
+    """
+    mapping = np.full(row_count_1, -1, dtype=np.int64)
+    is_tree_row = aligned_rows_1 >= 0
+    mapping[aligned_rows_1[is_tree_row]] = aligned_rows_2[is_tree_row]
+    return mapping
+
+def gather_aligned(values: np.ndarray, aligned_rows: np.ndarray, null_value) -> np.ndarray:
+    """Returns the values of the aligned tree rows, null_value at the null alignment tokens."""
+    if values.shape[0] == 0:
+        return np.full(aligned_rows.shape[0], null_value)
+    return np.where(aligned_rows >= 0, values[np.maximum(aligned_rows, 0)], null_value)
+
+def get_aligned_heads(heads: np.ndarray, aligned_rows: np.ndarray) -> np.ndarray:
+    """Returns the HEADs of the aligned tree, renumbered like insert_empty_rows does.
+
+    Args:
+        heads (np.ndarray): HEAD column of the tree
+        aligned_rows (np.ndarray): aligned rows of the tree (see align_rows)
+
+    Returns:
+        np.ndarray: the HEADs of the aligned tree, -1 at the null alignment tokens
+    """
+    row_count = heads.shape[0]
+    kept_rows = np.flatnonzero(aligned_rows >= 0)
+    aligned_heads = np.full(aligned_rows.shape[0], -1, dtype=np.int64)
+    aligned_heads[kept_rows] = heads
+    in_tree = (aligned_heads >= 1) & (aligned_heads <= row_count)
+    past_tree = aligned_heads > row_count
+    aligned_heads[in_tree] = kept_rows[aligned_heads[in_tree] - 1] + 1
+    aligned_heads[past_tree] += aligned_rows.shape[0] - row_count
+    return aligned_heads
+
+def apply_alignment(alignment: List[tuple], df_1: DataFrame, df_2: DataFrame) -> Tuple[DataFrame, DataFrame]:
+    """Adds rows for the null alignment tokens of an alignment of df_1 and df_2.
+
+    Args:
+        alignment (List[tuple]): alignment ops of align_forms
+        df_1 (DataFrame): first tree
+        df_2 (DataFrame): second tree
+
+    Returns:
+        tuple(DataFrame, DataFrame): the aligned dataframes
+    """
+    null_rows_1, null_rows_2 = get_null_rows(alignment)
+    return insert_empty_rows(null_rows_1, df_1), insert_empty_rows(null_rows_2, df_2)
 
 def align_trees(df_1: DataFrame, df_2: DataFrame) -> Tuple[DataFrame, DataFrame]:
     """Aligns words in a sentence, then adds rows to the DataFrames
@@ -51,13 +286,4 @@ def align_trees(df_1: DataFrame, df_2: DataFrame) -> Tuple[DataFrame, DataFrame]
     Returns:
         tuple(DataFrame, DataFrame): the aligned dataframes
     """
-    sentence_1 = (' '.join(list(df_1['FORM']))).replace('+', '')
-    sentence_2 = (' '.join(list(df_2['FORM']))).replace('+', '')
-
-    result = align_words(sentence_1, sentence_2)
-    for i, word_comp in enumerate(result):
-        if word_comp[0] is None:
-            df_1 = insert_empty_row(i, df_1)
-        if word_comp[1] is None:
-            df_2 = insert_empty_row(i, df_2)
-    return df_1.reset_index(drop=True), df_2.reset_index(drop=True)
+    return apply_alignment(align_forms(df_1['FORM'], df_2['FORM']), df_1, df_2)
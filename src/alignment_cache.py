@@ -0,0 +1,168 @@
+import hashlib
+import json
+import os
+import sqlite3
+import time
+from pathlib import Path
+from typing import Callable, Dict, List, Optional, Tuple
+
+CACHE_FILE_NAME = 'alignments.sqlite'
+DEFAULT_MAX_ENTRIES = 1000000
+
+
+class AlignmentCache:
+    """Content-addressed on-disk cache of token alignments.
+
+    The alignment of two token sequences is stored under a hash of the
+    sequences, so identical sentence pairs of later runs (other checkpoints,
+    other normalization flags) are not aligned again. Entries are kept in an
+    SQLite database under cache_dir. New entries and access times are
+    written when the cache is flushed, then the least recently used entries
+    beyond max_entries are evicted.
+
+    Every process opens its own connection, hits and misses are counted per
+    process (see get_alignment_cache_stats).
+    """
+    def __init__(self, cache_dir, max_entries: int = DEFAULT_MAX_ENTRIES):
+        self.cache_dir = Path(cache_dir)
+        self.max_entries = max_entries
+        self.hits = 0
+        self.misses = 0
+        # written on flush
+        self._new_entries: Dict[str, str] = {}
+        self._used_keys: Dict[str, int] = {}
+
+        self.cache_dir.mkdir(parents=True, exist_ok=True)
+        # several processes may write at the same time, they wait for the lock
+        self._connection = sqlite3.connect(self.cache_dir / CACHE_FILE_NAME, timeout=60)
+        with self._connection:
+            self._connection.execute(
+                'CREATE TABLE IF NOT EXISTS alignments (key TEXT PRIMARY KEY, ops TEXT NOT NULL, last_used INTEGER NOT NULL)')
+            self._connection.execute('CREATE INDEX IF NOT EXISTS alignments_last_used ON alignments (last_used)')
+
+    @staticmethod
+    def get_key(tokens_1: List[str], tokens_2: List[str]) -> str:
+        # tokens contain no whitespace (see get_alignment_tokens)
+        return hashlib.sha256(f"{' '.join(tokens_1)}\n{' '.join(tokens_2)}".encode('utf-8')).hexdigest()
+
+    def get(self, tokens_1: List[str], tokens_2: List[str]) -> Optional[List[tuple]]:
+        """Returns the cached alignment of the two token sequences, or None.
+
+        Returns:
+            List[tuple]: alignment ops (index_1, index_2, op, cost), as returned by align_tokens
+        """
+        key = AlignmentCache.get_key(tokens_1, tokens_2)
+        ops = self._new_entries.get(key)
+        if ops is None:
+            row = self._connection.execute('SELECT ops FROM alignments WHERE key = ?', (key,)).fetchone()
+            ops = row[0] if row else None
+        if ops is None:
+            self.misses += 1
+            return None
+
+        self.hits += 1
+        self._used_keys[key] = time.time_ns()
+        # JSON keeps the int and float costs apart
+        return [tuple(op) for op in json.loads(ops)]
+
+    def put(self, tokens_1: List[str], tokens_2: List[str], alignment: List[tuple]):
+        key = AlignmentCache.get_key(tokens_1, tokens_2)
+        self._new_entries[key] = json.dumps(alignment)
+        self._used_keys[key] = time.time_ns()
+
+    def flush(self):
+        """Writes the new entries and access times, then evicts the least
+        recently used entries beyond max_entries.
+        """
+        if not self._used_keys:
+            return
+        with self._connection:
+            self._connection.executemany(
+                'INSERT OR IGNORE INTO alignments (key, ops, last_used) VALUES (?, ?, ?)',
+                [(key, ops, self._used_keys[key]) for key, ops in self._new_entries.items()])
+            self._connection.executemany(
+                'UPDATE alignments SET last_used = MAX(last_used, ?) WHERE key = ?',
+                [(last_used, key) for key, last_used in self._used_keys.items()])
+            excess = self._connection.execute('SELECT COUNT(*) FROM alignments').fetchone()[0] - self.max_entries
+            if excess > 0:
+                self._connection.execute(
+                    'DELETE FROM alignments WHERE key IN (SELECT key FROM alignments ORDER BY last_used LIMIT ?)', (excess,))
+        self._new_entries.clear()
+        self._used_keys.clear()
+
+    def get_entry_count(self) -> int:
+        return self._connection.execute('SELECT COUNT(*) FROM alignments').fetchone()[0]
+
+    def close(self):
+        self.flush()
+        self._connection.close()
+
+
+# process-wide cache used by align_tokens, opened lazily in every process
+_cache_settings: Optional[Tuple[str, int]] = None
+_cache: Optional[AlignmentCache] = None
+_cache_pid: Optional[int] = None
+# lookups made by the worker processes of this process (see add_worker_cache_stats)
+_worker_stats: List[int] = [0, 0]
+
+def set_alignment_cache(cache_dir=None, max_entries: int = DEFAULT_MAX_ENTRIES):
+    """Enables the alignment cache of this process, or disables it if cache_dir is None.
+
+    Args:
+        cache_dir (optional): directory of the cache database. Defaults to None.
+        max_entries (int, optional): number of alignments kept. Defaults to DEFAULT_MAX_ENTRIES.
+    """
+    global _cache_settings, _cache, _cache_pid, _worker_stats
+    if _cache is not None and _cache_pid == os.getpid():
+        _cache.close()
+    _cache_settings = None if cache_dir is None else (str(cache_dir), max_entries)
+    _cache, _cache_pid = None, None
+    _worker_stats = [0, 0]
+
+def get_alignment_cache_settings() -> Optional[Tuple[str, int]]:
+    """Returns the settings to enable the same cache in a worker process
+    with set_alignment_cache(*settings), or None if the cache is disabled.
+    """
+    return _cache_settings
+
+def get_alignment_cache() -> Optional[AlignmentCache]:
+    global _cache, _cache_pid
+    if _cache_settings is None:
+        return None
+    # a forked process cannot share the connection of its parent
+    if _cache is None or _cache_pid != os.getpid():
+        _cache, _cache_pid = AlignmentCache(*_cache_settings), os.getpid()
+    return _cache
+
+def get_alignment_cache_stats() -> Tuple[int, int]:
+    """Returns:
+        Tuple[int, int]: hits and misses of the alignment cache of this process
+            and of its worker processes, since the cache was set
+    """
+    cache = _cache if _cache_pid == os.getpid() else None
+    hits, misses = (cache.hits, cache.misses) if cache else (0, 0)
+    return hits + _worker_stats[0], misses + _worker_stats[1]
+
+def add_worker_cache_stats(hits: int, misses: int):
+    """Adds the cache lookups of a task run in a worker process (see call_with_cache_stats)."""
+    _worker_stats[0] += hits
+    _worker_stats[1] += misses
+
+def call_with_cache_stats(function: Callable, *args) -> Tuple[object, Tuple[int, int]]:
+    """Runs function(*args) in a worker process and writes its new cache
+    entries. The cache lookups it made are returned with its result, to be
+    added to the stats of the parent process with add_worker_cache_stats.
+
+    Returns:
+        Tuple[object, Tuple[int, int]]: the result, and the hits and misses of the call
+    """
+    hits, misses = get_alignment_cache_stats()
+    result = function(*args)
+    flush_alignment_cache()
+    new_hits, new_misses = get_alignment_cache_stats()
+    return result, (new_hits - hits, new_misses - misses)
+
+def flush_alignment_cache():
+    cache = _cache if _cache_pid == os.getpid() else None
+    if cache:
+        cache.flush()
@@ -0,0 +1,188 @@
+from pathlib import Path
+from typing import Dict, List, NamedTuple, Tuple
+
+import numpy as np
+import pandas as pd
+from pandas import DataFrame
+
+from align_trees import gather_aligned
+from conllx_counts import ConllxCounts
+
+# the groups of the breakdown, the labels of a group are its values
+BREAKDOWN_GROUPS = ['deprel', 'upos', 'head_direction', 'dependency_length']
+# dependency lengths |HEAD - ID| are grouped into buckets starting at these lengths
+DEPENDENCY_LENGTH_BUCKETS = [1, 2, 3, 7]
+DEPENDENCY_LENGTH_LABELS = ['root', '1', '2', '3-6', '7+']
+HEAD_DIRECTION_LABELS = ['root', 'left', 'right']
+# the groups of the confusion matrices, and their column
+CONFUSION_GROUPS = {'upos': 'UPOS', 'deprel': 'DEPREL'}
+# label of the null alignment tokens in the confusion matrices
+NULL_LABEL = '<null>'
+
+
+class AlignedTree(NamedTuple):
+    """The aligned rows of a gold and a parsed tree (see align_rows), and
+    whether their heads and labels match at every aligned row.
+    """
+    ref_rows: np.ndarray
+    pred_rows: np.ndarray
+    head_matches: np.ndarray
+    label_matches: np.ndarray
+
+def get_head_directions(ids: np.ndarray, heads: np.ndarray) -> np.ndarray:
+    """Returns the index in HEAD_DIRECTION_LABELS of the direction of every head."""
+    return np.where(heads == 0, 0, np.where(heads < ids, 1, 2))
+
+def get_dependency_length_buckets(ids: np.ndarray, heads: np.ndarray) -> np.ndarray:
+    """Returns the index in DEPENDENCY_LENGTH_LABELS of the length of every dependency."""
+    return np.where(heads == 0, 0, np.digitize(np.abs(heads - ids), DEPENDENCY_LENGTH_BUCKETS))
+
+def get_file_rows(aligned_trees: List[AlignedTree], ref_offsets: np.ndarray, pred_offsets: np.ndarray) -> AlignedTree:
+    """Concatenates the aligned trees of a file, with the rows numbered from the first row of the file."""
+    if not aligned_trees:
+        empty = np.zeros(0, dtype=np.int64)
+        return AlignedTree(empty, empty, empty.astype(bool), empty.astype(bool))
+    ref_rows = np.concatenate([np.where(tree.ref_rows >= 0, tree.ref_rows + offset, -1)
+                               for tree, offset in zip(aligned_trees, ref_offsets.tolist())])
+    pred_rows = np.concatenate([np.where(tree.pred_rows >= 0, tree.pred_rows + offset, -1)
+                                for tree, offset in zip(aligned_trees, pred_offsets.tolist())])
+    return AlignedTree(ref_rows, pred_rows, np.concatenate([tree.head_matches for tree in aligned_trees]),
+                       np.concatenate([tree.label_matches for tree in aligned_trees]))
+
+def get_label_codes(ref_df: DataFrame, pred_df: DataFrame, column: str) -> Tuple[np.ndarray, np.ndarray, List[str]]:
+    """Codes the labels of a column of the gold and the parsed trees
+    together, so that equal codes are equal labels.
+
+    Returns:
+        Tuple[np.ndarray, np.ndarray, List[str]]: the gold codes, the parsed codes and the labels
+    """
+    values = np.concatenate([ref_df[column].to_numpy(dtype=object), pred_df[column].to_numpy(dtype=object)])
+    codes, labels = pd.factorize(values)
+    labels = [str(label) for label in labels]
+    # missing labels (e.g. the padding of short rows) get a code of their own
+    missing = codes < 0
+    if missing.any():
+        codes[missing] = len(labels)
+        labels.append(str(values[missing][0]))
+    return codes[:ref_df.shape[0]], codes[ref_df.shape[0]:], labels
+
+def count_group(counts: Dict[str, List[int]], labels: List[str], ref_codes: np.ndarray, pred_codes: np.ndarray,
+                correct_codes: np.ndarray):
+    """Adds the gold, parsed and correct counts of every label of a group,
+    given the label codes of the gold tokens, the parsed tokens and the
+    correct aligned tokens.
+    """
+    label_counts = [np.bincount(codes, minlength=len(labels)) for codes in [ref_codes, pred_codes, correct_codes]]
+    for label, gold_count, pred_count, correct_count in zip(labels, *(c.tolist() for c in label_counts)):
+        if gold_count or pred_count:
+            label_count = counts.setdefault(label, [0, 0, 0])
+            label_count[0] += gold_count
+            label_count[1] += pred_count
+            label_count[2] += correct_count
+
+def add_breakdown_counts(counts: ConllxCounts, ref_df: DataFrame, ref_offsets: np.ndarray, pred_df: DataFrame,
+                         pred_offsets: np.ndarray, aligned_trees: List[AlignedTree]):
+    """Adds the gold, parsed and correct token counts of every DEPREL, UPOS,
+    head direction and dependency length to counts.breakdown_counts, in one
+    pass over all the aligned trees of the rows.
+
+    A gold or parsed token is counted under its own label. An aligned pair of
+    tokens with the same label is correct if its head and DEPREL match (DEPREL),
+    if the label matches (UPOS), or if its head matches (head direction and
+    dependency length). The precision of a label is then correct / parsed and
+    its recall correct / gold (see get_breakdown_scores).
+
+    Args:
+        counts (ConllxCounts): the counts to update
+        ref_df (DataFrame): gold trees
+        ref_offsets (np.ndarray): sentence offsets of the gold trees
+        pred_df (DataFrame): parsed trees
+        pred_offsets (np.ndarray): sentence offsets of the parsed trees
+        aligned_trees (List[AlignedTree]): the aligned rows of every tree (see count_tree_columns)
+    """
+    rows = get_file_rows(aligned_trees, ref_offsets, pred_offsets)
+    paired = (rows.ref_rows >= 0) & (rows.pred_rows >= 0)
+    ref_rows, pred_rows = rows.ref_rows[paired], rows.pred_rows[paired]
+    head_matches, label_head_matches = rows.head_matches[paired], (rows.head_matches & rows.label_matches)[paired]
+
+    for group, column in [('deprel', 'DEPREL'), ('upos', 'UPOS')]:
+        ref_codes, pred_codes, labels = get_label_codes(ref_df, pred_df, column)
+        same_label = ref_codes[ref_rows] == pred_codes[pred_rows]
+        correct = same_label & label_head_matches if group == 'deprel' else same_label
+        count_group(counts.breakdown_counts.setdefault(group, {}), labels, ref_codes, pred_codes, ref_codes[ref_rows][correct])
+
+    ref_ids, ref_heads = ref_df['ID'].to_numpy(dtype=np.int64), ref_df['HEAD'].to_numpy(dtype=np.int64)
+    pred_ids, pred_heads = pred_df['ID'].to_numpy(dtype=np.int64), pred_df['HEAD'].to_numpy(dtype=np.int64)
+    for group, labels, get_codes in [('head_direction', HEAD_DIRECTION_LABELS, get_head_directions),
+                                     ('dependency_length', DEPENDENCY_LENGTH_LABELS, get_dependency_length_buckets)]:
+        ref_codes, pred_codes = get_codes(ref_ids, ref_heads), get_codes(pred_ids, pred_heads)
+        correct = (ref_codes[ref_rows] == pred_codes[pred_rows]) & head_matches
+        count_group(counts.breakdown_counts.setdefault(group, {}), labels, ref_codes, pred_codes, ref_codes[ref_rows][correct])
+
+def add_confusion_counts(counts: ConllxCounts, ref_df: DataFrame, ref_offsets: np.ndarray, pred_df: DataFrame,
+                         pred_offsets: np.ndarray, aligned_trees: List[AlignedTree]):
+    """Adds the UPOS and DEPREL confusion counts of all the aligned trees of
+    the rows to counts.confusion_counts, with one bincount per column on the
+    codes of the (gold, parsed) label pairs. Tokens aligned to a null
+    alignment token are counted with NULL_LABEL.
+
+    Args:
+        counts (ConllxCounts): the counts to update
+        ref_df (DataFrame): gold trees
+        ref_offsets (np.ndarray): sentence offsets of the gold trees
+        pred_df (DataFrame): parsed trees
+        pred_offsets (np.ndarray): sentence offsets of the parsed trees
+        aligned_trees (List[AlignedTree]): the aligned rows of every tree (see count_tree_columns)
+    """
+    rows = get_file_rows(aligned_trees, ref_offsets, pred_offsets)
+    for group, column in CONFUSION_GROUPS.items():
+        ref_codes, pred_codes, labels = get_label_codes(ref_df, pred_df, column)
+        labels.append(NULL_LABEL)
+        null_code = len(labels) - 1
+        pair_codes = gather_aligned(ref_codes, rows.ref_rows, null_code) * len(labels) + gather_aligned(pred_codes, rows.pred_rows, null_code)
+        matrix = np.bincount(pair_codes, minlength=len(labels) ** 2).reshape(len(labels), len(labels))
+        group_counts = counts.confusion_counts.setdefault(group, {})
+        for ref_code, pred_code in zip(*np.nonzero(matrix)):
+            label_counts = group_counts.setdefault(labels[ref_code], {})
+            label_counts[labels[pred_code]] = label_counts.get(labels[pred_code], 0) + int(matrix[ref_code, pred_code])
+
+def get_confusion_matrix(counts: ConllxCounts, group: str) -> Tuple[List[str], np.ndarray]:
+    """Returns the confusion matrix of a group of counts.confusion_counts.
+
+    Returns:
+        Tuple[List[str], np.ndarray]: the labels (NULL_LABEL last) and the
+            matrix, gold labels as rows and parsed labels as columns
+    """
+    group_counts = counts.confusion_counts.get(group, {})
+    labels = sorted({label for ref_label, label_counts in group_counts.items() for label in [ref_label, *label_counts]} - {NULL_LABEL})
+    labels.append(NULL_LABEL)
+    label_codes = {label: code for code, label in enumerate(labels)}
+    matrix = np.zeros((len(labels), len(labels)), dtype=np.int64)
+    for ref_label, label_counts in group_counts.items():
+        for pred_label, count in label_counts.items():
+            matrix[label_codes[ref_label], label_codes[pred_label]] = count
+    return labels, matrix
+
+def save_confusion_matrices(counts: ConllxCounts, path) -> List[Path]:
+    """Saves the confusion matrices of counts.confusion_counts, all in one
+    file if path ends with .npz (the labels of a group as <group>_labels and
+    its matrix as <group>), else as a TSV file per group (<path stem>_<group>.tsv).
+
+    Returns:
+        List[Path]: the saved files
+    """
+    path = Path(path)
+    matrices = {group: get_confusion_matrix(counts, group) for group in CONFUSION_GROUPS}
+    if path.suffix == '.npz':
+        arrays = {}
+        for group, (labels, matrix) in matrices.items():
+            arrays[f'{group}_labels'] = np.array(labels)
+            arrays[group] = matrix
+        np.savez_compressed(path, **arrays)
+        return [path]
+    paths = []
+    for group, (labels, matrix) in matrices.items():
+        group_path = path.with_name(f'{path.stem}_{group}.tsv')
+        DataFrame(matrix, index=pd.Index(labels, name='gold\\parsed'), columns=labels).to_csv(group_path, sep='\t')
+        paths.append(group_path)
+    return paths
@@ -1,6 +1,7 @@
 from dataclasses import dataclass
-from typing import List, Union
+from typing import Iterator, List, NamedTuple, Union
 
+import numpy as np
 from pandas.core.frame import DataFrame
 from pandas.core.series import Series
 
@@ -29,77 +30,203 @@ def get_sentence_column_data(sen_df: DataFrame, column_name: str) -> List[Series
     return list(sen_df[column_name])
 
 
-def get_children_ids_of(sen_df, current_token_id) -> List[int]:
+class SentenceTree(NamedTuple):
+    """Array view of a tree, built once per sentence. Node 0 is the root and
+    node i the i-th token of the sentence, so children lists, depths and
+    spans are array lookups instead of DataFrame filters.
+    """
+    # ID, HEAD, FORM, UPOS and DEPREL of every node (0, -1, ROOT, ROOT and --- for the root)
+    ids: np.ndarray
+    heads: np.ndarray
+    forms: np.ndarray
+    upos: np.ndarray
+    deprels: np.ndarray
+    # node of the head of every node, -1 for the root and for heads that are not in the tree
+    parents: np.ndarray
+    # children of node i (by ID): children[child_offsets[i]:child_offsets[i+1]]
+    child_offsets: np.ndarray
+    children: np.ndarray
+    # depth of every node (0 for the root), -1 for nodes not reachable from the root
+    depths: np.ndarray
+    # first and last node of the subtree of every node
+    subtree_starts: np.ndarray
+    subtree_ends: np.ndarray
+    # whether the arc from the parent of every node is projective, i.e. its
+    # parent dominates every node between them
+    projective: np.ndarray
+
+def get_node_children(nodes: np.ndarray, child_offsets: np.ndarray, children: np.ndarray) -> np.ndarray:
+    """Returns the children of all the given nodes, in one gather."""
+    starts = child_offsets[nodes]
+    lengths = child_offsets[nodes + 1] - starts
+    positions = np.repeat(starts - np.cumsum(lengths) + lengths, lengths) + np.arange(lengths.sum())
+    return children[positions]
+
+def get_arc_projectivity(parents: np.ndarray, preorder: np.ndarray, sizes: np.ndarray) -> np.ndarray:
+    """Whether the arc from the parent of every node is projective: the nodes
+    between a node and its parent are all in the subtree of the parent, i.e.
+    their pre-order numbers are within the pre-order range of the parent.
+    The ranges of all the arcs are reduced in one np.minimum/maximum.reduceat,
+    in time linear in the total length of the arcs.
+    """
+    reachable = preorder >= 0
+    projective = reachable.copy()
+    nodes = np.flatnonzero(reachable & (parents >= 0))
+    heads = parents[nodes]
+    lows, highs = np.minimum(heads, nodes) + 1, np.maximum(heads, nodes)
+    spanning = lows < highs
+    nodes, heads, lows, highs = nodes[spanning], heads[spanning], lows[spanning], highs[spanning]
+    if nodes.shape[0]:
+        # sorted by their start, the gaps between the ranges add up to at most the tree size
+        order = np.argsort(lows, kind='stable')
+        nodes, heads, bounds = nodes[order], heads[order], np.stack([lows[order], highs[order]], axis=1).ravel()
+        lowest, highest = np.minimum.reduceat(preorder, bounds)[::2], np.maximum.reduceat(preorder, bounds)[::2]
+        projective[nodes] = (lowest >= preorder[heads]) & (highest < preorder[heads] + sizes[heads])
+    return projective
+
+def get_sentence_tree(sen_df: DataFrame) -> SentenceTree:
+    """Builds the array view of a tree. The children lists, depths, subtree
+    spans and pre-order numbers are computed level by level from the root,
+    each level with a few array operations, so the tree is read once instead
+    of filtering the DataFrame for every token.
+
+    Args:
+        sen_df (DataFrame): a sentence, with increasing IDs
+
+    Returns:
+        SentenceTree: the tree
+    """
+    token_count = sen_df.shape[0]
+    node_count = token_count + 1
+    ids = np.concatenate([[0], sen_df['ID'].to_numpy(dtype=np.int64)])
+    heads = np.concatenate([[-1], sen_df['HEAD'].to_numpy(dtype=np.int64)])
+    forms, upos, deprels = [np.concatenate([[root_value], sen_df[column].to_numpy(dtype=object)])
+                            for column, root_value in [('FORM', 'ROOT'), ('UPOS', 'ROOT'), ('DEPREL', '---')]]
+
+    head_nodes = np.minimum(np.searchsorted(ids, heads), token_count)
+    parents = np.where(ids[head_nodes] == heads, head_nodes, -1)
+    parents[0] = -1
+
+    # CSR children lists, a stable sort keeps the children of a node by ID
+    child_nodes = np.flatnonzero(parents >= 0)
+    children = child_nodes[np.argsort(parents[child_nodes], kind='stable')]
+    child_offsets = np.zeros(node_count + 1, dtype=np.int64)
+    np.cumsum(np.bincount(parents[child_nodes], minlength=node_count), out=child_offsets[1:])
+
+    # nodes in cycles or under a missing head are never reached from the root
+    levels = [np.zeros(1, dtype=np.int64)]
+    while True:
+        level = get_node_children(levels[-1], child_offsets, children)
+        if not level.shape[0]:
+            break
+        levels.append(level)
+    depths = np.full(node_count, -1, dtype=np.int64)
+    for depth, level in enumerate(levels):
+        depths[level] = depth
+
+    # bottom-up: subtree sizes and spans
+    sizes = np.ones(node_count, dtype=np.int64)
+    subtree_starts, subtree_ends = np.arange(node_count), np.arange(node_count)
+    for level in reversed(levels[1:]):
+        np.add.at(sizes, parents[level], sizes[level])
+        np.minimum.at(subtree_starts, parents[level], subtree_starts[level])
+        np.maximum.at(subtree_ends, parents[level], subtree_ends[level])
+
+    # top-down: the pre-order number of a node follows its parent and the subtrees of its previous siblings
+    child_sizes = np.cumsum(sizes[children])
+    group_starts = np.concatenate([[0], child_sizes])[child_offsets[:-1]]
+    previous_sizes = np.zeros(node_count, dtype=np.int64)
+    previous_sizes[children] = child_sizes - sizes[children] - np.repeat(group_starts, np.diff(child_offsets))
+    preorder = np.full(node_count, -1, dtype=np.int64)
+    preorder[0] = 0
+    for level in levels[1:]:
+        preorder[level] = preorder[parents[level]] + 1 + previous_sizes[level]
+
+    return SentenceTree(ids, heads, forms, upos, deprels, parents, child_offsets, children, depths,
+                        subtree_starts, subtree_ends, get_arc_projectivity(parents, preorder, sizes))
+
+def iter_sentence_trees(conllx) -> Iterator[SentenceTree]:
+    """Yields the array view of every tree of a file, in order."""
+    for sen_df in conllx.iter_sentences():
+        yield get_sentence_tree(sen_df)
+
+def to_sentence_tree(sentence: Union[DataFrame, SentenceTree]) -> SentenceTree:
+    """Returns the array view of a sentence, building it if given a DataFrame.
+    Pass the same SentenceTree to the helpers below to walk a tree in O(n).
+    """
+    return sentence if isinstance(sentence, SentenceTree) else get_sentence_tree(sentence)
+
+def get_node(tree: SentenceTree, token_id: int) -> int:
+    """Returns the node of a token ID, or -1 if the tree has no such token."""
+    node = int(np.searchsorted(tree.ids, token_id))
+    return node if node < tree.ids.shape[0] and tree.ids[node] == token_id else -1
+
+def get_children_ids_of(sen_df: Union[DataFrame, SentenceTree], current_token_id) -> List[int]:
     """Returns a list of ids of the children of the current token.
 
     Args:
+        sen_df (Union[DataFrame, SentenceTree]): tree data
         current_token_id (int): ID of the parent token
-        conllx_df (DataFrame): tree data
 
     Returns:
         List[int]: list of children ids
     """
-    # return list(conllx_df[conllx_df['HEAD'] == str(current_token_id)]["ID"])
-    return list(sen_df[sen_df['HEAD'] == current_token_id]["ID"])
+    tree = to_sentence_tree(sen_df)
+    node = get_node(tree, current_token_id)
+    if node < 0:
+        return []
+    return tree.ids[tree.children[tree.child_offsets[node]:tree.child_offsets[node + 1]]].tolist()
 
-def get_parent_id(sen_df: DataFrame, current_token_id: int) -> int:
+def get_parent_id(sen_df: Union[DataFrame, SentenceTree], current_token_id: int) -> int:
     """gets the id of the parent of the curent token
 
     Args:
+        sen_df (Union[DataFrame, SentenceTree]): dependency tree
         current_token_id (int): token id
-        conllx_df (DataFrame): dependency tree
 
     Returns:
         int: parent id
     """
     if current_token_id == 0: # root has no parent
         return -1
-    return int(sen_df[sen_df['ID'] == current_token_id].to_dict('records')[0]['HEAD'])
+    tree = to_sentence_tree(sen_df)
+    node = get_node(tree, current_token_id)
+    if node < 0:
+        raise ValueError(f'token {current_token_id} not found')
+    return int(tree.heads[node])
+
+def get_node_token(tree: SentenceTree, node: int) -> SentenceToken:
+    """Returns the details of a node, without its parent details."""
+    return SentenceToken(
+        token_id=int(tree.ids[node]),
+        form=tree.forms[node],
+        pos=tree.upos[node],
+        head=int(tree.heads[node]),
+        deprel=tree.deprels[node],
+        parent_id=-1,
+        parent_form="",
+        parent_pos="",
+        direction=""
+    )
 
-def get_token_details(sen_df, tok_id) -> Union[SentenceToken, dict]:
+def get_token_details(sen_df: Union[DataFrame, SentenceTree], tok_id) -> Union[SentenceToken, dict]:
     """Returns a dictionary of token details, in ConllX format"""
-    if type(tok_id) == int:
+    if isinstance(tok_id, (int, np.integer)):
         pass
     elif tok_id.isdigit():
         tok_id = int(tok_id)
     else:
         raise ValueError("invalid parent ID!")
-    temp_details = sen_df[sen_df["ID"] == tok_id].to_dict('records')
-    
-    if temp_details:
-        temp_details = temp_details[0]
-        return SentenceToken(
-            token_id=temp_details['ID'],
-            form=temp_details['FORM'],
-            pos=temp_details['UPOS'],
-            head=temp_details['HEAD'],
-            deprel=temp_details['DEPREL'],
-            parent_id=-1,
-            parent_form="",
-            parent_pos="",
-            direction=""
-        )
-    elif tok_id == 0:
-        return SentenceToken(
-            token_id=0,
-            form="ROOT",
-            pos="ROOT",
-            head=-1,
-            deprel="---",
-            parent_id=-1,
-            parent_form="",
-            parent_pos="",
-            direction=""
-        )
-    else:
-        return {}
+    tree = to_sentence_tree(sen_df)
+    node = get_node(tree, tok_id)
+    return get_node_token(tree, node) if node >= 0 else {}
 
-def add_parent_details(sen_df, child: SentenceToken):
+def add_parent_details(sen_df: Union[DataFrame, SentenceTree], child: SentenceToken):
     # checks if parent exists and assigns it to parent_df_dict_item
-    parent_id = get_parent_id(sen_df, child.token_id)
+    tree = to_sentence_tree(sen_df)
+    parent_id = get_parent_id(tree, child.token_id)
     
-    if parent_df_dict_item := get_token_details(sen_df, parent_id):
-        # setattr(child, parent_id, parent_df_dict_item.token_id)
+    if parent_df_dict_item := get_token_details(tree, parent_id):
         child.parent_id = parent_df_dict_item.token_id
         child.parent_form = parent_df_dict_item.form
         child.parent_pos = parent_df_dict_item.pos
@@ -120,5 +247,51 @@ def get_sentence_form_column(conllx, sentence_number):
     return ' '.join(get_tree_column(conllx, sentence_number, 'FORM'))
 
 def get_all_sentence_form_columns(conllx):
-    sen_count = conllx.get_sentence_count()
-    return [get_sentence_form_column(conllx, sen) for sen in range(sen_count)]
+    return [' '.join(get_sentence_column_data(sen_df, 'FORM')) for sen_df in conllx.iter_sentences()]
+
+def get_sentence_tokens(sen_df: Union[DataFrame, SentenceTree]) -> List[SentenceToken]:
+    """Returns the details of every token of a tree, with its parent details
+    and direction (see add_parent_details and add_direction).
+    """
+    tree = to_sentence_tree(sen_df)
+    tokens = []
+    for node in range(1, tree.ids.shape[0]):
+        parent = tree.parents[node]
+        if parent < 0:
+            raise ValueError('parent not found')
+        token = get_node_token(tree, node)
+        token.parent_id, token.parent_form, token.parent_pos = int(tree.ids[parent]), tree.forms[parent], tree.upos[parent]
+        add_direction(token)
+        tokens.append(token)
+    return tokens
+
+def get_file_tokens(conllx) -> List[List[SentenceToken]]:
+    """Returns the tokens of every tree of a file with their parent details and
+    direction, as get_sentence_tokens does for a tree. The parents of all the
+    tokens are found with one search over the (sentence, ID) keys of the file.
+
+    Args:
+        conllx (ConllxDf): the trees
+
+    Returns:
+        List[List[SentenceToken]]: the tokens of every tree
+    """
+    file_df, offsets = conllx.get_sentence_range(0, conllx.get_sentence_count())
+    ids, heads = file_df['ID'].to_numpy(dtype=np.int64), file_df['HEAD'].to_numpy(dtype=np.int64)
+    forms, upos, deprels = [file_df[column].to_numpy(dtype=object) for column in ['FORM', 'UPOS', 'DEPREL']]
+    # IDs increase within a tree, so the (sentence, ID) keys are sorted
+    sentences = np.repeat(np.arange(offsets.shape[0] - 1), np.diff(offsets))
+    key_base = max(int(ids.max(initial=0)), int(heads.max(initial=0))) + 1
+    keys = sentences * key_base + ids
+    parent_rows = np.minimum(np.searchsorted(keys, sentences * key_base + heads), max(ids.shape[0] - 1, 0))
+    is_root = heads == 0
+    if not np.all(is_root | (keys[parent_rows] == sentences * key_base + heads)):
+        raise ValueError('parent not found')
+    parent_forms = np.where(is_root, 'ROOT', forms[parent_rows])
+    parent_upos = np.where(is_root, 'ROOT', upos[parent_rows])
+    directions = np.where(heads < ids, 'P-C', 'C-P')
+
+    tokens = [SentenceToken(token_id, form, pos, head, deprel, head, parent_form, parent_pos, direction)
+              for token_id, form, pos, head, deprel, parent_form, parent_pos, direction
+              in zip(ids.tolist(), forms, upos, heads.tolist(), deprels, parent_forms, parent_upos, directions.tolist())]
+    return [tokens[start:end] for start, end in zip(offsets[:-1].tolist(), offsets[1:].tolist())]
@@ -0,0 +1,75 @@
+from dataclasses import asdict, dataclass, field, fields
+import json
+from typing import Dict, List
+
+
+@dataclass
+class ConllxCounts:
+    """Raw counts obtained by comparing gold and parsed trees.
+
+    Counts of different files or sentence shards can be added together,
+    scores are only computed from the final counts (see conllx_scores),
+    so merged counts give the same scores as a single run.
+    """
+    sentence_count: int = 0
+    gold_token_count: int = 0
+    pred_token_count: int = 0
+    # matches are counted over the aligned trees
+    token_matches: int = 0
+    pos_matches: int = 0
+    head_matches: int = 0
+    label_matches: int = 0
+    label_head_matches: int = 0
+    # sentences where all heads/labels/both match
+    perfect_head_count: int = 0
+    perfect_label_count: int = 0
+    perfect_label_head_count: int = 0
+    # word accuracy is averaged over sentences, so word matches are summed
+    # by the gold word count of their sentence {gold_word_count: word_matches}
+    word_matches_by_length: Dict[int, int] = field(default_factory=dict)
+    # optional counts by label, {group: {label: [gold count, parsed count, correct count]}} (see breakdown)
+    breakdown_counts: Dict[str, Dict[str, List[int]]] = field(default_factory=dict)
+    # optional confusion counts, {group: {gold label: {parsed label: count}}} (see breakdown)
+    confusion_counts: Dict[str, Dict[str, Dict[str, int]]] = field(default_factory=dict)
+    
+    def __add__(self, other: 'ConllxCounts') -> 'ConllxCounts':
+        counts = ConllxCounts()
+        for f in fields(self):
+            if f.name not in ['word_matches_by_length', 'breakdown_counts', 'confusion_counts']:
+                setattr(counts, f.name, getattr(self, f.name) + getattr(other, f.name))
+        counts.word_matches_by_length = dict(self.word_matches_by_length)
+        for length, matches in other.word_matches_by_length.items():
+            counts.add_word_matches(length, matches)
+        for counts_to_add in [self.breakdown_counts, other.breakdown_counts]:
+            for group, label_counts in counts_to_add.items():
+                group_counts = counts.breakdown_counts.setdefault(group, {})
+                for label, label_count in label_counts.items():
+                    group_counts[label] = [a + b for a, b in zip(group_counts.get(label, [0, 0, 0]), label_count)]
+        for counts_to_add in [self.confusion_counts, other.confusion_counts]:
+            for group, label_counts in counts_to_add.items():
+                group_counts = counts.confusion_counts.setdefault(group, {})
+                for ref_label, pred_label_counts in label_counts.items():
+                    ref_label_counts = group_counts.setdefault(ref_label, {})
+                    for pred_label, count in pred_label_counts.items():
+                        ref_label_counts[pred_label] = ref_label_counts.get(pred_label, 0) + count
+        return counts
+    
+    def add_word_matches(self, gold_word_count: int, word_matches: int):
+        self.word_matches_by_length[gold_word_count] = self.word_matches_by_length.get(gold_word_count, 0) + word_matches
+    
+    def to_dict(self) -> dict:
+        return asdict(self)
+    
+    @staticmethod
+    def from_dict(counts_dict: dict) -> 'ConllxCounts':
+        counts = ConllxCounts(**counts_dict)
+        # JSON object keys are strings
+        counts.word_matches_by_length = {int(length): matches for length, matches in counts.word_matches_by_length.items()}
+        return counts
+    
+    def to_json(self) -> str:
+        return json.dumps(self.to_dict())
+    
+    @staticmethod
+    def from_json(counts_json: str) -> 'ConllxCounts':
+        return ConllxCounts.from_dict(json.loads(counts_json))
@@ -1,23 +1,89 @@
+import io
 from pathlib import Path
-import re
-from typing import List, Union
+from typing import Iterator, List, TextIO, Tuple, Union
 
+import numpy as np
 import pandas as pd
-from pandas import DataFrame
+from pandas import CategoricalDtype, DataFrame
+
+# label columns stored as categoricals by compact_conllx_dfs
+COMPACT_COLUMNS = ['UPOS', 'XPOS', 'FEATS', 'DEPREL']
     
+def iter_conllx_sentences(f: TextIO) -> Iterator[Tuple[List[List[str]], List[str]]]:
+    """Reads a CoNLL-X file one tree at a time.
+    Multiword token ranges (1-2) and empty nodes (1.1) are skipped; they are
+    not part of the basic tree and their IDs are not integers.
+
+    Args:
+        f (TextIO): an open CoNLL-X file (or any iterable of lines)
+
+    Yields:
+        Iterator[Tuple[List[List[str]], List[str]]]: the rows of a tree, split
+            into columns, and the comments of the tree
+    """
+    rows: List[List[str]] = []
+    comments: List[str] = []
+    for line in f:
+        # remove special character \ufeff, if file starts with it (it causes errors)
+        line = line.rstrip('\r\n').replace('\ufeff', '')
+        if not line.strip():
+            # a blank line ends the tree, comments without a tree carry over to the next one
+            if rows:
+                yield rows, comments
+                rows, comments = [], []
+        elif line.startswith('#'):
+            comments.append(line)
+        else:
+            columns = line.split('\t')
+            if '-' in columns[0] or '.' in columns[0]:
+                continue
+            rows.append(columns)
+    if rows:
+        yield rows, comments
+
+def compact_conllx_dfs(conllx_dfs: List['ConllxDf']):
+    """Converts the label columns (COMPACT_COLUMNS) of the given files to
+    categoricals sharing one vocabulary per column, and ID and HEAD to int32.
+    Since the vocabularies are shared, equal codes mean equal labels, and the
+    evaluation compares the codes instead of the strings.
+
+    Args:
+        conllx_dfs (List[ConllxDf]): files that will be compared, e.g. gold and parsed
+    """
+    for column in COMPACT_COLUMNS:
+        # '_' is the label of the rows inserted during alignment
+        labels = pd.unique(np.concatenate([['_']] + [conllx.df[column].to_numpy(dtype=object) for conllx in conllx_dfs]))
+        dtype = CategoricalDtype(labels)
+        for conllx in conllx_dfs:
+            conllx.df[column] = conllx.df[column].astype(dtype)
+    for conllx in conllx_dfs:
+        conllx.df[['ID', 'HEAD']] = conllx.df[['ID', 'HEAD']].astype(np.int32)
+
 class ConllxDf:
     def __init__(self, file_path='', data=None, header='conllu'):
         self.file_path = file_path
         self.data = data
-        if not data:
-            with open(self. file_path, 'r') as f:
-                self.data = ''.join(f.readlines())
-        # remove special character \ufeff, if file starts with it (it causes errors)
-        self.data: str = self.data.replace('\ufeff', '')
-
-        self._df: DataFrame = self.__init_conllx_df(header=header)
-        self._comments: List[List[str]] = self.__init_list_of_comments()
+        if data:
+            self.__init_from_sentences(iter_conllx_sentences(io.StringIO(data)), header)
+        else:
+            with open(self.file_path, 'r') as f:
+                self.__init_from_sentences(iter_conllx_sentences(f), header)
         
+    def __init_from_sentences(self, sentences, header):
+        """Initializes the class variables df, comments and the sentence
+        offset index from the trees of the reader.
+        """
+        conll_rows: List[List[str]] = []
+        self._comments: List[List[str]] = []
+        sentence_lengths: List[int] = [0]
+        for rows, comments in sentences:
+            conll_rows.extend(rows)
+            self._comments.append(comments)
+            sentence_lengths.append(len(rows))
+        
+        self._df: DataFrame = self.rows_to_df(conll_rows, header)
+        self._sentence_offsets: np.ndarray = np.cumsum(sentence_lengths)
+    
     @staticmethod
     def get_conllu_header() -> List[str]:
         """return the column header based on CoNLL-U.
@@ -36,69 +102,67 @@ class ConllxDf:
         """
         return ['ID', 'FORM', 'UPOS', 'HEAD', 'DEPREL', 'FEATS']
     
-    def __init_conllx_df(self, header) -> DataFrame:
-        """Initializes the class variable df as a DataFrame of all trees.
+    @staticmethod
+    def rows_to_df(conll_rows: List[List[str]], header='conllu') -> DataFrame:
+        """Given the rows of one or more trees split into columns,
+        return them as a DataFrame.
+
+        Args:
+            conll_rows (List[List[str]]): the rows
+            header (str, optional): 'conllu' or 'catib'. Defaults to 'conllu'.
 
         Returns:
-            DataFrame: the given conll file trees
+            DataFrame: the trees
         """
-        # get non-comment lines (ignores empty lines)
-        matcher = re.compile(r'^(?!#).+$', re.MULTILINE)
-        conll_rows: List[str] = matcher.findall(self.data)
+        if header not in ['conllu', 'catib']:
+            assert False, f'invalid header type {header}'
+        if not conll_rows:
+            return DataFrame(columns=ConllxDf.get_conllu_header())
         
-        # initialize DataFrame. Rows are placed in a single column (0), split column on \t
+        # rows with missing columns are padded with None
         df = DataFrame(conll_rows)
-        df = df[0].str.split('\t',expand=True)
         
         if header == 'catib':
-            df.columns = self.get_catib_header()
-            df = self.catib_to_conllx(df)
-        elif header == 'conllu':
+            df.columns = ConllxDf.get_catib_header()
+            df = ConllxDf.catib_to_conllx(df)
+        else:
             try:
-                df.columns = self.get_conllu_header()
+                df.columns = ConllxDf.get_conllu_header()
             except ValueError as e:
                 e.args += ("are you sure you are using the CoNLL-U header and not CATiB?",)
                 raise 
-        else:
-            assert False, f'invalid header type {header}'
         
         # child and parent IDs are ints
         df[['ID', 'HEAD']] = df[['ID', 'HEAD']].apply(pd.to_numeric)
         return df
     
-    def __init_list_of_comments(self) -> List[List[str]]:
-        """Initializes the class variable comments as a list of lists of comments.
-        Within the comments list:
-        Each list represents the comments of the given tree.
-        
-        An empty list represents a tree with no comments.
+    def __get_sentence_offsets_from_ids(self) -> np.ndarray:
+        """Computes the sentence offset index from the IDs. A new sentence starts
+        whenever the ID does not increase with respect to the previous row.
+
+        The index holds the starting row of every sentence, followed by the
+        total number of rows, so sentence i spans rows
+        [offsets[i], offsets[i+1]).
 
         Returns:
-            List[List[str]]: a list of lists of comments
+            np.ndarray: the sentence offsets
         """
-        # get lines starting with # and blank lines
-        # the blank lines represent the end of the tree/tree comments.
-        matcher = re.compile(r'^(\s*|#.*)$', re.MULTILINE)
-        
-        # a flat list of all comments
-        lines: List[str] = matcher.findall(self.data)
-        
-        # create a list of lists of comments
-        final_list: List[List[str]] = []
-        temp_list: List[str] = []
-        for line in lines:
-            if line == '': # an empty string represents the end of comments of the given tree.
-                final_list.append(temp_list)
-                temp_list = []
-            else:
-                temp_list.append(line)
-        return final_list
-    
+        ids = self._df['ID'].to_numpy()
+        if ids.shape[0] == 0:
+            return np.zeros(1, dtype=np.int64)
+        starts = np.flatnonzero(np.r_[True, ids[1:] <= ids[:-1]])
+        return np.append(starts, ids.shape[0])
+
+    def rebuild_sentence_index(self):
+        """Rebuilds the sentence offset index. Must be called after rows
+        are added to or removed from df in place.
+        """
+        self._sentence_offsets = self.__get_sentence_offsets_from_ids()
+
     def write(self, out_path, new_file_name='', add_tree_tokens=False):
         new_file_name = new_file_name if new_file_name else Path(self.file_path).name
         with open(f"{out_path}/{new_file_name}", 'w') as f:
-            for sen_idx in range(self.get_sentence_count()):
-                sen_df = self.get_df_by_id(sen_idx)
+            for sen_idx, sen_df in enumerate(self.iter_sentences()):
                 if self.comments[sen_idx]:
                     [f.write(f"{comm}\n") for comm in self.comments[sen_idx]]
                 if add_tree_tokens:
@@ -140,22 +204,54 @@ class ConllxDf:
             Union[DataFrame, None]: a DataFrame or None.
         """
         
-        # get starting point for each df
-        ids = self.df[self.df['ID'] == 1].index
         # invalid df_number i.e. larger than current list, or negative?
-        if df_number >= len(ids) or df_number < 0:
+        if df_number >= self.get_sentence_count() or df_number < 0:
             return None
-        # last df
-        if df_number == len(ids) - 1:
-            return self.df.loc[ids[df_number]:self.df.tail(1).index[0]]
-        # remaining df's
-        return self.df.loc[ids[df_number]:(ids[df_number+1]-1)]
+        start, end = self._sentence_offsets[df_number:df_number+2]
+        return self.df.iloc[start:end]
+    
+    def iter_sentences(self) -> Iterator[DataFrame]:
+        """Yields the DataFrame of every tree, in order.
+
+        Yields:
+            Iterator[DataFrame]: a tree
+        """
+        return self.iter_sentence_frames(self.df, self._sentence_offsets)
+    
+    @staticmethod
+    def iter_sentence_frames(df: DataFrame, offsets: np.ndarray) -> Iterator[DataFrame]:
+        """Yields the trees of a DataFrame given its sentence offsets.
+
+        Args:
+            df (DataFrame): trees
+            offsets (np.ndarray): starting row of every tree, followed by the row count
+
+        Yields:
+            Iterator[DataFrame]: a tree
+        """
+        for start, end in zip(offsets[:-1], offsets[1:]):
+            yield df.iloc[start:end]
+    
+    def get_sentence_range(self, start: int, end: int) -> Tuple[DataFrame, np.ndarray]:
+        """Given a range of tree numbers [start, end), return the rows of those
+        trees and their sentence offsets (relative to the first returned row).
+        Used to send a shard of the file to another process.
+
+        Args:
+            start (int): first tree number
+            end (int): tree number after the last tree
+
+        Returns:
+            Tuple[DataFrame, np.ndarray]: the trees and their offsets
+        """
+        offsets = self._sentence_offsets[start:end+1]
+        return self.df.iloc[offsets[0]:offsets[-1]], offsets - offsets[0]
     
     def get_comments_by_id(self, sentence_number):
         return self.comments[sentence_number]
     
     def get_sentence_count(self):
-        return self.df[self.df['ID'] == 1].index.shape[0]
+        return self._sentence_offsets.shape[0] - 1
     
     def get_texts(self) -> List[str]:
         return [s[0].split(" = ")[1] for s in self.comments]
@@ -167,6 +263,11 @@ class ConllxDf:
     def df(self) -> DataFrame:
         return self._df
     
+    @df.setter
+    def df(self, df: DataFrame):
+        self._df = df
+        self.rebuild_sentence_index()
+    
     @property
     def comments(self) -> List[List[str]]:
         return self._comments
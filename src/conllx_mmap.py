@@ -0,0 +1,123 @@
+import mmap
+import os
+import re
+from pathlib import Path
+from typing import Iterator, List, Optional, Tuple
+
+import numpy as np
+from pandas import DataFrame
+
+from conllx_df import ConllxDf, iter_conllx_sentences
+
+# runs of non-blank lines, i.e. the trees (and their comments) of the file
+BLOCK_MATCHER = re.compile(rb'(?:^[^\n]*\S[^\n]*(?:\n|\Z))+', re.MULTILINE)
+# a non-blank line that is not a comment, i.e. the block contains a tree
+ROW_MATCHER = re.compile(rb'^(?!#)[^\n]*\S', re.MULTILINE)
+
+
+class MappedConllxDf:
+    """Random access to the trees of a CoNLL-X file without reading it.
+
+    The file is memory-mapped and only the byte offsets of the trees are
+    indexed when it is opened. A tree is parsed when it is requested, so
+    memory is proportional to the trees that are accessed.
+
+    The index can be persisted next to the file (<file>.idx.npz) and is
+    reused as long as the size and modification time of the file match.
+    """
+    def __init__(self, file_path, header='conllu', persist_index=False):
+        self.file_path = file_path
+        self.header = header
+        self._file = open(file_path, 'rb')
+        file_size = os.fstat(self._file.fileno()).st_size
+        # empty files cannot be mapped
+        self._mmap: Optional[mmap.mmap] = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ) if file_size else None
+
+        self._sentence_ranges: np.ndarray = self.__init_sentence_ranges(persist_index)
+    
+    @property
+    def index_path(self) -> Path:
+        return Path(f'{self.file_path}.idx.npz')
+    
+    def __get_file_signature(self) -> np.ndarray:
+        stat = os.fstat(self._file.fileno())
+        return np.array([stat.st_size, stat.st_mtime_ns], dtype=np.int64)
+    
+    def __init_sentence_ranges(self, persist_index) -> np.ndarray:
+        """Loads the sentence index from the sidecar file if it is up to date,
+        otherwise builds it (and saves it if persist_index).
+
+        Returns:
+            np.ndarray: (start, end) byte offsets of every tree
+        """
+        signature = self.__get_file_signature()
+        if self.index_path.exists():
+            with np.load(self.index_path) as index:
+                if np.array_equal(index['signature'], signature):
+                    return index['ranges']
+        
+        ranges = self.__build_sentence_ranges()
+        if persist_index:
+            with open(self.index_path, 'wb') as f:
+                np.savez(f, ranges=ranges, signature=signature)
+        return ranges
+    
+    def __build_sentence_ranges(self) -> np.ndarray:
+        """Finds the byte offsets of the trees. Comments separated from their
+        tree by a blank line belong to the next tree, as in iter_conllx_sentences.
+
+        Returns:
+            np.ndarray: (start, end) byte offsets of every tree
+        """
+        if self._mmap is None:
+            return np.zeros((0, 2), dtype=np.int64)
+        
+        ranges: List[Tuple[int, int]] = []
+        start = None
+        for block in BLOCK_MATCHER.finditer(self._mmap):
+            start = block.start() if start is None else start
+            if ROW_MATCHER.search(self._mmap, block.start(), block.end()):
+                ranges.append((start, block.end()))
+                start = None
+        return np.array(ranges, dtype=np.int64).reshape(-1, 2)
+    
+    def __read_sentence(self, sentence_number: int) -> Tuple[List[List[str]], List[str]]:
+        start, end = self._sentence_ranges[sentence_number]
+        lines = self._mmap[start:end].decode('utf-8').split('\n')
+        return next(iter_conllx_sentences(lines), ([], []))
+
+    def get_sentence_count(self) -> int:
+        return self._sentence_ranges.shape[0]
+    
+    def get_df_by_id(self, df_number: int) -> Optional[DataFrame]:
+        """Given a tree number, parse and return the corresponding df.
+        The number must be between [0,sentence count), otherwise None is returned.
+
+        Args:
+            df_number (int): tree number
+
+        Returns:
+            Optional[DataFrame]: a DataFrame or None.
+        """
+        if df_number >= self.get_sentence_count() or df_number < 0:
+            return None
+        rows, _ = self.__read_sentence(df_number)
+        return ConllxDf.rows_to_df(rows, self.header)
+    
+    def get_comments_by_id(self, sentence_number: int) -> List[str]:
+        return self.__read_sentence(sentence_number)[1]
+    
+    def iter_sentences(self) -> Iterator[DataFrame]:
+        for sentence_number in range(self.get_sentence_count()):
+            yield self.get_df_by_id(sentence_number)
+    
+    def close(self):
+        if self._mmap is not None:
+            self._mmap.close()
+        self._file.close()
+    
+    def __enter__(self):
+        return self
+    
+    def __exit__(self, *args):
+        self.close()
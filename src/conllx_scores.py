@@ -0,0 +1,89 @@
+from fractions import Fraction
+from typing import Dict, List
+
+import numpy as np
+
+from conllx_counts import ConllxCounts
+
+
+def get_percentage(matches, total):
+    return 100 * np.divide(matches, total)
+
+def get_tokenization_scores(counts: ConllxCounts) -> Dict[str, float]:
+    token_recall = np.divide(counts.token_matches, counts.gold_token_count)
+    token_precision = np.divide(counts.token_matches, counts.pred_token_count)
+    f1_score = (2*token_precision*token_recall / (token_precision+token_recall))
+    return {
+        'tokenization_f1_score': f1_score*100,
+        'tokenization_recall': token_recall*100,
+        'tokenization_precision': token_precision*100,
+    }
+
+def get_word_accuracy(counts: ConllxCounts) -> float:
+    """Average of the sentence word accuracies. The sum is exact, so it
+    does not depend on the order in which counts were merged. Without
+    sentences it is nan, as the other scores.
+    """
+    if not counts.sentence_count:
+        return np.float64('nan')
+    accuracy_sum = sum(Fraction(matches, length) for length, matches in counts.word_matches_by_length.items())
+    return np.float64(100 * accuracy_sum / counts.sentence_count)
+
+def get_perfectly_parsed_percentage(perfect_count, sentence_count):
+    return np.divide(100 * perfect_count, sentence_count)
+
+def get_scores(counts: ConllxCounts) -> Dict[str, float]:
+    """Calculates the evaluation scores from the counts.
+
+    Args:
+        counts (ConllxCounts): counts of the compared trees
+
+    Returns:
+        Dict[str, float]: scores in percentages
+    """
+    tokenization_scores = get_tokenization_scores(counts)
+    # all scores are numpy floats, to be able to use numpys round function later
+    return {
+        'tokenization_f1_score': tokenization_scores['tokenization_f1_score'],
+        'tokenization_precision': tokenization_scores['tokenization_precision'],
+        'tokenization_recall': tokenization_scores['tokenization_recall'],
+        'word_accuracy': get_word_accuracy(counts),
+        'pos': get_percentage(counts.pos_matches, counts.gold_token_count),
+        'uas_score': get_percentage(counts.head_matches, counts.gold_token_count),
+        'label_score': get_percentage(counts.label_matches, counts.gold_token_count),
+        'las_score': get_percentage(counts.label_head_matches, counts.gold_token_count),
+        'pp_uas_score': get_perfectly_parsed_percentage(counts.perfect_head_count, counts.sentence_count),
+        'pp_label_score': get_perfectly_parsed_percentage(counts.perfect_label_count, counts.sentence_count),
+        'pp_las_score': get_perfectly_parsed_percentage(counts.perfect_label_head_count, counts.sentence_count)
+    }
+
+def get_breakdown_scores(counts: ConllxCounts) -> List[Dict[str, object]]:
+    """Calculates the precision, recall and F1 score of every label of the
+    breakdown counts (see breakdown.add_breakdown_counts).
+
+    Args:
+        counts (ConllxCounts): counts of the compared trees
+
+    Returns:
+        List[Dict[str, object]]: a row per group and label, with the counts and the scores in percentages
+    """
+    rows = []
+    for group, label_counts in counts.breakdown_counts.items():
+        # the most frequent gold labels first
+        for label, (gold_count, pred_count, correct_count) in sorted(label_counts.items(), key=lambda item: (-item[1][0], item[0])):
+            # a label that is never predicted (or not in the gold trees) has no precision (recall)
+            with np.errstate(divide='ignore', invalid='ignore'):
+                precision = get_percentage(correct_count, pred_count)
+                recall = get_percentage(correct_count, gold_count)
+            rows.append({
+                'group': group,
+                'label': label,
+                'gold_count': gold_count,
+                'pred_count': pred_count,
+                'correct_count': correct_count,
+                'precision': precision,
+                'recall': recall,
+                # 2PR / (P + R)
+                'f1_score': get_percentage(2 * correct_count, gold_count + pred_count),
+            })
+    return rows
@@ -0,0 +1,151 @@
+from dataclasses import fields
+import hashlib
+from itertools import zip_longest
+import json
+import os
+from pathlib import Path
+from typing import Callable, Dict, List, Optional, Tuple
+
+import numpy as np
+from pandas import DataFrame
+
+from alignment_cache import flush_alignment_cache
+from conllx_counts import ConllxCounts
+from conllx_df import ConllxDf, iter_conllx_sentences
+from tree_evaluation import count_tree_columns, get_tree_columns, iter_tree_columns
+
+# stored counts of another version (or other settings) are not reused
+MANIFEST_VERSION = 2
+# counts stored per sentence, in this order
+SENTENCE_FIELDS = [f.name for f in fields(ConllxCounts)
+                   if f.name not in ['word_matches_by_length', 'breakdown_counts', 'confusion_counts']]
+
+
+def get_file_hash(file_path) -> str:
+    digest = hashlib.sha256()
+    with open(file_path, 'rb') as f:
+        for block in iter(lambda: f.read(1 << 20), b''):
+            digest.update(block)
+    return digest.hexdigest()
+
+def get_sentence_hash(gold_rows: List[List[str]], parsed_rows: List[List[str]]) -> str:
+    """Hash of the rows of a gold and a parsed tree (comments do not affect the counts)."""
+    gold = '\n'.join('\t'.join(row) for row in gold_rows)
+    parsed = '\n'.join('\t'.join(row) for row in parsed_rows)
+    return hashlib.sha256(f'{gold}\0{parsed}'.encode('utf-8')).hexdigest()
+
+def sentence_counts_to_list(counts: ConllxCounts) -> list:
+    return [getattr(counts, name) for name in SENTENCE_FIELDS] + [list(counts.word_matches_by_length.items())]
+
+def sentence_counts_from_list(values: list) -> ConllxCounts:
+    counts = ConllxCounts(**dict(zip(SENTENCE_FIELDS, values)))
+    counts.word_matches_by_length = {length: matches for length, matches in values[-1]}
+    return counts
+
+
+class EvaluationManifest:
+    """Hashes and counts of the evaluated file pairs, kept between runs in a
+    JSON file, so that a run only compares the trees that changed.
+
+    For every file pair, the manifest holds the hashes of both files and
+    their counts, and the counts of every sentence pair keyed by the hash of
+    its gold and parsed rows. Counts add up exactly (see ConllxCounts), so
+    reused and new counts give the same scores as a full run.
+    """
+    def __init__(self, manifest_path, settings: dict, force_full=False):
+        self.manifest_path = Path(manifest_path)
+        self.settings = settings
+        self.entries: Dict[str, dict] = {}
+        if self.manifest_path.exists() and not force_full:
+            with open(self.manifest_path, 'r') as f:
+                manifest = json.load(f)
+            if manifest.get('version') == MANIFEST_VERSION and manifest.get('settings') == settings:
+                self.entries = manifest['files']
+
+    @staticmethod
+    def get_key(gold_path, parsed_path) -> str:
+        return f'{Path(gold_path).resolve()}\t{Path(parsed_path).resolve()}'
+
+    def get_entry(self, gold_path, parsed_path) -> Optional[dict]:
+        return self.entries.get(EvaluationManifest.get_key(gold_path, parsed_path))
+
+    def set_entry(self, gold_path, parsed_path, entry: dict):
+        self.entries[EvaluationManifest.get_key(gold_path, parsed_path)] = entry
+
+    def save(self):
+        # written to a temporary file first, so an interrupted run keeps the previous manifest
+        temp_path = self.manifest_path.with_name(f'{self.manifest_path.name}.tmp')
+        with open(temp_path, 'w') as f:
+            json.dump({'version': MANIFEST_VERSION, 'settings': self.settings, 'files': self.entries}, f)
+        os.replace(temp_path, self.manifest_path)
+
+
+def count_sentence_pairs(sentence_pairs: List[Tuple[List[List[str]], List[List[str]]]],
+                         normalize: Optional[Callable[[DataFrame], None]], header: str) -> List[ConllxCounts]:
+    """Counts every (gold rows, parsed rows) pair separately. The rows of all
+    the pairs are read and normalized together, as for a whole file.
+
+    Returns:
+        List[ConllxCounts]: the counts of every sentence pair
+    """
+    if not sentence_pairs:
+        return []
+    gold_df = ConllxDf.rows_to_df([row for gold_rows, _ in sentence_pairs for row in gold_rows], header)
+    parsed_df = ConllxDf.rows_to_df([row for _, parsed_rows in sentence_pairs for row in parsed_rows], header)
+    if normalize:
+        normalize(gold_df)
+        normalize(parsed_df)
+    gold_offsets = np.cumsum([0] + [len(gold_rows) for gold_rows, _ in sentence_pairs])
+    parsed_offsets = np.cumsum([0] + [len(parsed_rows) for _, parsed_rows in sentence_pairs])
+
+    sentence_counts = []
+    gold_columns, parsed_columns = get_tree_columns(gold_df, parsed_df)
+    for gold_tree, parsed_tree in zip(iter_tree_columns(gold_columns, gold_offsets), iter_tree_columns(parsed_columns, parsed_offsets)):
+        counts = ConllxCounts()
+        count_tree_columns(gold_tree, parsed_tree, counts)
+        sentence_counts.append(counts)
+    return sentence_counts
+
+def count_conllx_files_incremental(gold_path, parsed_path, entry: Optional[dict],
+                                   normalize: Optional[Callable[[DataFrame], None]] = None,
+                                   header='conllu') -> Tuple[ConllxCounts, dict]:
+    """Compares a gold and a parsed file, reusing the counts of the manifest
+    entry of an earlier run. Unchanged files are not read, only the sentence
+    pairs of changed files that are not in the entry are aligned.
+
+    Args:
+        gold_path: gold CoNLL-X file
+        parsed_path: parsed CoNLL-X file
+        entry (Optional[dict]): the manifest entry of the file pair, None if there is none
+        normalize (Callable[[DataFrame], None], optional): applied to the trees
+            before the comparison. Defaults to None.
+        header (str, optional): 'conllu' or 'catib'. Defaults to 'conllu'.
+
+    Returns:
+        Tuple[ConllxCounts, dict]: counts of the compared trees and the new manifest entry
+    """
+    gold_hash, parsed_hash = get_file_hash(gold_path), get_file_hash(parsed_path)
+    if entry and entry['gold_hash'] == gold_hash and entry['parsed_hash'] == parsed_hash:
+        return ConllxCounts.from_dict(entry['counts']), entry
+
+    stored_sentences = entry['sentences'] if entry else {}
+    sentence_hashes = []
+    new_sentence_pairs = {}
+    with open(gold_path, 'r') as gold_f, open(parsed_path, 'r') as parsed_f:
+        for gold_sentence, parsed_sentence in zip_longest(iter_conllx_sentences(gold_f), iter_conllx_sentences(parsed_f)):
+            assert gold_sentence is not None and parsed_sentence is not None, 'the files have a different number of trees'
+            sentence_hash = get_sentence_hash(gold_sentence[0], parsed_sentence[0])
+            sentence_hashes.append(sentence_hash)
+            if sentence_hash not in stored_sentences:
+                new_sentence_pairs[sentence_hash] = (gold_sentence[0], parsed_sentence[0])
+
+    new_counts = count_sentence_pairs(list(new_sentence_pairs.values()), normalize, header)
+    sentences = {sentence_hash: stored_sentences[sentence_hash] for sentence_hash in sentence_hashes
+                 if sentence_hash in stored_sentences}
+    sentences.update(zip(new_sentence_pairs, map(sentence_counts_to_list, new_counts)))
+
+    counts = ConllxCounts()
+    for sentence_hash in sentence_hashes:
+        counts += sentence_counts_from_list(sentences[sentence_hash])
+    flush_alignment_cache()
+    return counts, {'gold_hash': gold_hash, 'parsed_hash': parsed_hash, 'counts': counts.to_dict(), 'sentences': sentences}
@@ -24,7 +24,25 @@
 import sys
 import math
 from collections import deque
+from functools import lru_cache
 import editdistance
+import numpy as np
+
+# engine used by align_words when none is given: 'numpy' or 'python'
+DEFAULT_ENGINE = 'numpy'
+
+# op codes of the numpy engine, indexed by the values stored in its op table
+_OPS = ('n', 's', 'd', 'i')
+_N, _S, _D, _I = range(4)
+
+# the numpy engine fills a band of diagonals of the table around the main
+# diagonal for sentences of at least BAND_MIN_LENGTH tokens, starting with
+# BAND_START diagonals on each side and doubling until the alignment is exact
+BAND_MIN_LENGTH = 64
+BAND_START = 4
+
+# number of token pairs whose substitution cost is kept in the process-wide cache
+DEFAULT_SUBSTITUTION_CACHE_SIZE = 2 ** 16
 
 def _print_table(tbl, m, n):
     for i in range(0, m + 1):
@@ -65,31 +83,235 @@ def _edit_distance(tokens1, tokens2, weight_fns):
     return tbl
 
 
-def _gen_alignments(tokens1, tokens2):
-    weight_fns = {
-        's': lambda x, y: editdistance.eval(x, y) * 2 / max(len(x), len (y)),
-        'd': lambda x: 1,
-        'i': lambda x: 1
-    }
-    # weight_fns = {
-    #     's': lambda x, y: editdistance.eval(x, y),
-    #     'd': lambda x: len(x),
-    #     'i': lambda x: len(x)
-    # }
+def _substitution_cost(x, y):
+    return editdistance.eval(x, y) * 2 / max(len(x), len(y))
 
-    dist_table = _edit_distance(tokens1, tokens2, weight_fns)
 
+_cached_substitution_cost = lru_cache(maxsize=DEFAULT_SUBSTITUTION_CACHE_SIZE)(_substitution_cost)
+
+
+def set_substitution_cache_size(max_size):
+    """Replaces the substitution cost cache by an empty one holding up to
+    max_size token pairs (None for no limit, 0 disables caching)."""
+    global _cached_substitution_cost
+    _cached_substitution_cost = lru_cache(maxsize=max_size)(_substitution_cost)
+
+
+def get_substitution_cache_info():
+    """Returns the hits, misses, maxsize and currsize of the substitution cost cache."""
+    return _cached_substitution_cost.cache_info()
+
+
+def substitution_cost(x, y):
+    # the cost is symmetric, so both orders share a cache entry
+    return _cached_substitution_cost(x, y) if x <= y else _cached_substitution_cost(y, x)
+
+
+def substitution_matrix(tokens1, tokens2):
+    """Returns the m x n matrix of substitution costs of two token lists.
+    Repeated tokens are deduplicated first, so each distinct pair is looked
+    up once, and the costs of pairs seen before come from the cache."""
+    return _substitution_costs(tokens1, tokens2)[0]
+
+
+def _substitution_costs(tokens1, tokens2):
+    # map both sides onto one vocabulary so each distinct pair is computed once
+    vocab = {tok: k for k, tok in enumerate(dict.fromkeys(tokens1 + tokens2))}
+    words = list(vocab)
+    codes1 = np.array([vocab[tok] for tok in tokens1], dtype=np.int64)
+    codes2 = np.array([vocab[tok] for tok in tokens2], dtype=np.int64)
+    uniq1 = np.unique(codes1)
+    uniq2 = np.unique(codes2)
+
+    # same operations as the 's' weight function, so the floats are identical
+    costs = np.array([[0.0 if x == y else substitution_cost(words[x], words[y]) for y in uniq2] for x in uniq1],
+                     dtype=np.float64).reshape(uniq1.shape[0], uniq2.shape[0])
+
+    rows = np.searchsorted(uniq1, codes1)
+    cols = np.searchsorted(uniq2, codes2)
+    return costs[np.ix_(rows, cols)], codes1[:, None] == codes2[None, :]
+
+
+def _edit_distance_np(tokens1, tokens2):
+    # same table as _edit_distance, stored as a cost matrix and an op matrix
+    # and filled one anti-diagonal at a time. Every cell only depends on the
+    # two previous anti-diagonals, so each cell sees exactly the same float
+    # operations as in the dict version.
+    m = len(tokens1)
+    n = len(tokens2)
+
+    costs = np.zeros((m + 1, n + 1), dtype=np.float64)
+    ops = np.full((m + 1, n + 1), _N, dtype=np.uint8)
+    costs[1:, 0] = np.arange(1, m + 1)
+    ops[1:, 0] = _D
+    costs[0, 1:] = np.arange(1, n + 1)
+    ops[0, 1:] = _I
+
+    if m == 0 or n == 0:
+        return costs, ops
+
+    sub_costs, equal = _substitution_costs(tokens1, tokens2)
+    sub_costs[equal] = 0
+    edit_ops = np.where(equal, _N, _S).astype(np.uint8).ravel()
+    sub_costs = sub_costs.ravel()
+
+    # work on flat views, cell (i, j) is at i * width + j
+    width = n + 1
+    flat_costs = costs.ravel()
+    flat_ops = ops.ravel()
+    for diag in range(2, m + n + 1):
+        ii = np.arange(max(1, diag - n), min(m, diag - 1) + 1)
+        cells = ii * (width - 1) + diag
+        subs = cells - width - ii
+
+        insert_cost = flat_costs[cells - width] + 1
+        delete_cost = flat_costs[cells - 1] + 1
+        edit_cost = flat_costs[cells - width - 1] + sub_costs[subs]
+
+        # min([insert, delete, edit]) keeps the first of equal costs
+        use_insert = (insert_cost <= delete_cost) & (insert_cost <= edit_cost)
+        use_delete = ~use_insert & (delete_cost <= edit_cost)
+
+        cell_ops = edit_ops[subs]
+        cell_ops[use_delete] = _I
+        cell_ops[use_insert] = _D
+        edit_cost[use_delete] = delete_cost[use_delete]
+        edit_cost[use_insert] = insert_cost[use_insert]
+        flat_costs[cells] = edit_cost
+        flat_ops[cells] = cell_ops
+
+    return costs, ops
+
+
+def _band_substitution_costs(codes1, codes2, words, lowest, highest):
+    # substitution costs and edit ops of the cells (i, j) with lowest <= j - i <= highest,
+    # in the band layout of _edit_distance_banded, each distinct pair of the band is looked up once
+    m = codes1.shape[0]
+    n = codes2.shape[0]
+    stride = highest - lowest + 3
+    rows = [np.arange(max(1, 1 - d), min(m, n - d) + 1) for d in range(lowest, highest + 1)]
+    ii = np.concatenate(rows)
+    jj = ii + np.repeat(np.arange(lowest, highest + 1), [r.shape[0] for r in rows])
+
+    pairs = codes1[ii - 1] * len(words) + codes2[jj - 1]
+    uniq, inverse = np.unique(pairs, return_inverse=True)
+    uniq_costs = np.array([0.0 if x == y else substitution_cost(words[x], words[y])
+                           for x, y in zip(*np.divmod(uniq, len(words)))], dtype=np.float64)
+
+    cells = ii * stride + jj - ii - (lowest - 1)
+    sub_costs = np.zeros((m + 1) * stride, dtype=np.float64)
+    sub_costs[cells] = uniq_costs[inverse.ravel()]
+    edit_ops = np.full((m + 1) * stride, _S, dtype=np.uint8)
+    edit_ops[cells[codes1[ii - 1] == codes2[jj - 1]]] = _N
+    return sub_costs, edit_ops
+
+
+def _edit_distance_banded(tokens1, tokens2, band):
+    # same table as _edit_distance_np, but only the cells within band diagonals
+    # of the diagonals of (0, 0) and (m, n) are filled, the others cost inf.
+    # Only the band and one diagonal on each side of it are stored: cell (i, j)
+    # is at row i and column j - i - (lowest - 1), so memory is O(m * band).
+    # Next to the costs, every cell keeps a lower bound of its cost in the full
+    # table and whether its cost and op may differ from the full table:
+    # - a cell outside the band needs at least |j - i| insertions or deletions,
+    #   so it costs at least |j - i| (float sums of costs >= 0 are monotone)
+    # - a cell is exact if the candidates of the cells that may differ cost
+    #   more than its cost, then the full table picks the same candidate
+    # The backtrace only follows exact cells from an exact (m, n), which are
+    # all stored, so the alignment is the same as with the full table.
+    # Returns the costs, the ops and the column offset, or None otherwise.
+    m = len(tokens1)
+    n = len(tokens2)
+    lowest = min(0, n - m) - band
+    highest = max(0, n - m) + band
+    offset = lowest - 1
+    stride = highest - lowest + 3
+
+    vocab = {tok: k for k, tok in enumerate(dict.fromkeys(tokens1 + tokens2))}
+    words = list(vocab)
+    codes1 = np.array([vocab[tok] for tok in tokens1], dtype=np.int64)
+    codes2 = np.array([vocab[tok] for tok in tokens2], dtype=np.int64)
+    sub_costs, edit_ops = _band_substitution_costs(codes1, codes2, words, lowest, highest)
+
+    costs = np.full((m + 1, stride), np.inf)
+    ops = np.full((m + 1, stride), _N, dtype=np.uint8)
+    lower = np.repeat(np.abs(np.arange(offset, offset + stride, dtype=np.float64))[None, :], m + 1, axis=0)
+    inexact = np.ones((m + 1, stride), dtype=bool)
+    # the stored cells of the first row and column are the same as in the full table
+    first_row = np.arange(min(n, offset + stride - 1) + 1)
+    costs[0, first_row - offset] = first_row
+    ops[0, first_row[1:] - offset] = _I
+    inexact[0, first_row - offset] = False
+    first_column = np.arange(1, min(m, -offset) + 1)
+    costs[first_column, -first_column - offset] = first_column
+    ops[first_column, -first_column - offset] = _D
+    inexact[first_column, -first_column - offset] = False
+
+    flat_costs = costs.ravel()
+    flat_ops = ops.ravel()
+    flat_lower = lower.ravel()
+    flat_inexact = inexact.ravel()
+    for diag in range(2, m + n + 1):
+        # cells of the anti-diagonal i + j = diag within the band
+        ii = np.arange(max(1, diag - n, -((highest - diag) // 2)), min(m, diag - 1, (diag - lowest) // 2) + 1)
+        cells = ii * (stride - 2) + diag - offset
+        # cells (i - 1, j), (i, j - 1) and (i - 1, j - 1)
+        preds = (cells - stride + 1, cells - 1, cells - stride)
+
+        insert_cost = flat_costs[preds[0]] + 1
+        delete_cost = flat_costs[preds[1]] + 1
+        edit_cost = flat_costs[preds[2]] + sub_costs[cells]
+
+        # min([insert, delete, edit]) keeps the first of equal costs
+        use_insert = (insert_cost <= delete_cost) & (insert_cost <= edit_cost)
+        use_delete = ~use_insert & (delete_cost <= edit_cost)
+
+        cell_ops = edit_ops[cells]
+        cell_ops[use_delete] = _I
+        cell_ops[use_insert] = _D
+        edit_cost[use_delete] = delete_cost[use_delete]
+        edit_cost[use_insert] = insert_cost[use_insert]
+        flat_costs[cells] = edit_cost
+        flat_ops[cells] = cell_ops
+
+        candidate_lower = (flat_lower[preds[0]] + 1, flat_lower[preds[1]] + 1, flat_lower[preds[2]] + sub_costs[cells])
+        cell_lower = np.minimum(np.minimum(candidate_lower[0], candidate_lower[1]), candidate_lower[2])
+        cell_inexact = np.zeros(cells.shape[0], dtype=bool)
+        for pred, pred_lower in zip(preds, candidate_lower):
+            cell_inexact |= flat_inexact[pred] & (pred_lower <= edit_cost)
+        flat_inexact[cells] = cell_inexact
+        flat_lower[cells] = np.where(cell_inexact, cell_lower, edit_cost)
+
+    if inexact[m, n - m - offset]:
+        return None
+    return costs, ops, offset
+
+
+def _edit_distance_adaptive(tokens1, tokens2):
+    # banded table for long sentences, widened until its alignment is exact,
+    # so the cost grows with the number of edits rather than with m * n.
+    # Returns a function giving the cost and op of a cell (i, j)
     m = len(tokens1)
     n = len(tokens2)
+    band = BAND_START
+    while min(m, n) >= BAND_MIN_LENGTH and band < max(m, n):
+        table = _edit_distance_banded(tokens1, tokens2, band)
+        if table is not None:
+            costs, ops, offset = table
+            return lambda i, j: (costs[i, j - i - offset], _OPS[ops[i, j - i - offset]])
+        band *= 2
+    costs, ops = _edit_distance_np(tokens1, tokens2)
+    return lambda i, j: (costs[i, j], _OPS[ops[i, j]])
 
+
+def _backtrace(cell, m, n):
     alignments = deque()
 
     i = m
     j = n
 
     while i != 0 or j != 0:
-        op = dist_table[(i, j)][1]
-        cost = dist_table[(i, j)][0]
+        cost, op = cell(i, j)
 
         if op == 'n' or op == 's':
             alignments.appendleft((i, j, op, cost))
@@ -107,10 +329,48 @@ def _gen_alignments(tokens1, tokens2):
     return alignments
 
 
-def align_words(s1, s2):
+def _restore_cost_types(alignments):
+    # the dict version only holds floats from the first substitution onwards,
+    # keep the costs of the numpy engine the same type
+    seen_sub = False
+    restored = deque()
+    for i, j, op, cost in alignments:
+        seen_sub = seen_sub or op == 's'
+        restored.append((i, j, op, float(cost) if seen_sub else int(cost)))
+    return restored
+
+
+def _gen_alignments(tokens1, tokens2, engine=None):
+    engine = engine if engine else DEFAULT_ENGINE
+    m = len(tokens1)
+    n = len(tokens2)
+
+    if engine == 'numpy':
+        alignments = _backtrace(_edit_distance_adaptive(tokens1, tokens2), m, n)
+        return _restore_cost_types(alignments)
+    elif engine != 'python':
+        raise ValueError(f'invalid alignment engine {engine}')
+
+    weight_fns = {
+        's': substitution_cost,
+        'd': lambda x: 1,
+        'i': lambda x: 1
+    }
+    # weight_fns = {
+    #     's': lambda x, y: editdistance.eval(x, y),
+    #     'd': lambda x: len(x),
+    #     'i': lambda x: len(x)
+    # }
+
+    dist_table = _edit_distance(tokens1, tokens2, weight_fns)
+
+    return _backtrace(lambda i, j: dist_table[(i, j)], m, n)
+
+
+def align_words(s1, s2, engine=None):
     s1_tokens = s1.split()
     s2_tokens = s2.split()
 
-    alignments = _gen_alignments(s1_tokens, s2_tokens)
+    alignments = _gen_alignments(s1_tokens, s2_tokens, engine)
 
     return list(alignments)
@@ -1,12 +1,24 @@
 """
 Evaluates a parsed CoNLL file against gold or 
     a directory containing parsed CoNLL files against a gold directory.
+    With several parsed directories (one per system), the gold directory
+    is read once and the systems are compared in one table.
 
 Usage:
-    evaluate_conllx_driver ((-g <gold> | --gold=<gold>) (-p <parsed> | --parsed=<parsed>) | ((--gold_dir=<gold_dir>) (--parsed_dir=<parsed_dir>)))
+    evaluate_conllx_driver ((-g <gold> | --gold=<gold>) (-p <parsed> | --parsed=<parsed>) | ((--gold_dir=<gold_dir>) (--parsed_dir=<parsed_dir>)...))
         [-x | --transliterate_pnx]
         [-n | --transliterate_num]
         [-a | --normalize_alef_yeh_ta]
+        [-j <jobs> | --jobs=<jobs>]
+        [-s | --stream]
+        [-c | --compact]
+        [-b | --breakdown]
+        [--confusion=<confusion>]
+        [--cache_dir=<cache_dir>]
+        [--cache_size=<cache_size>]
+        [--profile]
+        [--cprofile=<cprofile>]
+        [--manifest=<manifest> [-f | --full]]
     evaluate_conllx_driver (-h | --help)
 
 Options:
@@ -17,27 +29,80 @@ Options:
     --gold_dir=<gold_dir>
         The directory containing gold CoNLL files.
     --parsed_dir=<parsed_dir>
-        The directory containing parsed CoNLL files.
+        The directory containing parsed CoNLL files. Can be given several
+        times to compare systems, the results then have a column per system
+        (--stream, --compact and --manifest are not supported)
     -x --transliterate_pnx
         Transliterate punctuation to Roman script (punctuation will always match regardless of script)
     -n --transliterate_num
         Transliterate numbers to Roman script (numbers will always match regardless of script)
     -a --normalize_alef_yeh_ta
         Normalizes alef, alef maksura, and teh marbuta
+    -j <jobs> --jobs=<jobs>
+        Number of processes. Directories are evaluated a file pair per process,
+        a single file pair is split into sentence shards [default: 1]
+    -s --stream
+        Read and compare the files one tree at a time (bounded memory).
+        A single file pair is then evaluated serially
+    -c --compact
+        Store the label columns as categoricals shared by the gold and parsed
+        files, and ID and HEAD as int32 (less memory, faster comparisons).
+        Not supported with --stream
+    -b --breakdown
+        Also score every DEPREL, UPOS, head direction and dependency length
+        (precision, recall and F1 over all the files), saved in breakdown.tsv.
+        Not supported with --manifest
+    --confusion=<confusion>
+        Save the UPOS and DEPREL confusion matrices over all the files (gold
+        labels as rows, parsed labels as columns) in <confusion> if it ends
+        with .npz, else in <confusion stem>_upos.tsv and _deprel.tsv.
+        With several parsed directories, the system name is added to the
+        stem. Not supported with --manifest
+    --cache_dir=<cache_dir>
+        Directory of the alignment cache. Alignments of sentence pairs seen in
+        earlier runs are read from the cache instead of being computed again
+    --cache_size=<cache_size>
+        Number of alignments kept in the cache, the least recently used
+        alignments are evicted [default: 1000000]
+    --profile
+        Record the wall time, calls and peak memory of every stage, in total
+        and per file, and the slowest sentences, and save them in profile.json.
+        The files are evaluated in this process (--jobs is ignored)
+    --cprofile=<cprofile>
+        Save cProfile statistics of the evaluation to this file (see pstats).
+        The files are evaluated in this process (--jobs is ignored)
+    --manifest=<manifest>
+        JSON file with the hashes and counts of the evaluated files and
+        sentences. Only the files and sentences that changed since the last
+        run with the same manifest are compared again
+    -f --full
+        Compare all the files and sentences, and rewrite the manifest
     -h --help
         Show this screen.
 
 """
 
+from functools import partial
+import json
 import pathlib
+from typing import TYPE_CHECKING
 from docopt import docopt
 
-from pandas import DataFrame, Series
-from conllx_df import ConllxDf
-from tree_evaluation import compare_conll_trees
-from utils.utils import get_file_names, transliterate_and_normalize
+from alignment_cache import (add_worker_cache_stats, call_with_cache_stats, get_alignment_cache_settings,
+                             get_alignment_cache_stats, set_alignment_cache)
+from conllx_counts import ConllxCounts
+from profiling import disable_profiling, enable_profiling, get_profile, profile_stage
+from utils.utils import get_file_names, normalize_df, transliterate_and_normalize
 
-arguments = docopt(__doc__)
+# the modules of the evaluation itself (pandas, numpy), the process pool and
+# the profilers are imported where they are used, so that the usage, argument
+# errors and the options that are not used do not pay for their import
+if TYPE_CHECKING:
+    from evaluation_manifest import EvaluationManifest
+
+# gold trees of every gold file of a comparison of systems, by file index
+# (set in this process and in the workers, see init_worker)
+_gold_files = None
 
 def get_synced_file_names(gold_file_names, parsed_file_names):
     tuple_list = []
@@ -47,6 +112,213 @@ def get_synced_file_names(gold_file_names, parsed_file_names):
         tuple_list.append((gold_file, parsed_file))
     return tuple_list
 
+def evaluate_file_pair(gold_path, parsed_path, arguments, sentence_jobs=1):
+    """Reads, normalizes and compares a gold and a parsed file.
+
+    Returns:
+        tuple(str, ConllxCounts): the file name without extension and the counts
+    """
+    file_name = '.'.join(gold_path.name.split('.')[:-1])
+    profile = get_profile()
+    if profile:
+        profile.start_file(file_name)
+    from conllx_df import ConllxDf, compact_conllx_dfs
+    from tree_evaluation import count_conllx_files, get_conll_counts
+    if arguments['--stream']:
+        return file_name, count_conllx_files(gold_path, parsed_path, partial(normalize_df, arguments),
+                                             breakdown=arguments['--breakdown'], confusion=bool(arguments['--confusion']))
+
+    with profile_stage('read'):
+        gold_conllx = ConllxDf(gold_path)
+        parsed_conllx = ConllxDf(parsed_path)
+
+    with profile_stage('normalize'):
+        transliterate_and_normalize(arguments, gold_conllx, parsed_conllx)
+        if arguments['--compact']:
+            compact_conllx_dfs([gold_conllx, parsed_conllx])
+    
+    return file_name, get_conll_counts(gold_conllx, parsed_conllx, sentence_jobs, arguments['--breakdown'], bool(arguments['--confusion']))
+
+def evaluate_indexed_file_pair(task):
+    index, gold_path, parsed_path, arguments = task
+    return index, evaluate_file_pair(gold_path, parsed_path, arguments)
+
+def evaluate_file_pair_incremental(task):
+    """Compares a gold and a parsed file, reusing the counts of their manifest entry.
+
+    Returns:
+        tuple(int, tuple(str, ConllxCounts), dict): the index of the pair,
+            its file name and counts, and its new manifest entry
+    """
+    from evaluation_manifest import count_conllx_files_incremental
+    index, gold_path, parsed_path, arguments, entry = task
+    file_name = '.'.join(gold_path.name.split('.')[:-1])
+    counts, entry = count_conllx_files_incremental(gold_path, parsed_path, entry, partial(normalize_df, arguments))
+    return index, (file_name, counts), entry
+
+def init_worker(cache_settings, gold_files):
+    global _gold_files
+    set_alignment_cache(*cache_settings)
+    _gold_files = gold_files
+
+def map_tasks(function, tasks, jobs):
+    """Yields function(task) for every task, using a process pool if jobs > 1,
+    in the order the tasks finish. Falls back to this process if the pool
+    cannot be started. The alignment cache lookups of the workers are added
+    to the cache stats of this process.
+    """
+    if jobs > 1 and len(tasks) > 1:
+        from multiprocessing import Pool
+        try:
+            # the workers use the alignment cache and the gold files of this process
+            pool = Pool(min(jobs, len(tasks)), initializer=init_worker,
+                        initargs=(get_alignment_cache_settings() or (None,), _gold_files))
+        except (OSError, NotImplementedError) as e:
+            print(f'could not start a process pool ({e}), evaluating files serially')
+        else:
+            with pool:
+                for result, cache_stats in pool.imap_unordered(partial(call_with_cache_stats, function), tasks):
+                    add_worker_cache_stats(*cache_stats)
+                    yield result
+            return
+    yield from map(function, tasks)
+
+def evaluate_file_pairs(path_pairs, arguments, jobs=1):
+    """Evaluates (gold_path, parsed_path) pairs, using a process pool if jobs > 1.
+    Falls back to evaluating in this process if the pool cannot be started.
+    A single pair is evaluated in this process, with its sentences split
+    across jobs processes instead.
+
+    Yields:
+        tuple(int, tuple(str, ConllxCounts)): the index of the pair in path_pairs
+            and its file name and counts, in the order the pairs finish
+    """
+    if len(path_pairs) == 1:
+        (gold_path, parsed_path), = path_pairs
+        yield 0, evaluate_file_pair(gold_path, parsed_path, arguments, jobs)
+        return
+    tasks = [(i, gold_path, parsed_path, arguments) for i, (gold_path, parsed_path) in enumerate(path_pairs)]
+    yield from map_tasks(evaluate_indexed_file_pair, tasks, jobs)
+
+def evaluate_file_pairs_incremental(path_pairs, arguments, manifest: 'EvaluationManifest', jobs=1):
+    """Same as evaluate_file_pairs, but only compares the trees that changed
+    since the manifest was saved, and updates the manifest.
+
+    Yields:
+        tuple(int, tuple(str, ConllxCounts)): the index of the pair in path_pairs
+            and its file name and counts, in the order the pairs finish
+    """
+    tasks = [(i, gold_path, parsed_path, arguments, manifest.get_entry(gold_path, parsed_path))
+             for i, (gold_path, parsed_path) in enumerate(path_pairs)]
+    for i, result, entry in map_tasks(evaluate_file_pair_incremental, tasks, jobs):
+        manifest.set_entry(*path_pairs[i], entry)
+        yield i, result
+
+def read_gold_files(gold_paths, arguments):
+    """Reads and normalizes the gold files once for all the systems.
+
+    Returns:
+        list(tuple(str, GoldTrees)): the file name without extension and the gold trees of every file
+    """
+    from conllx_df import ConllxDf
+    from tree_evaluation import get_gold_trees
+    gold_files = []
+    profile = get_profile()
+    for gold_path in gold_paths:
+        if profile:
+            profile.start_file(gold_path.name)
+        with profile_stage('read'):
+            gold_conllx = ConllxDf(gold_path)
+        with profile_stage('normalize'):
+            normalize_df(arguments, gold_conllx.df)
+            gold_trees = get_gold_trees(gold_conllx)
+        gold_files.append(('.'.join(gold_path.name.split('.')[:-1]), gold_trees))
+    return gold_files
+
+def evaluate_system_file(task):
+    """Compares a parsed file of a system with the gold trees of its file.
+
+    Returns:
+        tuple(int, int, ConllxCounts): the index of the system, the index
+            of the gold file and the counts
+    """
+    from conllx_df import ConllxDf
+    from tree_evaluation import count_gold_trees
+    system_index, file_index, system_name, parsed_path, arguments = task
+    file_name, gold_trees = _gold_files[file_index]
+    profile = get_profile()
+    if profile:
+        profile.start_file(f'{system_name}/{file_name}')
+    with profile_stage('read'):
+        parsed_conllx = ConllxDf(parsed_path)
+    with profile_stage('normalize'):
+        normalize_df(arguments, parsed_conllx.df)
+    return system_index, file_index, count_gold_trees(gold_trees, parsed_conllx, arguments['--breakdown'], bool(arguments['--confusion']))
+
+def evaluate_systems(gold_paths, system_paths, system_names, arguments, jobs=1):
+    """Compares the parsed files of several systems with the same gold files,
+    which are read and normalized once. The (system, file) pairs are
+    evaluated in a process pool if jobs > 1.
+
+    Args:
+        gold_paths (list): gold files
+        system_paths (list): the parsed files of every system, in the order of gold_paths
+        system_names (list): the name of every system
+        arguments (dict): normalization, breakdown and confusion flags
+
+    Yields:
+        tuple(int, int, tuple(str, ConllxCounts)): the index of the system,
+            the index of the gold file and its file name and counts, in the
+            order the pairs finish
+    """
+    global _gold_files
+    _gold_files = read_gold_files(gold_paths, arguments)
+    tasks = [(system_index, file_index, system_name, parsed_path, arguments)
+             for system_index, (system_name, parsed_paths) in enumerate(zip(system_names, system_paths))
+             for file_index, parsed_path in enumerate(parsed_paths)]
+    try:
+        for system_index, file_index, counts in map_tasks(evaluate_system_file, tasks, jobs):
+            yield system_index, file_index, (_gold_files[file_index][0], counts)
+    finally:
+        _gold_files = None
+
+def get_system_names(parsed_dirs):
+    """Names the systems by their directory, or by its path if two directories have the same name."""
+    names = [pathlib.Path(parsed_dir).name for parsed_dir in parsed_dirs]
+    if len(set(names)) < len(names):
+        return [str(parsed_dir) for parsed_dir in parsed_dirs]
+    return names
+
+def get_system_scores_df(system_scores):
+    """Combines the scores of every system into one table with a row per
+    file and score, and a column per system.
+
+    Args:
+        system_scores (dict): the list of file scores (as in results.tsv) of every system name
+
+    Returns:
+        DataFrame: the combined scores
+    """
+    from pandas import DataFrame
+    rows = {}
+    for system_name, scores_list in system_scores.items():
+        for scores in scores_list:
+            for score_name, score in scores.items():
+                if score_name != 'file_name':
+                    rows.setdefault((scores['file_name'], score_name), {})[system_name] = score
+    return DataFrame([{'file_name': file_name, 'score': score_name, **scores}
+                      for (file_name, score_name), scores in rows.items()])
+
+def print_profile(profile):
+    print(f"{'stage':<16}{'wall time (s)':>14}{'calls':>10}{'peak memory (MB)':>18}")
+    for name, stats in profile.stages.items():
+        print(f'{name:<16}{stats.wall_time:>14.3f}{stats.calls:>10}{stats.peak_memory / 2**20:>18.2f}')
+    print('slowest sentences:')
+    for sentence in profile.get_slowest_sentences():
+        print(f'  {sentence.file_name} #{sentence.sentence}: {sentence.wall_time:.4f} s, '
+              f'{sentence.gold_token_count} gold and {sentence.pred_token_count} parsed tokens, '
+              f'{sentence.alignment_op_count} alignment ops')
+
 def get_file_path_details(file_path):
     full_path = pathlib.Path(file_path)
     dir_path = full_path.parent
@@ -54,43 +326,132 @@ def get_file_path_details(file_path):
     return dir_path, file_name
 
 if __name__ == '__main__':
+    arguments = docopt(__doc__)
+    parsed_dirs = arguments["--parsed_dir"]
+    system_names = None
     if arguments["--gold"] and arguments["--parsed"]:
         gold_dir_path, gold_file_name = get_file_path_details(arguments["--gold"])
         parsed_dir_path, parsed_file_name = get_file_path_details(arguments["--parsed"])
         print('comparing two files')
         tuple_list = [(gold_file_name, parsed_file_name)]
-    elif arguments["--gold_dir"] and arguments["--parsed_dir"]:
+    elif arguments["--gold_dir"] and len(parsed_dirs) > 1:
+        if arguments['--stream'] or arguments['--compact'] or arguments['--manifest']:
+            raise ValueError('--stream, --compact and --manifest are not supported with several parsed directories')
+        print(f'comparing {len(parsed_dirs)} systems')
+        gold_dir_path = pathlib.Path(arguments["--gold_dir"])
+        gold_file_names = get_file_names(arguments["--gold_dir"], '.conllx')
+        system_names = get_system_names(parsed_dirs)
+        # matching files, in the order of the gold files for every system
+        system_paths = [[pathlib.Path(parsed_dir) / parsed_file
+                         for _, parsed_file in get_synced_file_names(gold_file_names, get_file_names(parsed_dir, '.conllx'))]
+                        for parsed_dir in parsed_dirs]
+        tuple_list = []
+    elif arguments["--gold_dir"] and parsed_dirs:
         print('comparing two directories')
         gold_dir_path = pathlib.Path(arguments["--gold_dir"])
-        parsed_dir_path = pathlib.Path(arguments["--parsed_dir"])
+        parsed_dir_path = pathlib.Path(parsed_dirs[0])
         gold_file_names = get_file_names(arguments["--gold_dir"], '.conllx')
-        parsed_file_names = get_file_names(arguments["--parsed_dir"], '.conllx')
+        parsed_file_names = get_file_names(parsed_dirs[0], '.conllx')
         
         # matching files
         tuple_list = get_synced_file_names(gold_file_names, parsed_file_names)
     else:
         raise ValueError('Invalid arguments')
+    if (arguments['--breakdown'] or arguments['--confusion']) and arguments['--manifest']:
+        raise ValueError('--breakdown and --confusion are not supported with --manifest')
+    if arguments['--stream'] and arguments['--compact']:
+        raise ValueError('--compact is not supported with --stream')
 
+    if arguments['--cache_dir']:
+        set_alignment_cache(arguments['--cache_dir'], int(arguments['--cache_size']))
 
     # reading files and storing scores for each file
-    tree_counts_list = []
-    tree_matches_list = []
-    alignment_numbers_list = []
-    num_sentences_list = []
+    # only the normalization, reading and storage flags are sent to the worker processes
+    worker_arguments = {key: arguments[key] for key in ['--transliterate_pnx', '--transliterate_num', '--normalize_alef_yeh_ta', '--stream', '--compact', '--breakdown', '--confusion']}
+    path_pairs = [(gold_dir_path / gold_file, parsed_dir_path / parsed_file) for gold_file, parsed_file in tuple_list]
 
-    conll_scores_list = []
-    for gold_file, parsed_file in tuple_list:
-        gold_conllx = ConllxDf(gold_dir_path / gold_file)
-        parsed_conllx = ConllxDf(parsed_dir_path / parsed_file)
+    jobs = int(arguments['--jobs'])
+    profile = enable_profiling() if arguments['--profile'] else None
+    if arguments['--cprofile']:
+        import cProfile
+        profiler = cProfile.Profile()
+    else:
+        profiler = None
+    if (profile or profiler) and jobs > 1:
+        print('profiling evaluates the files in this process, --jobs is ignored')
+        jobs = 1
+    if profiler:
+        profiler.enable()
 
-        transliterate_and_normalize(arguments, gold_conllx, parsed_conllx)
-        
-        conll_scores = {
-            'file_name': '.'.join(gold_file.split('.')[:-1]),
-            **compare_conll_trees(gold_conllx, parsed_conllx)
-        }
-        conll_scores_list.append(conll_scores)
+    # counts are stored by file index so the output order does not depend on the order files finish in
+    file_counts_list = [None] * len(path_pairs)
+    manifest = None
+    if system_names:
+        system_counts = [[None] * len(gold_file_names) for _ in system_names]
+        gold_paths = [gold_dir_path / gold_file for gold_file in gold_file_names]
+        evaluated_system_files = evaluate_systems(gold_paths, system_paths, system_names, worker_arguments, jobs)
+        for system_index, file_index, (file_name, counts) in evaluated_system_files:
+            system_counts[system_index][file_index] = (file_name, counts)
+            print(f"evaluated {system_names[system_index]} {file_name}")
+        evaluated_file_pairs = []
+    elif arguments['--manifest']:
+        from evaluation_manifest import EvaluationManifest
+        manifest_settings = {key: arguments[key] for key in ['--transliterate_pnx', '--transliterate_num', '--normalize_alef_yeh_ta']}
+        manifest = EvaluationManifest(arguments['--manifest'], manifest_settings, arguments['--full'])
+        evaluated_file_pairs = evaluate_file_pairs_incremental(path_pairs, worker_arguments, manifest, jobs)
+    else:
+        evaluated_file_pairs = evaluate_file_pairs(path_pairs, worker_arguments, jobs)
+    for i, (file_name, counts) in evaluated_file_pairs:
+        file_counts_list[i] = (file_name, counts)
+        print(f"evaluated {file_name}")
+    if manifest:
+        manifest.save()
+        print(f"manifest saved in {arguments['--manifest']}")
+
+    cache_hits, cache_misses = get_alignment_cache_stats()
+    set_alignment_cache(None)
+    if profiler:
+        profiler.disable()
+        profiler.dump_stats(arguments['--cprofile'])
+        print(f"cProfile statistics saved in {arguments['--cprofile']}")
+    if profile:
+        disable_profiling()
+        print_profile(profile)
+        with open('profile.json', 'w') as f:
+            json.dump(profile.to_dict(), f, indent=2)
+        print('profile saved in profile.json')
 
-    scores_df = DataFrame(conll_scores_list).round(3)
+    from pandas import DataFrame
+    from breakdown import save_confusion_matrices
+    from conllx_scores import get_breakdown_scores, get_scores
+    system_file_counts = system_counts if system_names else [file_counts_list]
+    system_scores = {}
+    breakdown_scores_list = []
+    for system_name, file_counts_list in zip(system_names or [None], system_file_counts):
+        conll_scores_list = [{'file_name': file_name, **get_scores(counts)} for file_name, counts in file_counts_list]
+        total_counts = sum((counts for _, counts in file_counts_list), ConllxCounts())
+        if arguments["--gold_dir"]:
+            # micro-averaged scores over all files
+            conll_scores_list.append({'file_name': 'total', **get_scores(total_counts)})
+        system_scores[system_name] = conll_scores_list
+        system_column = {'system': system_name} if system_names else {}
+        breakdown_scores_list += [{**system_column, **scores} for scores in get_breakdown_scores(total_counts)]
+        if arguments['--confusion']:
+            confusion_path = pathlib.Path(arguments['--confusion'])
+            if system_names:
+                system_stem = system_name.strip('/').replace('/', '_')
+                confusion_path = confusion_path.with_name(f'{confusion_path.stem}_{system_stem}{confusion_path.suffix}')
+            for path in save_confusion_matrices(total_counts, confusion_path):
+                print(f'confusion matrix saved in {path}')
+    if arguments["--cache_dir"]:
+        print(f'alignment cache: {cache_hits} hits, {cache_misses} misses')
+
+    if system_names:
+        scores_df = get_system_scores_df(system_scores).round(3)
+    else:
+        scores_df = DataFrame(system_scores[None]).round(3)
     scores_df.to_csv('results.tsv', sep='\t', index=False)
     print('results saved in results.tsv')
+    if arguments['--breakdown']:
+        DataFrame(breakdown_scores_list).round(3).to_csv('breakdown.tsv', sep='\t', index=False)
+        print('breakdown saved in breakdown.tsv')
@@ -0,0 +1,128 @@
+from contextlib import contextmanager, nullcontext
+from dataclasses import asdict, dataclass, field
+import heapq
+import time
+import tracemalloc
+from typing import Dict, List, Optional, Tuple
+
+# number of slowest sentences kept by a profile
+SLOWEST_SENTENCE_COUNT = 10
+
+# returned by profile_stage when profiling is disabled
+_NO_STAGE = nullcontext()
+
+
+@dataclass
+class StageStats:
+    wall_time: float = 0.0
+    calls: int = 0
+    # largest allocation (bytes) over the memory at the start of the stage
+    peak_memory: int = 0
+
+@dataclass
+class SentenceStats:
+    file_name: str
+    sentence: int
+    wall_time: float
+    gold_token_count: int
+    pred_token_count: int
+    # rows of the aligned trees, i.e. number of alignment ops
+    alignment_op_count: int
+
+@dataclass
+class Profile:
+    """Wall time, calls and peak memory of the stages of the evaluation,
+    in total and per file, and the slowest sentences.
+    """
+    stages: Dict[str, StageStats] = field(default_factory=dict)
+    files: Dict[str, Dict[str, StageStats]] = field(default_factory=dict)
+    file_name: str = ''
+    sentence_count: int = 0
+    # sentences of the current file, numbered from 1
+    file_sentence_count: int = 0
+    # min-heap of (wall_time, sentence number, SentenceStats)
+    _slowest: List[Tuple[float, int, SentenceStats]] = field(default_factory=list)
+    # peak memory of the open stages, outermost first
+    _peaks: List[int] = field(default_factory=list)
+
+    def start_file(self, file_name: str):
+        self.file_name = file_name
+        self.file_sentence_count = 0
+
+    @contextmanager
+    def stage(self, name: str):
+        # the traced peak is reset at every stage boundary, so every open
+        # stage keeps the highest peak of its parts
+        start_memory, peak = tracemalloc.get_traced_memory()
+        self.__fold_peak(peak)
+        tracemalloc.reset_peak()
+        self._peaks.append(start_memory)
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            wall_time = time.perf_counter() - start
+            _, peak = tracemalloc.get_traced_memory()
+            stage_peak = max(self._peaks.pop(), peak)
+            self.__fold_peak(stage_peak)
+            tracemalloc.reset_peak()
+            for stats in [self.stages.setdefault(name, StageStats()), self.files.setdefault(self.file_name, {}).setdefault(name, StageStats())]:
+                stats.wall_time += wall_time
+                stats.calls += 1
+                stats.peak_memory = max(stats.peak_memory, stage_peak - start_memory)
+
+    def __fold_peak(self, peak: int):
+        if self._peaks:
+            self._peaks[-1] = max(self._peaks[-1], peak)
+
+    def add_sentence(self, wall_time: float, gold_token_count: int, pred_token_count: int, alignment_op_count: int):
+        self.sentence_count += 1
+        self.file_sentence_count += 1
+        sentence = SentenceStats(self.file_name, self.file_sentence_count, wall_time,
+                                 gold_token_count, pred_token_count, alignment_op_count)
+        item = (wall_time, self.sentence_count, sentence)
+        if len(self._slowest) < SLOWEST_SENTENCE_COUNT:
+            heapq.heappush(self._slowest, item)
+        else:
+            heapq.heappushpop(self._slowest, item)
+
+    def get_slowest_sentences(self) -> List[SentenceStats]:
+        return [sentence for _, _, sentence in sorted(self._slowest, key=lambda item: (-item[0], item[1]))]
+
+    def to_dict(self) -> dict:
+        return {
+            'stages': {name: asdict(stats) for name, stats in self.stages.items()},
+            'files': {file_name: {name: asdict(stats) for name, stats in stages.items()}
+                      for file_name, stages in self.files.items()},
+            'slowest_sentences': [asdict(sentence) for sentence in self.get_slowest_sentences()],
+        }
+
+
+_profile: Optional[Profile] = None
+
+def enable_profiling() -> Profile:
+    """Starts recording the stages of this process (and tracing memory
+    allocations, which slows the evaluation down).
+
+    Returns:
+        Profile: the profile the stages are recorded in
+    """
+    global _profile
+    _profile = Profile()
+    tracemalloc.start()
+    return _profile
+
+def disable_profiling():
+    global _profile
+    _profile = None
+    if tracemalloc.is_tracing():
+        tracemalloc.stop()
+
+def get_profile() -> Optional[Profile]:
+    return _profile
+
+def profile_stage(name: str):
+    """Context manager recording the enclosed code as the stage name,
+    or doing nothing if profiling is disabled.
+    """
+    return _NO_STAGE if _profile is None else _profile.stage(name)
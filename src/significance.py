@@ -0,0 +1,208 @@
+from dataclasses import dataclass
+from typing import Dict, Iterable, List, Optional, Tuple
+
+import numpy as np
+
+from conllx_counts import ConllxCounts
+from conllx_df import ConllxDf
+from tree_evaluation import count_tree_columns, get_tree_columns, iter_tree_columns
+
+# columns of a sentence count array, one row per sentence; word_accuracy is
+# the word accuracy of the sentence, which is averaged over sentences
+SENTENCE_COLUMNS = ['sentence_count', 'gold_token_count', 'pred_token_count', 'token_matches', 'pos_matches',
+                    'head_matches', 'label_matches', 'label_head_matches', 'perfect_head_count',
+                    'perfect_label_count', 'perfect_label_head_count', 'word_accuracy']
+# number of (resample, sentence) weights drawn at a time, bounds the memory of the tests
+WEIGHT_CHUNK_SIZE = 1 << 22
+
+def get_sentence_counts(ref_conll: ConllxDf, pred_conll: ConllxDf) -> List[ConllxCounts]:
+    """Aligns every gold and parsed tree once and returns the counts of every sentence."""
+    assert ref_conll.get_sentence_count() == pred_conll.get_sentence_count()
+    sentence_count = ref_conll.get_sentence_count()
+    ref_df, ref_offsets = ref_conll.get_sentence_range(0, sentence_count)
+    pred_df, pred_offsets = pred_conll.get_sentence_range(0, sentence_count)
+    ref_columns, pred_columns = get_tree_columns(ref_df, pred_df)
+    sentence_counts = []
+    for ref_tree, pred_tree in zip(iter_tree_columns(ref_columns, ref_offsets), iter_tree_columns(pred_columns, pred_offsets)):
+        counts = ConllxCounts()
+        count_tree_columns(ref_tree, pred_tree, counts)
+        sentence_counts.append(counts)
+    return sentence_counts
+
+def get_sentence_count_array(sentence_counts: Iterable[ConllxCounts]) -> np.ndarray:
+    """Stacks the counts of single sentences into an array with a row per
+    sentence and the columns SENTENCE_COLUMNS. Save it with np.save to
+    test another system against it later without aligning the trees again.
+    """
+    rows = []
+    for counts in sentence_counts:
+        (word_count, word_matches), = counts.word_matches_by_length.items()
+        rows.append([getattr(counts, name) for name in SENTENCE_COLUMNS[:-1]] + [word_matches / word_count if word_count else 0.0])
+    return np.array(rows, dtype=np.float64).reshape(-1, len(SENTENCE_COLUMNS))
+
+# scores in percentages, as in get_scores, as (summed column, summed column it is divided by)
+RATIO_METRICS: Dict[str, Tuple[str, str]] = {
+    'tokenization_precision': ('token_matches', 'pred_token_count'),
+    'tokenization_recall': ('token_matches', 'gold_token_count'),
+    'word_accuracy': ('word_accuracy', 'sentence_count'),
+    'pos': ('pos_matches', 'gold_token_count'),
+    'uas_score': ('head_matches', 'gold_token_count'),
+    'label_score': ('label_matches', 'gold_token_count'),
+    'las_score': ('label_head_matches', 'gold_token_count'),
+    'pp_uas_score': ('perfect_head_count', 'sentence_count'),
+    'pp_label_score': ('perfect_label_count', 'sentence_count'),
+    'pp_las_score': ('perfect_label_head_count', 'sentence_count'),
+}
+METRICS = ['tokenization_f1_score', *RATIO_METRICS]
+DEFAULT_METRICS = ['las_score', 'uas_score', 'label_score', 'pos']
+
+@dataclass
+class SignificanceResult:
+    score_1: float
+    score_2: float
+    # score_2 - score_1
+    difference: float
+    p_value: float
+    # percentile interval of the difference (paired bootstrap only)
+    confidence_interval: Optional[Tuple[float, float]] = None
+
+def get_chunk_sizes(sample_count: int, sentence_count: int) -> List[int]:
+    chunk_size = max(1, WEIGHT_CHUNK_SIZE // max(sentence_count, 1))
+    return [min(chunk_size, sample_count - start) for start in range(0, sample_count, chunk_size)]
+
+def get_metric_columns(metric: str) -> List[str]:
+    if metric == 'tokenization_f1_score':
+        return ['token_matches', 'pred_token_count', 'gold_token_count']
+    return list(RATIO_METRICS[metric])
+
+def get_score(metric: str, sums: Dict[str, np.ndarray]) -> np.ndarray:
+    """Score of summed sentence counts, sums holds the summed columns of the metric."""
+    if metric == 'tokenization_f1_score':
+        precision = get_score('tokenization_precision', sums)
+        recall = get_score('tokenization_recall', sums)
+        return 2 * precision * recall / (precision + recall)
+    column, total_column = RATIO_METRICS[metric]
+    return 100 * sums[column] / sums[total_column]
+
+def get_differences(sums_1: Dict[str, np.ndarray], sums_2: Dict[str, np.ndarray], metrics: List[str]) -> np.ndarray:
+    """Returns the score differences of summed counts, one column per metric."""
+    with np.errstate(divide='ignore', invalid='ignore'):
+        return np.stack([get_score(metric, sums_2) - get_score(metric, sums_1) for metric in metrics], axis=-1)
+
+def get_sums(sums: np.ndarray, columns: List[str]) -> Dict[str, np.ndarray]:
+    return {column: sums[..., k] for k, column in enumerate(columns)}
+
+def get_test_columns(counts_1: np.ndarray, counts_2: np.ndarray, metrics: List[str]) -> Tuple[List[str], np.ndarray, np.ndarray]:
+    """Checks the sentence counts of two systems and keeps the columns of the metrics.
+
+    Returns:
+        Tuple[List[str], np.ndarray, np.ndarray]: the kept columns and the counts of both systems
+    """
+    if counts_1.shape != counts_2.shape or counts_1.shape[1:] != (len(SENTENCE_COLUMNS),):
+        raise ValueError(f'the sentence counts have shapes {counts_1.shape} and {counts_2.shape}, '
+                         f'expected the same number of sentences and {len(SENTENCE_COLUMNS)} columns')
+    unknown_metrics = [metric for metric in metrics if metric not in METRICS]
+    if unknown_metrics:
+        raise ValueError(f'Unknown metrics: {unknown_metrics}, expected {METRICS}')
+    # only the summed columns are multiplied by the weights of every resample
+    columns = sorted({column for metric in metrics for column in get_metric_columns(metric)}, key=SENTENCE_COLUMNS.index)
+    column_indices = [SENTENCE_COLUMNS.index(column) for column in columns]
+    return columns, counts_1[:, column_indices], counts_2[:, column_indices]
+
+def get_results(sums_1: Dict[str, np.ndarray], sums_2: Dict[str, np.ndarray], metrics: List[str], p_values: np.ndarray,
+                intervals: Optional[np.ndarray] = None) -> Dict[str, SignificanceResult]:
+    with np.errstate(divide='ignore', invalid='ignore'):
+        scores_1 = [float(get_score(metric, sums_1)) for metric in metrics]
+        scores_2 = [float(get_score(metric, sums_2)) for metric in metrics]
+    return {metric: SignificanceResult(score_1, score_2, score_2 - score_1, float(p_value),
+                                       None if intervals is None else (float(intervals[0, k]), float(intervals[1, k])))
+            for k, (metric, score_1, score_2, p_value) in enumerate(zip(metrics, scores_1, scores_2, p_values))}
+
+def paired_bootstrap(counts_1: np.ndarray, counts_2: np.ndarray, metrics: Optional[List[str]] = None,
+                     resample_count: int = 1000, confidence: float = 0.95, seed: int = 0) -> Dict[str, SignificanceResult]:
+    """Paired bootstrap test of the score differences of two systems on the
+    same sentences. Every resample draws the sentences with replacement, the
+    same sentences for both systems, as integer weights of the sentences, so
+    the counts of a resample are a matrix product instead of a re-evaluation.
+
+    The p-value is the fraction of resamples whose difference is at least
+    twice the observed difference (Berg-Kirkpatrick et al., 2012), i.e. the
+    probability of the observed gain if system 2 were not better than system 1.
+
+    Args:
+        counts_1 (np.ndarray): sentence counts of system 1 (see get_sentence_count_array)
+        counts_2 (np.ndarray): sentence counts of system 2, same sentences
+        metrics (Optional[List[str]], optional): scores to test (see METRICS).
+            Defaults to DEFAULT_METRICS.
+        resample_count (int, optional): number of resamples. Defaults to 1000.
+        confidence (float, optional): level of the confidence intervals. Defaults to 0.95.
+        seed (int, optional): seed of the resampling. Defaults to 0.
+
+    Returns:
+        Dict[str, SignificanceResult]: the result of every metric
+    """
+    metrics = metrics or DEFAULT_METRICS
+    columns, counts_1, counts_2 = get_test_columns(counts_1, counts_2, metrics)
+    counts = np.concatenate([counts_1, counts_2], axis=1)
+    rng = np.random.default_rng(seed)
+    sentence_count = counts.shape[0]
+    sums_1, sums_2 = get_sums(counts_1.sum(axis=0), columns), get_sums(counts_2.sum(axis=0), columns)
+    observed = get_differences(sums_1, sums_2, metrics)
+
+    differences = []
+    for chunk_size in get_chunk_sizes(resample_count, sentence_count):
+        # weights[r, i]: number of times sentence i is drawn in resample r
+        indices = rng.integers(0, sentence_count, size=(chunk_size, sentence_count))
+        indices += np.arange(chunk_size)[:, None] * sentence_count
+        weights = np.bincount(indices.ravel(), minlength=chunk_size * sentence_count).reshape(chunk_size, sentence_count)
+        resample_sums = weights.astype(np.float64) @ counts
+        differences.append(get_differences(get_sums(resample_sums[:, :len(columns)], columns),
+                                           get_sums(resample_sums[:, len(columns):], columns), metrics))
+    differences = np.concatenate(differences)
+
+    p_values = np.mean(differences >= 2 * observed, axis=0)
+    alpha = 100 * (1 - confidence) / 2
+    intervals = np.nanpercentile(differences, [alpha, 100 - alpha], axis=0)
+    return get_results(sums_1, sums_2, metrics, p_values, intervals)
+
+def approximate_randomization(counts_1: np.ndarray, counts_2: np.ndarray, metrics: Optional[List[str]] = None,
+                              trial_count: int = 1000, seed: int = 0) -> Dict[str, SignificanceResult]:
+    """Approximate randomization test of the score differences of two systems
+    on the same sentences. Every trial swaps the counts of the two systems on
+    a random half of the sentences; the swaps of a trial are a 0/1 vector, so
+    the counts of all the trials of a chunk are one matrix product.
+
+    The p-value is the fraction of trials (with one added to both sides)
+    whose absolute difference is at least the observed one (two-sided).
+
+    Args:
+        counts_1 (np.ndarray): sentence counts of system 1 (see get_sentence_count_array)
+        counts_2 (np.ndarray): sentence counts of system 2, same sentences
+        metrics (Optional[List[str]], optional): scores to test (see METRICS).
+            Defaults to DEFAULT_METRICS.
+        trial_count (int, optional): number of random swaps. Defaults to 1000.
+        seed (int, optional): seed of the swaps. Defaults to 0.
+
+    Returns:
+        Dict[str, SignificanceResult]: the result of every metric
+    """
+    metrics = metrics or DEFAULT_METRICS
+    columns, counts_1, counts_2 = get_test_columns(counts_1, counts_2, metrics)
+    rng = np.random.default_rng(seed)
+    sentence_count = counts_1.shape[0]
+    total_1, total_2 = counts_1.sum(axis=0), counts_2.sum(axis=0)
+    sums_1, sums_2 = get_sums(total_1, columns), get_sums(total_2, columns)
+    observed = np.abs(get_differences(sums_1, sums_2, metrics))
+    count_differences = counts_2 - counts_1
+
+    at_least_observed = np.zeros(len(metrics))
+    for chunk_size in get_chunk_sizes(trial_count, sentence_count):
+        swaps = rng.integers(0, 2, size=(chunk_size, sentence_count)).astype(np.float64)
+        swapped = swaps @ count_differences
+        differences = np.abs(get_differences(get_sums(total_1 + swapped, columns), get_sums(total_2 - swapped, columns), metrics))
+        # the tolerance keeps the trials equal to the observed difference despite rounding
+        at_least_observed += np.sum(differences >= observed - 1e-9, axis=0)
+
+    p_values = (at_least_observed + 1) / (trial_count + 1)
+    return get_results(sums_1, sums_2, metrics, p_values)
+
@@ -1,66 +1,112 @@
+from itertools import repeat, zip_longest
+from multiprocessing import Pool
+import time
+from typing import Callable, Iterable, Iterator, List, NamedTuple, Optional, Tuple
+
+import numpy as np
 import pandas as pd
+from pandas import DataFrame
 
-from align_trees import align_trees
-from conllx_df import ConllxDf
+from align_trees import (NULL_FORM, align_forms, align_rows, align_trees, gather_aligned, get_aligned_heads,
+                         get_null_rows, insert_null_forms)
+from breakdown import AlignedTree, add_breakdown_counts, add_confusion_counts
+from alignment_cache import (add_worker_cache_stats, call_with_cache_stats, flush_alignment_cache,
+                             get_alignment_cache_settings, set_alignment_cache)
+from conllx_counts import ConllxCounts
+from conllx_df import ConllxDf, iter_conllx_sentences
+from conllx_scores import (get_percentage, get_perfectly_parsed_percentage, get_scores,
+                           get_tokenization_scores, get_word_accuracy)
+from profiling import get_profile, profile_stage
 from utils.tokens_to_words import get_unsegmented_words
 
 
+def get_matches(column_1, column_2) -> np.ndarray:
+    # categoricals sharing their categories (see compact_conllx_dfs) are compared by code
+    if isinstance(column_1.dtype, pd.CategoricalDtype) and column_1.dtype == column_2.dtype:
+        return column_1.cat.codes.to_numpy() == column_2.cat.codes.to_numpy()
+    return (column_1 == column_2).to_numpy()
+
+def count_matches(column_1, column_2) -> int:
+    return int(get_matches(column_1, column_2).sum())
+
+def get_label_head_matches(ref_tree, pred_tree) -> np.ndarray:
+    return get_matches(ref_tree['HEAD'], pred_tree['HEAD']) & get_matches(ref_tree['DEPREL'], pred_tree['DEPREL'])
+
 def evaluate_tree_tokens(ref_tree_tokens, pred_tree_tokens, total_ref_tree_token_count, total_pred_tree_token_count):
     # ref_tree and pred_tree have already been aligned
     # the original token counts are required to calculate the f1 score
+    counts = ConllxCounts(
+        gold_token_count=total_ref_tree_token_count,
+        pred_token_count=total_pred_tree_token_count,
+        token_matches=count_matches(ref_tree_tokens, pred_tree_tokens)
+    )
+    return get_tokenization_scores(counts)
 
-    token_matches = (ref_tree_tokens == pred_tree_tokens).sum()
+def count_word_matches(gold_forms, pred_forms, gold_words: Optional[List[str]] = None) -> Tuple[int, int]:
+    """Combines the tokens of a sentence into words, aligns the words
+    and counts the matching words. The words are aligned as lists,
+    the same way align_trees aligns the rows of the trees.
 
-    token_recall = token_matches / total_ref_tree_token_count
-    token_precision = token_matches / total_pred_tree_token_count
-    f1_score = (2*token_precision*token_recall / (token_precision+token_recall))
-    return {
-        'tokenization_f1_score': f1_score*100,
-        'tokenization_recall': token_recall*100,
-        'tokenization_precision': token_precision*100,
-    }
+    Args:
+        gold_forms: gold tokens
+        pred_forms: parsed tokens
+        gold_words (Optional[List[str]], optional): the words of the gold tokens
+            if they are already combined. Defaults to None.
 
-def evaluate_words(gold_column, pred_column):
-    """
+    Returns:
+        Tuple[int, int]: the word matches and the gold word count
     """
-    gold_words = pd.DataFrame(get_unsegmented_words(gold_column.tolist()), columns=['FORM'])
-    pred_words = pd.DataFrame(get_unsegmented_words(pred_column.tolist()), columns=['FORM'])
-    # using align_trees on dataframe containing only form. if tokens are inserted the dataframe will contain all conll headers
-    gold_aligned, pred_aligned = align_trees(gold_words, pred_words)
+    if gold_words is None:
+        gold_words = get_unsegmented_words(list(gold_forms))
+    pred_words = get_unsegmented_words(list(pred_forms))
+    # identical words need no alignment
+    if gold_words == pred_words:
+        return len(gold_words), len(gold_words)
+    
+    null_rows_gold, null_rows_pred = get_null_rows(align_forms(gold_words, pred_words))
+    gold_aligned = insert_null_forms(null_rows_gold, gold_words)
+    pred_aligned = insert_null_forms(null_rows_pred, pred_words)
+    return sum(gold_word == pred_word for gold_word, pred_word in zip(gold_aligned, pred_aligned)), len(gold_words)
 
-    return (gold_aligned.FORM == pred_aligned.FORM).sum() / gold_words.shape[0]
+def evaluate_words(gold_column, pred_column):
+    word_matches, gold_word_count = count_word_matches(gold_column, pred_column)
+    return word_matches / gold_word_count
 
 def evaluate_columns(column_1, column_2, column_count, perfectly_parsed=False):
     if perfectly_parsed:
-        return 100 * int((column_1 == column_2).all())
+        return 100 * int(get_matches(column_1, column_2).all())
 
-    return 100 * ((column_1 == column_2).sum() / column_count)
+    return get_percentage(count_matches(column_1, column_2), column_count)
 
 def evaluate_las(ref_tree, pred_tree, total_ref_tree_token_count, perfectly_parsed=False):
     if perfectly_parsed:
-        return 100 * int(((ref_tree['HEAD'] == pred_tree['HEAD']) & (ref_tree['DEPREL'] == pred_tree['DEPREL'])).all())
+        return 100 * int(get_label_head_matches(ref_tree, pred_tree).all())
     
-    return 100 * (((ref_tree['HEAD'] == pred_tree['HEAD']) & (ref_tree['DEPREL'] == pred_tree['DEPREL'])).sum() / total_ref_tree_token_count)
+    return get_percentage(int(get_label_head_matches(ref_tree, pred_tree).sum()), total_ref_tree_token_count)
 
 def evaluate_word_accuracy(ref_conll, pred_conll):
-    scores = []
-    for i in range(ref_conll.get_sentence_count()):
-        gold_df = ref_conll.get_df_by_id(i)
-        pred_df = pred_conll.get_df_by_id(i)
-        scores.append({
-            'word_accuracy': evaluate_words(gold_df['FORM'], pred_df['FORM']) * 100
-        })
-    return pd.DataFrame(scores).mean().to_dict()
+    counts = ConllxCounts()
+    for gold_df, pred_df in zip(ref_conll.iter_sentences(), pred_conll.iter_sentences()):
+        word_matches, gold_word_count = count_word_matches(gold_df['FORM'].tolist(), pred_df['FORM'].tolist())
+        counts.sentence_count += 1
+        counts.add_word_matches(gold_word_count, word_matches)
+    return {'word_accuracy': get_word_accuracy(counts)}
 
 def evaluate_perfectly_parsed_trees(aligned_df_gold_list, aligned_df_pred_list):
-    scores = []
+    counts = ConllxCounts()
     for gold_df, pred_df in zip(aligned_df_gold_list, aligned_df_pred_list):
-        scores.append({
-            'pp_label_score': evaluate_columns(gold_df['DEPREL'], pred_df['DEPREL'], 0, True),
-            'pp_uas_score': evaluate_columns(gold_df['HEAD'], pred_df['HEAD'], 0, True),
-            'pp_las_score': evaluate_las(gold_df, pred_df, 0, True)
-        })
-    return pd.DataFrame(scores).mean().to_dict()
+        count_perfectly_parsed_tree(gold_df, pred_df, counts)
+    return {
+        'pp_label_score': get_perfectly_parsed_percentage(counts.perfect_label_count, counts.sentence_count),
+        'pp_uas_score': get_perfectly_parsed_percentage(counts.perfect_head_count, counts.sentence_count),
+        'pp_las_score': get_perfectly_parsed_percentage(counts.perfect_label_head_count, counts.sentence_count)
+    }
+
+def count_perfectly_parsed_tree(ref_tree_aligned, pred_tree_aligned, counts: ConllxCounts):
+    counts.sentence_count += 1
+    counts.perfect_head_count += int(get_matches(ref_tree_aligned['HEAD'], pred_tree_aligned['HEAD']).all())
+    counts.perfect_label_count += int(get_matches(ref_tree_aligned['DEPREL'], pred_tree_aligned['DEPREL']).all())
+    counts.perfect_label_head_count += int(get_label_head_matches(ref_tree_aligned, pred_tree_aligned).all())
 
 def get_aligned_trees(ref_conll, pred_conll):
     aligned_df_gold_list = []
@@ -68,9 +114,7 @@ def get_aligned_trees(ref_conll, pred_conll):
 
     total_ref_tree_token_count = 0
     total_pred_tree_token_count = 0
-    for i in range(ref_conll.get_sentence_count()):
-        ref_tree = ref_conll.get_df_by_id(i)
-        pred_tree = pred_conll.get_df_by_id(i)
+    for ref_tree, pred_tree in zip(ref_conll.iter_sentences(), pred_conll.iter_sentences()):
         total_ref_tree_token_count += ref_tree.shape[0]
         total_pred_tree_token_count += pred_tree.shape[0]
         
@@ -80,40 +124,290 @@ def get_aligned_trees(ref_conll, pred_conll):
     
     return aligned_df_gold_list, aligned_df_pred_list, total_ref_tree_token_count, total_pred_tree_token_count
 
-def compare_conll_trees(ref_conll: ConllxDf, pred_conll: ConllxDf):
+class TreeColumns(NamedTuple):
+    """The columns of one or more trees needed for the evaluation."""
+    forms: List[str]
+    upos: np.ndarray
+    heads: np.ndarray
+    deprels: np.ndarray
+    # UPOS and DEPREL of the null alignment tokens, '_' or its categorical code
+    upos_null: object
+    deprel_null: object
+
+def get_label_values(column_1, column_2) -> Tuple[np.ndarray, np.ndarray, object]:
+    """Returns the values of a label column of two trees and the value of the
+    null alignment tokens. Categoricals sharing their categories (see
+    compact_conllx_dfs) are returned as codes.
+    """
+    if isinstance(column_1.dtype, pd.CategoricalDtype) and column_1.dtype == column_2.dtype:
+        categories = column_1.cat.categories
+        return column_1.cat.codes.to_numpy(), column_2.cat.codes.to_numpy(), categories.get_loc('_') if '_' in categories else -1
+    return column_1.to_numpy(dtype=object), column_2.to_numpy(dtype=object), '_'
+
+def get_tree_columns(ref_df: DataFrame, pred_df: DataFrame) -> Tuple[TreeColumns, TreeColumns]:
+    """Extracts the columns of gold and parsed trees (whole files or single trees).
+
+    Returns:
+        Tuple[TreeColumns, TreeColumns]: the gold and the parsed columns
+    """
+    ref_upos, pred_upos, upos_null = get_label_values(ref_df['UPOS'], pred_df['UPOS'])
+    ref_deprels, pred_deprels, deprel_null = get_label_values(ref_df['DEPREL'], pred_df['DEPREL'])
+    return (TreeColumns(ref_df['FORM'].tolist(), ref_upos, ref_df['HEAD'].to_numpy(), ref_deprels, upos_null, deprel_null),
+            TreeColumns(pred_df['FORM'].tolist(), pred_upos, pred_df['HEAD'].to_numpy(), pred_deprels, upos_null, deprel_null))
+
+def iter_tree_columns(columns: TreeColumns, offsets: np.ndarray) -> Iterator[TreeColumns]:
+    """Yields the columns of every tree given the sentence offsets of the rows."""
+    for start, end in zip(offsets[:-1].tolist(), offsets[1:].tolist()):
+        yield columns._replace(forms=columns.forms[start:end], upos=columns.upos[start:end],
+                               heads=columns.heads[start:end], deprels=columns.deprels[start:end])
+
+def count_tree(ref_tree: DataFrame, pred_tree: DataFrame, counts: ConllxCounts) -> AlignedTree:
+    """Aligns a gold and a parsed tree and adds their counts to counts.
+
+    Args:
+        ref_tree (DataFrame): gold tree
+        pred_tree (DataFrame): parsed tree
+        counts (ConllxCounts): the counts to update
+
+    Returns:
+        AlignedTree: the aligned rows of the trees
+    """
+    return count_tree_columns(*get_tree_columns(ref_tree, pred_tree), counts)
+
+def count_tree_columns(ref: TreeColumns, pred: TreeColumns, counts: ConllxCounts, ref_words: Optional[List[str]] = None) -> AlignedTree:
+    """Aligns the columns of a gold and a parsed tree and adds their counts
+    to counts. The counts are the same as comparing the DataFrames returned
+    by align_trees, but only the compared columns are gathered.
+
+    Args:
+        ref (TreeColumns): gold tree
+        pred (TreeColumns): parsed tree
+        counts (ConllxCounts): the counts to update
+        ref_words (Optional[List[str]], optional): the words of the gold tree,
+            combined from its tokens if None. Defaults to None.
+
+    Returns:
+        AlignedTree: the aligned rows of the trees
+    """
+    profile = get_profile()
+    start = time.perf_counter() if profile else 0
+    with profile_stage('align_trees'):
+        ref_rows, pred_rows = align_rows(ref.forms, pred.forms)
+    if ref_rows.shape != pred_rows.shape:
+        raise ValueError(f'the aligned trees have {ref_rows.shape[0]} and {pred_rows.shape[0]} rows')
+
+    with profile_stage('score'):
+        ref_heads, pred_heads = get_aligned_heads(ref.heads, ref_rows), get_aligned_heads(pred.heads, pred_rows)
+        head_matches = ref_heads == pred_heads
+        label_matches = gather_aligned(ref.deprels, ref_rows, ref.deprel_null) == gather_aligned(pred.deprels, pred_rows, pred.deprel_null)
+        label_head_matches = head_matches & label_matches
+
+        counts.sentence_count += 1
+        counts.perfect_head_count += int(head_matches.all())
+        counts.perfect_label_count += int(label_matches.all())
+        counts.perfect_label_head_count += int(label_head_matches.all())
+        counts.gold_token_count += len(ref.forms)
+        counts.pred_token_count += len(pred.forms)
+        counts.token_matches += sum((ref.forms[i] if i >= 0 else NULL_FORM) == (pred.forms[j] if j >= 0 else NULL_FORM)
+                                    for i, j in zip(ref_rows.tolist(), pred_rows.tolist()))
+        counts.pos_matches += int((gather_aligned(ref.upos, ref_rows, ref.upos_null) == gather_aligned(pred.upos, pred_rows, pred.upos_null)).sum())
+        counts.head_matches += int(head_matches.sum())
+        counts.label_matches += int(label_matches.sum())
+        counts.label_head_matches += int(label_head_matches.sum())
+
+    with profile_stage('word_accuracy'):
+        word_matches, gold_word_count = count_word_matches(ref.forms, pred.forms, ref_words)
+        counts.add_word_matches(gold_word_count, word_matches)
+    if profile:
+        profile.add_sentence(time.perf_counter() - start, len(ref.forms), len(pred.forms), ref_rows.shape[0])
+    return AlignedTree(ref_rows, pred_rows, head_matches, label_matches)
+
+def count_conll_trees(ref_trees: Iterable[DataFrame], pred_trees: Iterable[DataFrame]) -> ConllxCounts:
+    counts = ConllxCounts()
+    for ref_tree, pred_tree in zip(ref_trees, pred_trees):
+        count_tree(ref_tree, pred_tree, counts)
+    flush_alignment_cache()
+    return counts
+
+def count_conll_frames(ref_df: DataFrame, ref_offsets: np.ndarray, pred_df: DataFrame, pred_offsets: np.ndarray,
+                       ref_words: Optional[List[List[str]]] = None, breakdown=False, confusion=False) -> ConllxCounts:
+    """Same as count_conll_trees, but the columns are extracted once for all
+    the trees instead of slicing a DataFrame per tree.
+
+    Args:
+        ref_df (DataFrame): gold trees
+        ref_offsets (np.ndarray): sentence offsets of the gold trees
+        pred_df (DataFrame): parsed trees
+        pred_offsets (np.ndarray): sentence offsets of the parsed trees
+        ref_words (Optional[List[List[str]]], optional): the words of every
+            gold tree (see GoldTrees). Defaults to None.
+        breakdown (bool, optional): also count the tokens by label (see
+            add_breakdown_counts). Defaults to False.
+        confusion (bool, optional): also count the confused labels (see
+            add_confusion_counts). Defaults to False.
+
+    Returns:
+        ConllxCounts: counts of the compared trees
+    """
+    counts = ConllxCounts()
+    ref_columns, pred_columns = get_tree_columns(ref_df, pred_df)
+    trees = zip(iter_tree_columns(ref_columns, ref_offsets), iter_tree_columns(pred_columns, pred_offsets),
+                ref_words if ref_words is not None else repeat(None))
+    aligned_trees = []
+    for ref_tree, pred_tree, ref_tree_words in trees:
+        aligned_tree = count_tree_columns(ref_tree, pred_tree, counts, ref_tree_words)
+        if breakdown or confusion:
+            aligned_trees.append(aligned_tree)
+    if breakdown:
+        with profile_stage('breakdown'):
+            add_breakdown_counts(counts, ref_df, ref_offsets, pred_df, pred_offsets, aligned_trees)
+    if confusion:
+        with profile_stage('confusion'):
+            add_confusion_counts(counts, ref_df, ref_offsets, pred_df, pred_offsets, aligned_trees)
+    flush_alignment_cache()
+    return counts
+
+def count_sentence_shard(shard) -> Tuple[ConllxCounts, Tuple[int, int]]:
+    """Counts a shard in a worker process, with the alignment cache lookups it made."""
+    return call_with_cache_stats(count_conll_frames, *shard)
+
+def get_sentence_shards(ref_conll: ConllxDf, pred_conll: ConllxDf, shard_count: int, breakdown=False, confusion=False):
+    shards = []
+    for sentences in np.array_split(np.arange(ref_conll.get_sentence_count()), shard_count):
+        if sentences.shape[0] == 0:
+            continue
+        start, end = sentences[0], sentences[-1] + 1
+        shards.append((*ref_conll.get_sentence_range(start, end), *pred_conll.get_sentence_range(start, end), None, breakdown, confusion))
+    return shards
+
+def count_conll_trees_parallel(ref_conll: ConllxDf, pred_conll: ConllxDf, jobs: int, breakdown=False, confusion=False) -> ConllxCounts:
+    """Splits the sentences into shards, counts each shard in a process pool
+    and adds the counts. The counts are the same as counting serially.
+    Falls back to counting in this process if the pool cannot be started.
+    """
+    # a few shards per process so that slow shards do not leave processes idle
+    shards = get_sentence_shards(ref_conll, pred_conll, jobs * 4, breakdown, confusion)
+    try:
+        # the workers use the alignment cache of this process
+        pool = Pool(jobs, initializer=set_alignment_cache, initargs=get_alignment_cache_settings() or (None,))
+    except (OSError, NotImplementedError) as e:
+        print(f'could not start a process pool ({e}), evaluating sentences serially')
+        shard_counts = [count_conll_frames(*shard) for shard in shards]
+    else:
+        with pool:
+            shard_counts = []
+            for counts, cache_stats in pool.map(count_sentence_shard, shards):
+                shard_counts.append(counts)
+                add_worker_cache_stats(*cache_stats)
+    return sum(shard_counts, ConllxCounts())
+
+def get_conll_counts(ref_conll: ConllxDf, pred_conll: ConllxDf, jobs: int = 1, breakdown=False, confusion=False) -> ConllxCounts:
+    """Compares the gold and parsed trees and returns the counts.
+
+    Args:
+        ref_conll (ConllxDf): gold trees
+        pred_conll (ConllxDf): parsed trees
+        jobs (int, optional): number of processes counting sentence shards. Defaults to 1.
+        breakdown (bool, optional): also count the tokens by label (see
+            add_breakdown_counts). Defaults to False.
+        confusion (bool, optional): also count the confused labels (see
+            add_confusion_counts). Defaults to False.
+
+    Returns:
+        ConllxCounts: counts of the compared trees
+    """
     assert ref_conll.get_sentence_count() == pred_conll.get_sentence_count()
 
-    aligned_df_gold_list, aligned_df_pred_list, total_ref_tree_token_count, total_pred_tree_token_count = get_aligned_trees(ref_conll, pred_conll)
-    gold_df = pd.concat(aligned_df_gold_list)
-    pred_df = pd.concat(aligned_df_pred_list)
-    
-    # f1_score, precision, and recall
-    tokenization_scores = evaluate_tree_tokens(gold_df.FORM, pred_df.FORM, total_ref_tree_token_count, total_pred_tree_token_count)
-    word_accuracy = evaluate_word_accuracy(ref_conll, pred_conll)
-    pos_score = {'pos': evaluate_columns(gold_df['UPOS'], pred_df['UPOS'], total_ref_tree_token_count)}
-    
-    attachment_scores = {
-        'label_score': evaluate_columns(gold_df['DEPREL'], pred_df['DEPREL'], total_ref_tree_token_count),
-        'uas_score': evaluate_columns(gold_df['HEAD'], pred_df['HEAD'], total_ref_tree_token_count),
-        'las_score': evaluate_las(gold_df, pred_df, total_ref_tree_token_count)
-    }
+    if jobs > 1 and ref_conll.get_sentence_count() > 1:
+        return count_conll_trees_parallel(ref_conll, pred_conll, jobs, breakdown, confusion)
+    sentence_count = ref_conll.get_sentence_count()
+    return count_conll_frames(*ref_conll.get_sentence_range(0, sentence_count), *pred_conll.get_sentence_range(0, sentence_count),
+                              breakdown=breakdown, confusion=confusion)
 
-    perfectly_parsed = evaluate_perfectly_parsed_trees(aligned_df_gold_list, aligned_df_pred_list)
+class GoldTrees(NamedTuple):
+    """The gold trees of a file prepared once, to be compared with the
+    parsed trees of several systems.
+    """
+    df: DataFrame
+    offsets: np.ndarray
+    # the unsegmented words of every tree
+    words: List[List[str]]
 
-    # converting to pandas and manually setting values to be able to use numpys round function later
-    scores_combined = {**tokenization_scores, **pos_score, **attachment_scores, **perfectly_parsed, **word_accuracy}
-    final_scores = pd.Series(scores_combined)
-    return {
-        'tokenization_f1_score': final_scores.tokenization_f1_score,
-        'tokenization_precision': final_scores.tokenization_precision,
-        'tokenization_recall': final_scores.tokenization_recall,
-        'word_accuracy': final_scores.word_accuracy,
-        'pos': final_scores.pos,
-        'uas_score': final_scores.uas_score,
-        'label_score': final_scores.label_score,
-        'las_score': final_scores.las_score,
-        'pp_uas_score': final_scores.pp_uas_score,
-        'pp_label_score': final_scores.pp_label_score,
-        'pp_las_score': final_scores.pp_las_score
-    }
+def get_gold_trees(ref_conll: ConllxDf) -> GoldTrees:
+    ref_df, ref_offsets = ref_conll.get_sentence_range(0, ref_conll.get_sentence_count())
+    forms = ref_df['FORM'].tolist()
+    words = [get_unsegmented_words(forms[start:end]) for start, end in zip(ref_offsets[:-1].tolist(), ref_offsets[1:].tolist())]
+    return GoldTrees(ref_df, ref_offsets, words)
+
+def count_gold_trees(gold_trees: GoldTrees, pred_conll: ConllxDf, breakdown=False, confusion=False) -> ConllxCounts:
+    """Same as get_conll_counts, with the gold trees prepared by get_gold_trees.
+
+    Args:
+        gold_trees (GoldTrees): gold trees
+        pred_conll (ConllxDf): parsed trees
+        breakdown (bool, optional): also count the tokens by label (see
+            add_breakdown_counts). Defaults to False.
+        confusion (bool, optional): also count the confused labels (see
+            add_confusion_counts). Defaults to False.
+
+    Returns:
+        ConllxCounts: counts of the compared trees
+    """
+    assert len(gold_trees.words) == pred_conll.get_sentence_count()
+    return count_conll_frames(gold_trees.df, gold_trees.offsets,
+                              *pred_conll.get_sentence_range(0, pred_conll.get_sentence_count()), gold_trees.words,
+                              breakdown, confusion)
 
+def count_conllx_files(gold_path, parsed_path, normalize: Optional[Callable[[DataFrame], None]] = None, header='conllu',
+                       breakdown=False, confusion=False) -> ConllxCounts:
+    """Compares a gold and a parsed file while reading them, one tree of
+    each file at a time, so memory does not grow with the file size.
+
+    Args:
+        gold_path: gold CoNLL-X file
+        parsed_path: parsed CoNLL-X file
+        normalize (Callable[[DataFrame], None], optional): applied to every tree
+            before the comparison. Defaults to None.
+        header (str, optional): 'conllu' or 'catib'. Defaults to 'conllu'.
+        breakdown (bool, optional): also count the tokens by label (see
+            add_breakdown_counts), one tree at a time. Defaults to False.
+        confusion (bool, optional): also count the confused labels (see
+            add_confusion_counts), one tree at a time. Defaults to False.
+
+    Returns:
+        ConllxCounts: counts of the compared trees
+    """
+    counts = ConllxCounts()
+    with open(gold_path, 'r') as gold_f, open(parsed_path, 'r') as parsed_f:
+        for gold_sentence, parsed_sentence in zip_longest(iter_conllx_sentences(gold_f), iter_conllx_sentences(parsed_f)):
+            assert gold_sentence is not None and parsed_sentence is not None, 'the files have a different number of trees'
+            with profile_stage('read'):
+                ref_tree = ConllxDf.rows_to_df(gold_sentence[0], header)
+                pred_tree = ConllxDf.rows_to_df(parsed_sentence[0], header)
+            if normalize:
+                with profile_stage('normalize'):
+                    normalize(ref_tree)
+                    normalize(pred_tree)
+            aligned_tree = count_tree(ref_tree, pred_tree, counts)
+            ref_offsets, pred_offsets = np.array([0, ref_tree.shape[0]]), np.array([0, pred_tree.shape[0]])
+            if breakdown:
+                with profile_stage('breakdown'):
+                    add_breakdown_counts(counts, ref_tree, ref_offsets, pred_tree, pred_offsets, [aligned_tree])
+            if confusion:
+                with profile_stage('confusion'):
+                    add_confusion_counts(counts, ref_tree, ref_offsets, pred_tree, pred_offsets, [aligned_tree])
+    flush_alignment_cache()
+    return counts
+
+def compare_conll_trees(ref_conll: ConllxDf, pred_conll: ConllxDf, jobs: int = 1):
+    """Compares the gold and parsed trees and returns the scores.
+
+    Args:
+        ref_conll (ConllxDf): gold trees
+        pred_conll (ConllxDf): parsed trees
+        jobs (int, optional): number of processes counting sentence shards. Defaults to 1.
+
+    Returns:
+        dict: scores in percentages
+    """
+    return get_scores(get_conll_counts(ref_conll, pred_conll, jobs))
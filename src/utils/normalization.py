@@ -1,9 +1,15 @@
-from camel_tools.utils.normalize import normalize_alef_ar as alef
-from camel_tools.utils.normalize import normalize_alef_maksura_ar as yeh
-from camel_tools.utils.normalize import normalize_teh_marbuta_ar as teh
-
+# the characters replaced by the camel_tools alef, alef maksura and teh marbuta
+# normalizations, applied with str.translate (camel_tools is not imported)
+ALEF_YEH_TA_TABLE = str.maketrans({
+    '\u0625': '\u0627', '\u0623': '\u0627', '\u0671': '\u0627', '\u0622': '\u0627', # alef
+    '\u0649': '\u064a', # alef maksura
+    '\u0629': '\u0647', # teh marbuta
+})
 
 def normalize_alef_yeh_ta_line(line):
+    from camel_tools.utils.normalize import normalize_alef_ar as alef
+    from camel_tools.utils.normalize import normalize_alef_maksura_ar as yeh
+    from camel_tools.utils.normalize import normalize_teh_marbuta_ar as teh
     return alef(yeh(teh(line)))
 
 def normalize_alef_yeh_ta(df):
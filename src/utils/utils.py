@@ -1,8 +1,12 @@
 import os
 from pathlib import Path
+from typing import TYPE_CHECKING, Callable, Optional
 
-from utils.char_map import bw2ar_map_lines
-from utils.normalization import normalize_alef_yeh_ta
+from utils.char_map import maps
+from utils.normalization import ALEF_YEH_TA_TABLE
+
+if TYPE_CHECKING:
+    import pandas as pd
 
 def get_file_names(data_path, endswith=''):
     ret_files = []
@@ -25,13 +29,43 @@ def get_file_names(data_path, endswith=''):
         # it doesn't traverse subdirectories
         return ret_files
 
-def transliterate_and_normalize(arguments, gold_conllx, parsed_conllx):
+def get_form_normalizer(arguments) -> Optional[Callable[[str], str]]:
+    """Compiles the enabled normalizations into one function of a form:
+    the punctuation and number maps replace whole forms (as bw2ar_map_lines),
+    then the alef, alef maksura and teh marbuta characters are replaced with
+    a single str.translate (as normalize_alef_yeh_ta).
+
+    Returns:
+        Optional[Callable[[str], str]]: the normalization, None if none is enabled
+    """
+    form_map = {}
     if arguments['--transliterate_pnx']:
-        bw2ar_map_lines(gold_conllx.df, 'punctuation')
-        bw2ar_map_lines(parsed_conllx.df, 'punctuation')
+        form_map.update(maps['punctuation'])
     if arguments['--transliterate_num']:
-        bw2ar_map_lines(gold_conllx.df, 'numbers')
-        bw2ar_map_lines(parsed_conllx.df, 'numbers')
-    if arguments['--normalize_alef_yeh_ta']:
-        normalize_alef_yeh_ta(gold_conllx.df)
-        normalize_alef_yeh_ta(parsed_conllx.df)
\ No newline at end of file
+        form_map.update(maps['numbers'])
+    table = ALEF_YEH_TA_TABLE if arguments['--normalize_alef_yeh_ta'] else None
+
+    if table is None and not form_map:
+        return None
+    if table is None:
+        return lambda form: form_map.get(form, form)
+    return lambda form: form_map.get(form, form).translate(table)
+
+def normalize_forms(forms: 'pd.Series', normalize_form: Callable[[str], str]) -> 'pd.Series':
+    """Normalizes every distinct form once and broadcasts the results back."""
+    # imported here, the file functions of this module do not need pandas
+    import numpy as np
+    import pandas as pd
+    codes, unique_forms = pd.factorize(forms)
+    normalized_forms = np.array([normalize_form(form) for form in unique_forms] + [np.nan], dtype=object)
+    # code -1 (missing form) picks the trailing nan
+    return pd.Series(normalized_forms[codes], index=forms.index, dtype=forms.dtype, name=forms.name)
+
+def normalize_df(arguments, conll_df):
+    normalize_form = get_form_normalizer(arguments)
+    if normalize_form:
+        conll_df['FORM'] = normalize_forms(conll_df['FORM'], normalize_form)
+
+def transliterate_and_normalize(arguments, gold_conllx, parsed_conllx):
+    normalize_df(arguments, gold_conllx.df)
+    normalize_df(arguments, parsed_conllx.df)
\ No newline at end of file
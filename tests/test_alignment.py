@@ -0,0 +1,136 @@
+import sys
+sys.path.insert(0, 'src')
+
+from pathlib import Path
+
+import editdistance
+import pandas as pd
+import pytest
+
+from src.align_trees import (NULL_FORM, align_rows, align_tokens, align_trees, gather_aligned, get_aligned_heads,
+                            get_row_mapping, insert_empty_rows, insert_null_forms)
+from src.conllx_df import ConllxDf
+from src.external_libraries.ced_word_alignment import alignment
+from src.external_libraries.ced_word_alignment.alignment import (DEFAULT_SUBSTITUTION_CACHE_SIZE, align_words,
+                                                                 get_substitution_cache_info, set_substitution_cache_size,
+                                                                 substitution_matrix)
+
+
+CED_SAMPLE_DIR = Path('src/external_libraries/ced_word_alignment/sample')
+
+def get_ced_sentence_pairs():
+    pairs = []
+    for source, target in [('sample.ar.source', 'sample.ar.target'), ('sample.en.source', 'sample.en.target'), ('annot', 'parse')]:
+        source_lines = (CED_SAMPLE_DIR / source).read_text().splitlines()
+        target_lines = (CED_SAMPLE_DIR / target).read_text().splitlines()
+        pairs.extend(zip(source_lines, target_lines))
+    return pairs
+
+def get_conllx_sentence_pairs():
+    pairs = []
+    for gold_path, parsed_path in [
+        ('tests/data/wiki/wiki_sample_gold/CamelTB_WikiNews_art_1.conllx', 'tests/data/wiki/wiki_sample_parsed/CamelTB_WikiNews_art_1.conllx'),
+        ('data/samples_gold/sample_2.conllx', 'data/samples_parsed/sample_2.conllx'),
+        ('tests/data/word_acc_gold.conllx', 'tests/data/word_acc_pred.conllx'),
+    ]:
+        gold_conll = ConllxDf(gold_path)
+        parsed_conll = ConllxDf(parsed_path)
+        for gold_df, parsed_df in zip(gold_conll.iter_sentences(), parsed_conll.iter_sentences()):
+            pairs.append((' '.join(gold_df.FORM).replace('+', ''), ' '.join(parsed_df.FORM).replace('+', '')))
+    return pairs
+
+@pytest.mark.parametrize('sentence_pairs', [get_ced_sentence_pairs(), get_conllx_sentence_pairs()])
+def test_numpy_engine_matches_python_engine(sentence_pairs):
+    for s1, s2 in sentence_pairs:
+        assert repr(align_words(s1, s2, engine='numpy')) == repr(align_words(s1, s2, engine='python'))
+
+@pytest.mark.parametrize('sentence_pairs', [get_ced_sentence_pairs(), get_conllx_sentence_pairs()])
+def test_banded_engine_matches_python_engine(sentence_pairs, monkeypatch):
+    monkeypatch.setattr(alignment, 'BAND_MIN_LENGTH', 0)
+    monkeypatch.setattr(alignment, 'BAND_START', 1)
+    # long sentences with a few edits and with many edits, the band has to be widened for the latter
+    tokens = [f'w{k % 37}' for k in range(150)]
+    sentence_pairs = sentence_pairs + [(' '.join(tokens), ' '.join(tokens[:40] + ['w'] + tokens[40:100] + tokens[101:])),
+                                       (' '.join(tokens), ' '.join(tokens[75:] + tokens[:75]))]
+    for s1, s2 in sentence_pairs:
+        assert repr(align_words(s1, s2, engine='numpy')) == repr(align_words(s1, s2, engine='python'))
+
+def test_engines_empty_sentence():
+    for s1, s2 in [('', 'a b'), ('a b', ''), ('', '')]:
+        assert repr(align_words(s1, s2, engine='numpy')) == repr(align_words(s1, s2, engine='python'))
+
+def test_invalid_engine():
+    with pytest.raises(ValueError):
+        align_words('a', 'b', engine='rust')
+
+def test_substitution_matrix():
+    tokens1 = ['و+', 'ال+', 'كتاب', 'و+']
+    tokens2 = ['ال+', 'كتب', '.']
+    set_substitution_cache_size(DEFAULT_SUBSTITUTION_CACHE_SIZE)
+    try:
+        costs = substitution_matrix(tokens1, tokens2)
+        for i, x in enumerate(tokens1):
+            for j, y in enumerate(tokens2):
+                expected = editdistance.eval(x, y) * 2 / max(len(x), len(y))
+                assert costs[i, j] == expected
+        # 3 x 3 distinct tokens, 1 equal pair
+        assert get_substitution_cache_info().misses == 8
+        # the reversed pairs are the same entries
+        substitution_matrix(tokens2, tokens1)
+        assert get_substitution_cache_info().misses == 8
+        assert get_substitution_cache_info().hits == 8
+    finally:
+        set_substitution_cache_size(DEFAULT_SUBSTITUTION_CACHE_SIZE)
+
+@pytest.mark.parametrize('sentence_pairs', [get_ced_sentence_pairs(), get_conllx_sentence_pairs()])
+def test_align_tokens_matches_align_words(sentence_pairs):
+    for s1, s2 in sentence_pairs:
+        assert repr(align_tokens(s1.split(), s2.split())) == repr(align_words(s1, s2))
+
+@pytest.mark.parametrize('tokens_1, tokens_2', [
+    (['a', 'b', 'c'], ['a', 'b', 'c']),
+    (['a'], ['a', 'a']),
+    (['a', 'a'], ['a']),
+    (['x', 'a'], ['y', 'a', 'a']),
+    (['a', 'b', 'c', 'd'], ['a', 'bc', 'd']),
+    (['a', 'b', 'a'], ['a', 'c', 'b', 'a']),
+    ([], ['a']),
+])
+def test_align_tokens_trimmed(tokens_1, tokens_2):
+    assert repr(align_tokens(tokens_1, tokens_2)) == repr(align_words(' '.join(tokens_1), ' '.join(tokens_2)))
+
+def test_insert_empty_rows():
+    df = pd.DataFrame({
+        'ID': range(1, 11), 'FORM': list('abcdefghij'), 'LEMMA': '_',
+        'UPOS': '_', 'XPOS': '_', 'FEATS': '_',
+        'HEAD': [0, 0, 2, 2, 4, 5, 5, 9, 7, 9], 'DEPREL': '_', 'DEPS': '_', 'MISC': '_'
+    })
+    aligned = insert_empty_rows([1, 2, 4, 9, 12, 15], df)
+    assert aligned.ID.tolist() == list(range(1, 17))
+    assert aligned.FORM.tolist() == ['a', 'tok', 'tok', 'b', 'tok', 'c', 'd', 'e', 'f', 'tok', 'g', 'h', 'tok', 'i', 'j', 'tok']
+    assert aligned.HEAD.tolist() == [0, -1, -1, 0, -1, 4, 4, 7, 8, -1, 8, 14, -1, 11, 14, -1]
+
+def test_insert_empty_rows_none():
+    df = pd.DataFrame({'FORM': ['a', 'b']}, index=[5, 6])
+    assert insert_empty_rows([], df).index.tolist() == [0, 1]
+
+def test_insert_null_forms():
+    forms = ['a', 'b', 'c']
+    for positions in [[], [0], [1, 2], [0, 4], [3, 4, 5]]:
+        df = pd.DataFrame({'FORM': forms, 'HEAD': [0, 1, 1]})
+        assert insert_null_forms(positions, forms) == insert_empty_rows(positions, df)['FORM'].tolist()
+
+def test_align_rows_matches_align_trees():
+    gold_conll = ConllxDf('tests/data/wiki/wiki_sample_gold/CamelTB_WikiNews_art_1.conllx')
+    parsed_conll = ConllxDf('tests/data/wiki/wiki_sample_parsed/CamelTB_WikiNews_art_1.conllx')
+    for gold_df, parsed_df in zip(gold_conll.iter_sentences(), parsed_conll.iter_sentences()):
+        gold_aligned, parsed_aligned = align_trees(gold_df, parsed_df)
+        gold_rows, parsed_rows = align_rows(gold_df['FORM'].tolist(), parsed_df['FORM'].tolist())
+        for df, aligned, rows in [(gold_df, gold_aligned, gold_rows), (parsed_df, parsed_aligned, parsed_rows)]:
+            assert gather_aligned(df['FORM'].to_numpy(), rows, NULL_FORM).tolist() == aligned['FORM'].tolist()
+            assert get_aligned_heads(df['HEAD'].to_numpy(), rows).tolist() == aligned['HEAD'].tolist()
+
+def test_get_row_mapping():
+    gold_rows, parsed_rows = align_rows(['a', 'b+', 'c', 'd'], ['a', 'c', 'x', 'd'])
+    assert get_row_mapping(gold_rows, parsed_rows, 4).tolist() == [0, -1, 1, 3]
+    assert get_row_mapping(parsed_rows, gold_rows, 4).tolist() == [0, 2, -1, 3]
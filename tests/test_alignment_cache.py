@@ -0,0 +1,48 @@
+import sys
+sys.path.insert(0, 'src')
+
+from align_trees import align_token_window, align_tokens
+from alignment_cache import AlignmentCache, get_alignment_cache_stats, set_alignment_cache
+from conllx_df import ConllxDf
+from conllx_scores import get_scores
+from tree_evaluation import get_conll_counts
+
+
+def test_alignment_cache(tmp_path):
+    gold_conll = ConllxDf('tests/data/wiki/wiki_sample_gold/CamelTB_WikiNews_art_1.conllx')
+    parsed_conll = ConllxDf('tests/data/wiki/wiki_sample_parsed/CamelTB_WikiNews_art_1.conllx')
+    counts = get_conll_counts(gold_conll, parsed_conll)
+
+    set_alignment_cache(tmp_path)
+    try:
+        first_counts = get_conll_counts(gold_conll, parsed_conll)
+        first_hits, first_misses = get_alignment_cache_stats()
+        second_counts = get_conll_counts(gold_conll, parsed_conll)
+        second_hits, second_misses = get_alignment_cache_stats()
+        # the lookups of the workers are added to the stats of this process
+        sharded_counts = get_conll_counts(gold_conll, parsed_conll, jobs=2)
+        sharded_hits, sharded_misses = get_alignment_cache_stats()
+    finally:
+        set_alignment_cache(None)
+
+    assert first_misses > 0
+    assert second_hits - first_hits == first_hits + first_misses
+    assert second_misses == first_misses
+    assert sharded_hits - second_hits == first_hits + first_misses
+    assert sharded_misses == first_misses
+    for cached_counts in [first_counts, second_counts, sharded_counts]:
+        assert cached_counts == counts
+        assert get_scores(cached_counts) == get_scores(counts)
+
+def test_alignment_cache_eviction(tmp_path):
+    pairs = [('a b c'.split(), 'a c'.split()), ('x y'.split(), 'x z y'.split()), ('k l'.split(), 'l'.split())]
+    cache = AlignmentCache(tmp_path, max_entries=2)
+    for tokens_1, tokens_2 in pairs:
+        cache.put(tokens_1, tokens_2, align_token_window(tokens_1, tokens_2))
+        cache.flush()
+    assert cache.get_entry_count() == 2
+    # the first pair is the least recently used
+    assert cache.get(*pairs[0]) is None
+    assert cache.get(*pairs[2]) == align_tokens(*pairs[2])
+    assert (cache.hits, cache.misses) == (1, 1)
+    cache.close()
@@ -0,0 +1,77 @@
+import sys
+sys.path.insert(0, 'src')
+
+import numpy as np
+import pandas as pd
+
+from breakdown import (NULL_LABEL, get_confusion_matrix, get_dependency_length_buckets, get_head_directions,
+                       save_confusion_matrices)
+from conllx_df import ConllxDf
+from conllx_scores import get_breakdown_scores
+from tree_evaluation import count_conll_trees_parallel, count_conllx_files, get_conll_counts
+
+
+GOLD_PATH = 'tests/data/wiki/wiki_sample_gold/CamelTB_WikiNews_art_1.conllx'
+PARSED_PATH = 'tests/data/wiki/wiki_sample_parsed/CamelTB_WikiNews_art_1.conllx'
+
+
+def test_head_groups():
+    ids, heads = np.array([1, 2, 3, 4, 12]), np.array([0, 1, 1, 9, 2])
+    assert get_head_directions(ids, heads).tolist() == [0, 1, 1, 2, 1]
+    assert get_dependency_length_buckets(ids, heads).tolist() == [0, 1, 2, 3, 4]
+
+def test_breakdown_counts():
+    counts = get_conll_counts(ConllxDf(GOLD_PATH), ConllxDf(PARSED_PATH), breakdown=True)
+    assert list(counts.breakdown_counts) == ['deprel', 'upos', 'head_direction', 'dependency_length']
+    # every token is counted once per group, the correct tokens are the matches of the scores
+    for group, matches in [('deprel', counts.label_head_matches), ('upos', counts.pos_matches),
+                           ('head_direction', counts.head_matches), ('dependency_length', counts.head_matches)]:
+        gold_count, pred_count, correct_count = np.array(list(counts.breakdown_counts[group].values())).sum(axis=0)
+        assert (gold_count, pred_count, correct_count) == (counts.gold_token_count, counts.pred_token_count, matches)
+
+def test_merged_breakdown_counts():
+    gold_conll, parsed_conll = ConllxDf(GOLD_PATH), ConllxDf(PARSED_PATH)
+    counts = get_conll_counts(gold_conll, parsed_conll, breakdown=True)
+    assert count_conll_trees_parallel(gold_conll, parsed_conll, 2, breakdown=True) == counts
+    assert count_conllx_files(GOLD_PATH, PARSED_PATH, breakdown=True) == counts
+    assert get_conll_counts(gold_conll, parsed_conll).breakdown_counts == {}
+
+def test_breakdown_scores():
+    counts = get_conll_counts(ConllxDf(GOLD_PATH), ConllxDf(PARSED_PATH), breakdown=True)
+    for scores in get_breakdown_scores(counts):
+        gold_count, pred_count, correct_count = counts.breakdown_counts[scores['group']][scores['label']]
+        assert (scores['gold_count'], scores['pred_count'], scores['correct_count']) == (gold_count, pred_count, correct_count)
+        if correct_count:
+            precision, recall = scores['precision'], scores['recall']
+            assert np.isclose(scores['f1_score'], 2 * precision * recall / (precision + recall))
+
+def test_confusion_matrices():
+    counts = get_conll_counts(ConllxDf(GOLD_PATH), ConllxDf(PARSED_PATH), confusion=True)
+    assert counts.breakdown_counts == {}
+    labels, matrix = get_confusion_matrix(counts, 'upos')
+    assert labels[-1] == NULL_LABEL
+    # the diagonal holds the UPOS matches, the rows the gold tokens and the columns the parsed tokens
+    assert np.trace(matrix[:-1, :-1]) == counts.pos_matches
+    assert (matrix[:-1].sum(), matrix[:, :-1].sum()) == (counts.gold_token_count, counts.pred_token_count)
+    _, deprel_matrix = get_confusion_matrix(counts, 'deprel')
+    assert deprel_matrix.sum() == matrix.sum()
+
+def test_merged_confusion_counts():
+    gold_conll, parsed_conll = ConllxDf(GOLD_PATH), ConllxDf(PARSED_PATH)
+    counts = get_conll_counts(gold_conll, parsed_conll, confusion=True)
+    assert count_conll_trees_parallel(gold_conll, parsed_conll, 2, confusion=True) == counts
+    assert count_conllx_files(GOLD_PATH, PARSED_PATH, confusion=True) == counts
+    merged = counts + counts
+    assert np.array_equal(get_confusion_matrix(merged, 'upos')[1], 2 * get_confusion_matrix(counts, 'upos')[1])
+
+def test_save_confusion_matrices(tmp_path):
+    counts = get_conll_counts(ConllxDf(GOLD_PATH), ConllxDf(PARSED_PATH), confusion=True)
+    npz_path, = save_confusion_matrices(counts, tmp_path / 'confusion.npz')
+    tsv_paths = save_confusion_matrices(counts, tmp_path / 'confusion.tsv')
+    assert [path.name for path in tsv_paths] == ['confusion_upos.tsv', 'confusion_deprel.tsv']
+    arrays = np.load(npz_path)
+    for group, tsv_path in zip(['upos', 'deprel'], tsv_paths):
+        labels, matrix = get_confusion_matrix(counts, group)
+        tsv_df = pd.read_csv(tsv_path, sep='\t', index_col=0, keep_default_na=False)
+        assert arrays[f'{group}_labels'].tolist() == labels == tsv_df.columns.tolist() == tsv_df.index.tolist()
+        assert np.array_equal(arrays[group], matrix) and np.array_equal(tsv_df.to_numpy(), matrix)
@@ -5,7 +5,7 @@ import pytest
 import pandas as pd
 
 from src.align_trees import align_trees
-from src.conllx_df import ConllxDf
+from src.conllx_df import ConllxDf, compact_conllx_dfs
 from src.tree_evaluation import compare_conll_trees, evaluate_columns, evaluate_las, evaluate_tree_tokens, evaluate_word_accuracy, evaluate_words
 
 @pytest.fixture
@@ -63,6 +63,12 @@ def test_compare_conll_trees():
     # TODO add functionality to get these
     # word acc 89.116
 
+def test_compare_conll_trees_sharded():
+    gold_conll = ConllxDf('tests/data/wiki/wiki_sample_gold/CamelTB_WikiNews_art_1.conllx')
+    parsed_conll = ConllxDf('tests/data/wiki/wiki_sample_parsed/CamelTB_WikiNews_art_1.conllx')
+    
+    assert compare_conll_trees(gold_conll, parsed_conll, jobs=3) == compare_conll_trees(gold_conll, parsed_conll)
+
 def test_evaluate_words():
     gold = pd.Series(['a', 'b+', 'c', 'd', '+e', '+'])
     pred = pd.Series(['a', 'b+', 'c+', 'd', '+e', '+'])
@@ -78,4 +84,13 @@ def test_evaluate_word_accuracy():
     pred_list = ConllxDf('tests/data/word_acc_pred.conllx')
     word_acc = evaluate_word_accuracy(gold_data, pred_list)
     assert round(word_acc['word_accuracy'], 3) == 58.333
-    
\ No newline at end of file
+
+def test_compare_conll_trees_compact():
+    gold_conll = ConllxDf('tests/data/wiki/wiki_sample_gold/CamelTB_WikiNews_art_1.conllx')
+    parsed_conll = ConllxDf('tests/data/wiki/wiki_sample_parsed/CamelTB_WikiNews_art_1.conllx')
+    conll_scores = compare_conll_trees(gold_conll, parsed_conll)
+
+    compact_conllx_dfs([gold_conll, parsed_conll])
+    assert isinstance(gold_conll.df['UPOS'].dtype, pd.CategoricalDtype)
+    assert gold_conll.df['DEPREL'].dtype == parsed_conll.df['DEPREL'].dtype
+    assert compare_conll_trees(gold_conll, parsed_conll) == conll_scores
@@ -0,0 +1,51 @@
+import sys
+sys.path.insert(0, 'src')
+
+import pandas as pd
+import pytest
+
+from conll_utils import (add_direction, add_parent_details, get_children_ids_of, get_file_tokens, get_parent_id,
+                         get_sentence_tokens, get_sentence_tree, get_token_details)
+from conllx_df import ConllxDf
+
+
+@pytest.fixture
+def sen_df():
+    # the arc 4 -> 2 crosses the arc 5 -> 3, the head of 6 is not in the tree
+    return pd.DataFrame({'ID': [1, 2, 3, 4, 5, 6], 'HEAD': [0, 4, 5, 1, 1, 9], 'FORM': list('abcdef'),
+                         'UPOS': ['VRB', 'NOM', 'NOM', 'PRT', 'PRT', 'PNX'], 'DEPREL': ['---', 'OBJ', 'OBJ', 'MOD', 'MOD', 'MOD']})
+
+def test_sentence_tree(sen_df):
+    tree = get_sentence_tree(sen_df)
+    assert tree.parents.tolist() == [-1, 0, 4, 5, 1, 1, -1]
+    assert tree.children[tree.child_offsets[1]:tree.child_offsets[2]].tolist() == [4, 5]
+    assert tree.depths.tolist() == [0, 1, 3, 3, 2, 2, -1]
+    assert tree.subtree_starts.tolist() == [0, 1, 2, 3, 2, 3, 6]
+    assert tree.subtree_ends.tolist() == [5, 5, 2, 3, 4, 5, 6]
+    assert tree.projective.tolist() == [True, True, False, False, True, True, False]
+
+def test_tree_helpers(sen_df):
+    tree = get_sentence_tree(sen_df)
+    for sentence in [sen_df, tree]:
+        assert get_children_ids_of(sentence, 1) == [4, 5]
+        assert get_children_ids_of(sentence, 0) == [1]
+        assert get_parent_id(sentence, 2) == 4 and get_parent_id(sentence, 0) == -1
+        assert get_token_details(sentence, '0').form == 'ROOT'
+        assert get_token_details(sentence, 7) == {}
+        token = get_token_details(sentence, 2)
+        add_parent_details(sentence, token)
+        add_direction(token)
+        assert (token.parent_id, token.parent_form, token.parent_pos, token.direction) == (4, 'd', 'PRT', 'C-P')
+    with pytest.raises(ValueError):
+        get_sentence_tokens(tree)
+
+def test_file_tokens():
+    conll = ConllxDf('tests/data/wiki/wiki_sample_gold/CamelTB_WikiNews_art_1.conllx')
+    file_tokens = get_file_tokens(conll)
+    assert len(file_tokens) == conll.get_sentence_count()
+    for sen_df, tokens in zip(conll.iter_sentences(), file_tokens):
+        assert tokens == get_sentence_tokens(sen_df)
+        token = get_token_details(sen_df, tokens[-1].token_id)
+        add_parent_details(sen_df, token)
+        add_direction(token)
+        assert token == tokens[-1]
@@ -0,0 +1,53 @@
+import sys
+sys.path.insert(0, 'src')
+
+import numpy as np
+
+from conllx_counts import ConllxCounts
+from conllx_df import ConllxDf
+from conllx_scores import get_scores
+from tree_evaluation import count_conll_trees, count_conllx_files, get_conll_counts
+
+
+def test_add_counts():
+    gold_conll = ConllxDf('tests/data/wiki/wiki_sample_gold/CamelTB_WikiNews_art_1.conllx')
+    parsed_conll = ConllxDf('tests/data/wiki/wiki_sample_parsed/CamelTB_WikiNews_art_1.conllx')
+    gold_trees = list(gold_conll.iter_sentences())
+    parsed_trees = list(parsed_conll.iter_sentences())
+
+    counts = get_conll_counts(gold_conll, parsed_conll)
+    first_counts = count_conll_trees(gold_trees[:4], parsed_trees[:4])
+    last_counts = count_conll_trees(gold_trees[4:], parsed_trees[4:])
+    assert first_counts + last_counts == counts
+    assert get_scores(last_counts + first_counts) == get_scores(counts)
+
+def test_counts_json():
+    counts = ConllxCounts(sentence_count=2, gold_token_count=5, pred_token_count=4, token_matches=3)
+    counts.add_word_matches(3, 2)
+    counts.add_word_matches(3, 1)
+    counts.add_word_matches(1, 1)
+    assert counts.word_matches_by_length == {3: 3, 1: 1}
+    assert ConllxCounts.from_json(counts.to_json()) == counts
+
+def test_total_scores():
+    counts = ConllxCounts(sentence_count=4, gold_token_count=8, pred_token_count=10, token_matches=6,
+                          pos_matches=4, head_matches=2, label_matches=6, label_head_matches=2,
+                          perfect_head_count=1, perfect_label_count=2, perfect_label_head_count=1,
+                          word_matches_by_length={2: 3, 1: 1})
+    scores = get_scores(counts + counts)
+    assert scores['tokenization_recall'] == 75.0
+    assert scores['tokenization_precision'] == 60.0
+    assert scores['pos'] == 50.0
+    assert scores['las_score'] == 25.0
+    assert scores['pp_label_score'] == 50.0
+    assert scores['word_accuracy'] == 62.5
+
+def test_empty_scores():
+    # a file without trees has nan scores, and does not stop the evaluation of the others
+    with np.errstate(divide='ignore', invalid='ignore'):
+        assert all(np.isnan(score) for score in get_scores(ConllxCounts()).values())
+
+def test_count_conllx_files():
+    gold_path = 'tests/data/wiki/wiki_sample_gold/CamelTB_WikiNews_art_1.conllx'
+    parsed_path = 'tests/data/wiki/wiki_sample_parsed/CamelTB_WikiNews_art_1.conllx'
+    assert count_conllx_files(gold_path, parsed_path) == get_conll_counts(ConllxDf(gold_path), ConllxDf(parsed_path))
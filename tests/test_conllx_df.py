@@ -0,0 +1,73 @@
+import sys
+sys.path.insert(0, 'src')
+
+import pytest
+
+from src.conllx_df import ConllxDf, iter_conllx_sentences
+
+
+@pytest.fixture
+def conllu_data():
+    return '\n'.join([
+        '# text = a bc',
+        '1\ta\t_\tNOM\t_\t_\t0\t---\t_\t_',
+        '2-3\tbc\t_\t_\t_\t_\t_\t_\t_\t_',
+        '2\tb\t_\tPRT\t_\t_\t1\tMOD\t_\t_',
+        '3\tc\t_\tNOM\t_\t_\t2\tOBJ\t_\t_',
+        '',
+        '# text = d',
+        '1\td\t_\tVRB\t_\t_\t0\t---\t_\t_',
+        '1.1\tx\t_\t_\t_\t_\t_\t_\t_\t_',
+        '',
+        '# text = e f',
+        '1\te\t_\tNOM\t_\t_\t0\t---\t_\t_',
+        '2\tf\t_\tNOM\t_\t_\t1\tIDF\t_\t_',
+        '',
+        ''
+    ])
+
+def test_sentence_count(conllu_data):
+    conll = ConllxDf(data=conllu_data)
+    assert conll.get_sentence_count() == 3
+    assert len(conll.comments) == 3
+
+def test_get_df_by_id(conllu_data):
+    conll = ConllxDf(data=conllu_data)
+    assert conll.get_df_by_id(0).FORM.tolist() == ['a', 'b', 'c']
+    assert conll.get_df_by_id(1).FORM.tolist() == ['d']
+    assert conll.get_df_by_id(2).FORM.tolist() == ['e', 'f']
+    assert conll.get_df_by_id(3) is None
+    assert conll.get_df_by_id(-1) is None
+
+def test_iter_sentences(conllu_data):
+    conll = ConllxDf(data=conllu_data)
+    forms = [sen_df.FORM.tolist() for sen_df in conll.iter_sentences()]
+    assert forms == [conll.get_df_by_id(i).FORM.tolist() for i in range(conll.get_sentence_count())]
+
+def test_rebuild_sentence_index(conllu_data):
+    conll = ConllxDf(data=conllu_data)
+    conll.df = conll.df.iloc[:4]
+    assert conll.get_sentence_count() == 2
+    assert conll.get_df_by_id(1).FORM.tolist() == ['d']
+
+def test_sentence_index_wiki():
+    conll = ConllxDf('tests/data/wiki/wiki_sample_gold/CamelTB_WikiNews_art_1.conllx')
+    assert conll.get_sentence_count() == len(conll.comments)
+    assert sum(sen_df.shape[0] for sen_df in conll.iter_sentences()) == conll.df.shape[0]
+
+def test_iter_conllx_sentences():
+    lines = [
+        '﻿# text = a b\n',
+        '1\ta\t_\tNOM\t_\t_\t0\t---\t_\t_\n',
+        '1-2\tab\t_\t_\t_\t_\t_\t_\t_\t_\n',
+        '2\tb\t_\tNOM\t_\t_\t1\tIDF\t_\t_\n',
+        '\n',
+        '\n',
+        '# text = c\n',
+        '1\tc\t_\tVRB\t_\t_\t0\t---\t_\t_',
+    ]
+    sentences = list(iter_conllx_sentences(lines))
+    assert len(sentences) == 2
+    assert [row[1] for row in sentences[0][0]] == ['a', 'b']
+    assert sentences[0][1] == ['# text = a b']
+    assert sentences[1] == ([['1', 'c', '_', 'VRB', '_', '_', '0', '---', '_', '_']], ['# text = c'])
@@ -0,0 +1,58 @@
+import sys
+sys.path.insert(0, 'src')
+
+import shutil
+
+import pytest
+from pandas.testing import assert_frame_equal
+
+from conllx_df import ConllxDf
+from conllx_mmap import MappedConllxDf
+
+
+@pytest.mark.parametrize('file_path', [
+    'tests/data/wiki/wiki_sample_parsed/CamelTB_WikiNews_art_1.conllx',
+    'data/samples_gold/sample_4_norm.conllx',
+])
+def test_mapped_conllx_df(file_path):
+    conll = ConllxDf(file_path)
+    with MappedConllxDf(file_path) as mapped_conll:
+        assert mapped_conll.get_sentence_count() == conll.get_sentence_count()
+        for i in range(conll.get_sentence_count()):
+            assert_frame_equal(mapped_conll.get_df_by_id(i), conll.get_df_by_id(i).reset_index(drop=True))
+            assert mapped_conll.get_comments_by_id(i) == conll.get_comments_by_id(i)
+        assert mapped_conll.get_df_by_id(conll.get_sentence_count()) is None
+
+def test_mapped_conllx_df_index(tmp_path):
+    file_path = tmp_path / 'sample_2.conllx'
+    shutil.copy('data/samples_gold/sample_2.conllx', file_path)
+    with MappedConllxDf(file_path, persist_index=True) as mapped_conll:
+        sentence_count = mapped_conll.get_sentence_count()
+    assert (tmp_path / 'sample_2.conllx.idx.npz').exists()
+    with MappedConllxDf(file_path) as mapped_conll:
+        assert mapped_conll.get_sentence_count() == sentence_count
+
+    # the index is rebuilt once the file changes
+    with open(file_path, 'a') as f:
+        f.write('\n1\tx\t_\tNOM\t_\t_\t0\t---\t_\t_\n')
+    with MappedConllxDf(file_path) as mapped_conll:
+        assert mapped_conll.get_sentence_count() == sentence_count + 1
+        assert mapped_conll.get_df_by_id(sentence_count).FORM.tolist() == ['x']
+
+def test_mapped_conllx_df_empty(tmp_path):
+    file_path = tmp_path / 'empty.conllx'
+    file_path.write_text('')
+    with MappedConllxDf(file_path) as mapped_conll:
+        assert mapped_conll.get_sentence_count() == 0
+
+def test_mapped_conllx_df_detached_comments(tmp_path):
+    file_path = tmp_path / 'comments.conllx'
+    # the comments separated from their tree by a blank line belong to the tree
+    file_path.write_text('# sent_id = 1\n# text = x\n\n1\tx\t_\tNOM\t_\t_\t0\t---\t_\t_\n\n'
+                         '# text = y\n1\ty\t_\tVRB\t_\t_\t0\t---\t_\t_\n\n# trailing comment\n')
+    conll = ConllxDf(file_path)
+    with MappedConllxDf(file_path) as mapped_conll:
+        assert mapped_conll.get_sentence_count() == conll.get_sentence_count() == 2
+        for i in range(conll.get_sentence_count()):
+            assert_frame_equal(mapped_conll.get_df_by_id(i), conll.get_df_by_id(i).reset_index(drop=True))
+            assert mapped_conll.get_comments_by_id(i) == conll.get_comments_by_id(i)
@@ -0,0 +1,42 @@
+import sys
+sys.path.insert(0, 'src')
+
+from benchmarks.synthetic import TreebankConfig, write_treebank
+from evaluation_manifest import EvaluationManifest, count_conllx_files_incremental
+from main import evaluate_file_pairs, evaluate_file_pairs_incremental
+
+ARGUMENTS = {'--transliterate_pnx': True, '--transliterate_num': True, '--normalize_alef_yeh_ta': False, '--stream': False, '--compact': False, '--breakdown': False, '--confusion': None}
+
+
+def test_count_conllx_files_incremental(tmp_path):
+    [(gold_path, parsed_path)] = write_treebank(TreebankConfig(sentence_count=20, sentence_length=10), tmp_path / 'gold', tmp_path / 'parsed')
+    counts, entry = count_conllx_files_incremental(gold_path, parsed_path, None)
+    assert len(entry['sentences']) == 20
+    assert count_conllx_files_incremental(gold_path, parsed_path, entry) == (counts, entry)
+
+    # drop the last tree of both files and change a label of the first parsed tree
+    gold_trees = gold_path.read_text(encoding='utf-8').split('\n\n')
+    parsed_trees = parsed_path.read_text(encoding='utf-8').split('\n\n')
+    gold_path.write_text('\n\n'.join(gold_trees[:-2] + ['']), encoding='utf-8')
+    parsed_trees[0] = parsed_trees[0].replace('\tSBJ\t', '\tOBJ\t').replace('\tMOD\t', '\tSBJ\t')
+    parsed_path.write_text('\n\n'.join(parsed_trees[:-2] + ['']), encoding='utf-8')
+
+    full_counts, full_entry = count_conllx_files_incremental(gold_path, parsed_path, None)
+    incremental_counts, incremental_entry = count_conllx_files_incremental(gold_path, parsed_path, entry)
+    assert incremental_counts == full_counts
+    assert incremental_entry == full_entry
+    assert len(incremental_entry['sentences']) == 19
+
+def test_evaluate_file_pairs_incremental(tmp_path):
+    path_pairs = write_treebank(TreebankConfig(file_count=3, sentence_count=10, sentence_length=8), tmp_path / 'gold', tmp_path / 'parsed')
+    manifest_path = tmp_path / 'manifest.json'
+    full_run = sorted(evaluate_file_pairs(path_pairs, ARGUMENTS))
+
+    for jobs in [1, 2]:
+        manifest = EvaluationManifest(manifest_path, {'-x': True})
+        assert sorted(evaluate_file_pairs_incremental(path_pairs, ARGUMENTS, manifest, jobs)) == full_run
+        manifest.save()
+    assert len(EvaluationManifest(manifest_path, {'-x': True}).entries) == 3
+    # other settings or a full run start from an empty manifest
+    assert not EvaluationManifest(manifest_path, {'-x': False}).entries
+    assert not EvaluationManifest(manifest_path, {'-x': True}, force_full=True).entries
@@ -0,0 +1,58 @@
+import sys
+sys.path.insert(0, 'src')
+
+from pathlib import Path
+import subprocess
+
+from main import evaluate_file_pairs, evaluate_systems, get_system_scores_df
+
+# importing main.py costs at most this fraction of importing pandas, which it
+# only imports when it is used (about 0.05 s against 0.4 s when measured)
+IMPORT_TIME_RATIO = 0.25
+# modules that main.py only imports when they are used
+LAZY_MODULES = ['pandas', 'numpy', 'camel_tools', 'multiprocessing', 'cProfile', 'evaluation_manifest', 'tree_evaluation']
+
+
+def get_sample_path_pairs():
+    file_names = ['sample_1.conllx', 'sample_2.conllx', 'sample_3.conllx', 'sample_4_norm.conllx']
+    return [(Path('data/samples_gold') / f, Path('data/samples_parsed') / f) for f in file_names]
+
+def test_evaluate_file_pairs_parallel():
+    arguments = {'--transliterate_pnx': True, '--transliterate_num': True, '--normalize_alef_yeh_ta': False, '--stream': False, '--compact': False, '--breakdown': False, '--confusion': None}
+    path_pairs = get_sample_path_pairs()
+    serial_scores = list(evaluate_file_pairs(path_pairs, arguments))
+    parallel_scores = sorted(evaluate_file_pairs(path_pairs, arguments, jobs=2), key=lambda x: x[0])
+    assert [i for i, _ in serial_scores] == [0, 1, 2, 3]
+    assert [file_name for _, (file_name, _) in serial_scores] == ['sample_1', 'sample_2', 'sample_3', 'sample_4_norm']
+    assert serial_scores == parallel_scores
+
+def test_evaluate_systems():
+    arguments = {'--transliterate_pnx': True, '--transliterate_num': True, '--normalize_alef_yeh_ta': True, '--breakdown': False, '--confusion': None}
+    path_pairs = get_sample_path_pairs()
+    gold_paths = [gold_path for gold_path, _ in path_pairs]
+    system_paths = [[parsed_path for _, parsed_path in path_pairs], gold_paths]
+    for jobs in [1, 2]:
+        system_counts = sorted(evaluate_systems(gold_paths, system_paths, ['parser', 'gold'], arguments, jobs), key=lambda x: x[:2])
+        assert [(i, j) for i, j, _ in system_counts] == [(i, j) for i in range(2) for j in range(4)]
+        for i, paths in enumerate(system_paths):
+            single_counts = list(evaluate_file_pairs(list(zip(gold_paths, paths)), {**arguments, '--stream': False, '--compact': False}))
+            assert [result for _, _, result in system_counts[4 * i:4 * i + 4]] == [result for _, result in single_counts]
+
+def test_get_system_scores_df():
+    system_scores = {'a': [{'file_name': 'f', 'las_score': 50.0, 'pos': 60.0}],
+                     'b': [{'file_name': 'f', 'las_score': 70.0, 'pos': 80.0}]}
+    scores_df = get_system_scores_df(system_scores)
+    assert scores_df.columns.tolist() == ['file_name', 'score', 'a', 'b']
+    assert scores_df.values.tolist() == [['f', 'las_score', 50.0, 70.0], ['f', 'pos', 60.0, 80.0]]
+
+def test_import_time():
+    # a new interpreter, this one has already imported everything. Both imports
+    # are timed in the same process, so their ratio does not depend on the machine load
+    code = ('import sys, time; sys.path.insert(0, "src"); start = time.perf_counter(); import main; '
+            'main_time = time.perf_counter() - start; '
+            f'print(",".join(module for module in {LAZY_MODULES} if module in sys.modules)); '
+            'start = time.perf_counter(); import pandas; print(main_time / (time.perf_counter() - start))')
+    imported_modules, import_time_ratio = subprocess.run([sys.executable, '-c', code], capture_output=True, text=True,
+                                                         check=True).stdout.split('\n')[:2]
+    assert imported_modules == ''
+    assert float(import_time_ratio) < IMPORT_TIME_RATIO
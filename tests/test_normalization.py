@@ -0,0 +1,31 @@
+import sys
+sys.path.insert(0, 'src')
+
+import numpy as np
+import pandas as pd
+
+from src.utils.char_map import maps
+from src.utils.normalization import ALEF_YEH_TA_TABLE, normalize_alef_yeh_ta_line
+from src.utils.utils import normalize_df
+
+
+ARGUMENTS = {'--transliterate_pnx': True, '--transliterate_num': True, '--normalize_alef_yeh_ta': True}
+
+
+def test_alef_yeh_ta_table_matches_camel_tools():
+    arabic = ''.join(chr(c) for c in range(0x0600, 0x0700))
+    assert arabic.translate(ALEF_YEH_TA_TABLE) == normalize_alef_yeh_ta_line(arabic)
+
+def test_normalize_df():
+    punctuation, arabic_punctuation = '،', maps['punctuation']['،']
+    conll_df = pd.DataFrame({'FORM': [punctuation, 'مدرسة', 'مدرسة', np.nan, f'{punctuation}{punctuation}', 'إلى']})
+    normalize_df(ARGUMENTS, conll_df)
+    # the maps replace whole forms only
+    assert conll_df['FORM'].tolist()[:3] == [arabic_punctuation, 'مدرسه', 'مدرسه']
+    assert pd.isna(conll_df['FORM'][3])
+    assert conll_df['FORM'].tolist()[4:] == [f'{punctuation}{punctuation}', 'الي']
+
+def test_normalize_df_without_normalization():
+    conll_df = pd.DataFrame({'FORM': ['إلى', '.']})
+    normalize_df({name: False for name in ARGUMENTS}, conll_df)
+    assert conll_df['FORM'].tolist() == ['إلى', '.']
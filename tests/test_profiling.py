@@ -0,0 +1,34 @@
+import sys
+sys.path.insert(0, 'src')
+
+from conllx_df import ConllxDf
+from profiling import SLOWEST_SENTENCE_COUNT, disable_profiling, enable_profiling, get_profile, profile_stage
+from tree_evaluation import get_conll_counts
+
+
+def test_profile_stages():
+    gold_conll = ConllxDf('tests/data/wiki/wiki_sample_gold/CamelTB_WikiNews_art_1.conllx')
+    parsed_conll = ConllxDf('tests/data/wiki/wiki_sample_parsed/CamelTB_WikiNews_art_1.conllx')
+    counts = get_conll_counts(gold_conll, parsed_conll)
+
+    profile = enable_profiling()
+    try:
+        profile.start_file('art_1')
+        with profile_stage('count'):
+            profiled_counts = get_conll_counts(gold_conll, parsed_conll)
+    finally:
+        disable_profiling()
+    assert get_profile() is None
+    assert profiled_counts == counts
+
+    sentence_count = gold_conll.get_sentence_count()
+    for stage in ['align_trees', 'score', 'word_accuracy']:
+        assert profile.stages[stage].calls == sentence_count
+        assert profile.files['art_1'][stage] == profile.stages[stage]
+    # the enclosing stage includes the memory of its parts
+    assert profile.stages['count'].peak_memory >= profile.stages['align_trees'].peak_memory > 0
+
+    slowest = profile.get_slowest_sentences()
+    assert len(slowest) == min(sentence_count, SLOWEST_SENTENCE_COUNT)
+    assert [sentence.wall_time for sentence in slowest] == sorted((sentence.wall_time for sentence in slowest), reverse=True)
+    assert all(1 <= sentence.sentence <= sentence_count for sentence in slowest)
@@ -0,0 +1,57 @@
+import sys
+sys.path.insert(0, 'src')
+
+import pytest
+
+from conllx_df import ConllxDf
+from conllx_scores import get_scores
+from significance import (METRICS, SENTENCE_COLUMNS, approximate_randomization, get_sentence_count_array,
+                          get_sentence_counts, paired_bootstrap)
+from tree_evaluation import get_conll_counts
+
+
+def get_wiki_counts(gold_conll, parsed_conll):
+    return get_sentence_count_array(get_sentence_counts(gold_conll, parsed_conll))
+
+@pytest.fixture
+def wiki_conlls():
+    return (ConllxDf('tests/data/wiki/wiki_sample_gold/CamelTB_WikiNews_art_1.conllx'),
+            ConllxDf('tests/data/wiki/wiki_sample_parsed/CamelTB_WikiNews_art_1.conllx'))
+
+def test_sentence_count_array(wiki_conlls):
+    gold_conll, parsed_conll = wiki_conlls
+    counts = get_wiki_counts(gold_conll, parsed_conll)
+    assert counts.shape == (gold_conll.get_sentence_count(), len(SENTENCE_COLUMNS))
+    # the observed scores are the scores of the summed counts
+    scores = get_scores(get_conll_counts(gold_conll, parsed_conll))
+    results = paired_bootstrap(counts, counts, metrics=METRICS, resample_count=10)
+    for metric, result in results.items():
+        assert result.score_1 == pytest.approx(scores[metric])
+
+def test_same_systems(wiki_conlls):
+    counts = get_wiki_counts(*wiki_conlls)
+    for result in paired_bootstrap(counts, counts.copy()).values():
+        assert result.difference == 0 and result.p_value == 1 and result.confidence_interval == (0, 0)
+    for result in approximate_randomization(counts, counts.copy()).values():
+        assert result.p_value == 1
+
+def test_better_system(wiki_conlls):
+    gold_conll, parsed_conll = wiki_conlls
+    parsed_counts = get_wiki_counts(gold_conll, parsed_conll)
+    gold_counts = get_wiki_counts(gold_conll, gold_conll)
+    bootstrap_results = paired_bootstrap(parsed_counts, gold_counts, resample_count=500)
+    randomization_results = approximate_randomization(parsed_counts, gold_counts, trial_count=500)
+    for metric in ['las_score', 'uas_score']:
+        assert bootstrap_results[metric].difference > 0
+        assert bootstrap_results[metric].p_value < 0.05
+        assert bootstrap_results[metric].confidence_interval[0] > 0
+        assert randomization_results[metric].p_value < 0.05
+    # the same seed gives the same resamples
+    assert paired_bootstrap(parsed_counts, gold_counts, resample_count=500) == bootstrap_results
+
+def test_invalid_counts(wiki_conlls):
+    counts = get_wiki_counts(*wiki_conlls)
+    with pytest.raises(ValueError):
+        paired_bootstrap(counts, counts[1:])
+    with pytest.raises(ValueError):
+        approximate_randomization(counts, counts, metrics=['las'])
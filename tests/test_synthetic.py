@@ -0,0 +1,35 @@
+import sys
+sys.path.insert(0, 'src')
+
+from benchmarks import run
+from benchmarks.synthetic import TreebankConfig, generate_treebank, write_treebank
+from conllx_df import ConllxDf
+from conllx_scores import get_scores
+from tree_evaluation import get_conll_counts
+
+
+def test_generate_treebank():
+    config = TreebankConfig(file_count=2, sentence_count=20, sentence_length=10, seed=3)
+    files = generate_treebank(config)
+    assert files == generate_treebank(config)
+    assert files != generate_treebank(TreebankConfig(file_count=2, sentence_count=20, sentence_length=10, seed=4))
+    assert len(files) == 2
+
+def test_evaluate_synthetic_treebank(tmp_path):
+    config = TreebankConfig(sentence_count=30, sentence_length=12, tokenization_error_rate=0.2)
+    [(gold_path, parsed_path)] = write_treebank(config, tmp_path / 'gold', tmp_path / 'parsed')
+    gold_conll, parsed_conll = ConllxDf(gold_path), ConllxDf(parsed_path)
+    assert gold_conll.get_sentence_count() == parsed_conll.get_sentence_count() == 30
+
+    counts = get_conll_counts(gold_conll, parsed_conll)
+    # the words are the same, only their tokenization differs
+    assert get_scores(counts)['word_accuracy'] == 100
+    assert 0 < counts.token_matches < counts.gold_token_count
+    assert counts.gold_token_count != counts.pred_token_count
+
+def test_run_scale_with_several_files(monkeypatch):
+    monkeypatch.setitem(run.SCALES, 'tiny', TreebankConfig(file_count=2, sentence_count=5, sentence_length=6))
+    results = run.run_scale('tiny', repeat=1)
+    assert [result['stage'] for result in results] == ['read_conllx', 'align_trees', 'unsegmented_words',
+                                                       'compare_conll_trees', 'stream_conllx_files']
+    assert all(result['files'] == 2 and result['sentences'] == 10 for result in results)